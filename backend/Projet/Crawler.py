@@ -1,13 +1,68 @@
 import asyncio
 import json
-from bs4 import BeautifulSoup
 from crawl4ai import AsyncWebCrawler
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
-async def extract_pme_data(url: str) -> Dict[str, Any]:
+from browser_pool import get_browser_pool
+from static_fetch import (
+    STATIC_FETCH_ENABLED,
+    StaticFetchError,
+    fetch_html,
+    html_to_markdown,
+    extract_metadata,
+    extract_links,
+    js_rendering_reason,
+    record_fetch,
+)
+from crawl_cache import CRAWL_CACHE_ENABLED, get_crawl_cache, content_hash
+from jsonld_extractor import extract_json_ld, extract_microdata, aextract_structured_data
+
+
+async def _crawl(url: str):
     """
-    Transforms a URL into a dictionary ready for LLM analysis.
+    Crawls `url` on a warm browser leased from the process-wide pool when the
+    API has started it, otherwise on a one-off browser (standalone scripts).
     """
+    pool = get_browser_pool()
+    if pool.started:
+        async with pool.lease() as crawler:
+            return await crawler.arun(url=url)
+    async with AsyncWebCrawler(verbose=False) as crawler:
+        return await crawler.arun(url=url)
+
+
+def _process_static_html(html: str, url: str) -> Dict[str, Any]:
+    """CPU-bound part of the static path (runs in a worker thread)."""
+    metadata = extract_metadata(html)
+    microdata = extract_microdata(html)
+    if microdata:
+        metadata["microdata"] = microdata
+    return {
+        "markdown_content": html_to_markdown(html, url),
+        "structured_data": extract_json_ld(html),
+        "metadata": metadata,
+        "links": extract_links(html, url),
+    }
+
+
+async def _static_page(response) -> Optional[Dict[str, Any]]:
+    """
+    HTTP-only path: HTML→Markdown and JSON-LD from the fetched HTML, no browser.
+    Returns None (and counts the escalation) when the page looks JS-rendered.
+    """
+    html = response.text
+    page = await asyncio.to_thread(_process_static_html, html, str(response.url))
+    reason = js_rendering_reason(html, page["markdown_content"])
+    if reason is not None:
+        record_fetch(reason)
+        return None
+
+    record_fetch()
+    return page
+
+
+async def _browser_page(url: str) -> Tuple[Dict[str, Any], List[str], bool]:
+    """Crawl4AI/Playwright path: returns result_data, links and success."""
     result_data = {
         "url": url,
         "markdown_content": "",
@@ -16,37 +71,102 @@ async def extract_pme_data(url: str) -> Dict[str, Any]:
     }
 
     # 1. Use Crawl4AI for clean Markdown
-    async with AsyncWebCrawler(verbose=False) as crawler:
-        result = await crawler.arun(url=url)
-        
-        if result.success:
-            result_data["markdown_content"] = result.markdown
-            result_data["metadata"] = result.metadata
-            
-            # 2. Use BeautifulSoup for JSON-LD (Structured Data)
-            # Get raw HTML to extract <script type="application/ld+json"> tags
-            soup = BeautifulSoup(result.html, 'html.parser')
-            json_ld_scripts = soup.find_all('script', type='application/ld+json')
-            
-            for script in json_ld_scripts:
-                try:
-                    # Clean and load the JSON
-                    clean_json = json.loads(script.string)
-                    result_data["structured_data"].append(clean_json)
-                except (json.JSONDecodeError, TypeError):
-                    continue
-        else:
-            print(f"Crawl error: {result.error_message}")
+    result = await _crawl(url)
+    links = []
+
+    if result.success:
+        result_data["markdown_content"] = result.markdown
+        result_data["metadata"] = dict(result.metadata or {})
+
+        # 2. JSON-LD, microdata and OpenGraph straight from the raw HTML,
+        # off the event loop and without building a DOM
+        extracted = await aextract_structured_data(result.html)
+        result_data["structured_data"] = extracted["json_ld"]
+        for key, value in extracted["opengraph"].items():
+            result_data["metadata"].setdefault(key, value)
+        if extracted["microdata"]:
+            result_data["metadata"]["microdata"] = extracted["microdata"]
+        links = extract_links(result.html, getattr(result, "redirected_url", None) or url)
+    else:
+        print(f"Crawl error: {result.error_message}")
 
+    return result_data, links, result.success
+
+
+async def fetch_page(
+    url: str,
+    static_first: bool = STATIC_FETCH_ENABLED,
+    use_cache: bool = CRAWL_CACHE_ENABLED,
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Crawls one page and returns its result_data plus the absolute links it
+    contains (used by the site crawler to discover more pages).
+
+    Fresh pages come straight from the crawl cache; stale ones are revalidated
+    with a conditional GET. Server-rendered pages are served from a plain HTTP
+    fetch; only pages that look JS-rendered go through the browser.
+    """
+    cache = get_crawl_cache() if use_cache else None
+    entry = cache.lookup(url) if cache is not None else None
+    if entry is not None and entry.fresh:
+        return {**entry.result_data, "url": url}, entry.links
+
+    # 0. Plain HTTP GET: static path, and revalidation of a stale cache entry
+    response = None
+    if static_first or entry is not None:
+        try:
+            response = await fetch_html(url, entry.conditional_headers() if entry else None)
+        except StaticFetchError as e:
+            if static_first:
+                record_fetch(str(e))
+
+    body_hash = None
+    if response is not None:
+        if entry is not None and response.status_code == 304:
+            cache.revalidated(entry, not_modified=True)
+            return {**entry.result_data, "url": url}, entry.links
+        body_hash = content_hash(response.content)
+        if entry is not None and body_hash == entry.content_hash:
+            cache.revalidated(entry, not_modified=False)
+            return {**entry.result_data, "url": url}, entry.links
+
+    page = await _static_page(response) if static_first and response is not None else None
+    if page is not None:
+        links = page.pop("links")
+        result_data = {"url": url, **page}
+        success = True
+    else:
+        result_data, links, success = await _browser_page(url)
+
+    if cache is not None and success:
+        cache.store(
+            url, result_data, links,
+            etag=response.headers.get("etag") if response is not None else None,
+            last_modified=response.headers.get("last-modified") if response is not None else None,
+            body_hash=body_hash,
+            replaced=entry,
+        )
+    return result_data, links
+
+
+async def extract_pme_data(
+    url: str,
+    static_first: bool = STATIC_FETCH_ENABLED,
+    use_cache: bool = CRAWL_CACHE_ENABLED,
+) -> Dict[str, Any]:
+    """
+    Transforms a URL into a dictionary ready for LLM analysis.
+    """
+    result_data, _ = await fetch_page(url, static_first, use_cache)
     return result_data
 
 # --- QUICK TEST ---
 if __name__ == "__main__":
     # Replace with the URL of a local business to test
-    test_url = "https://4ipgroup.com/" 
-    
+    test_url = "https://4ipgroup.com/"
+
     data = asyncio.run(extract_pme_data(test_url))
-    
+
     print(f"--- ANALYSIS OF: {data['url']} ---")
     print(f"Number of Markdown characters: {len(data['markdown_content'])}")
     print(f"Number of JSON-LD objects found: {len(data['structured_data'])}")
@@ -1,25 +1,134 @@
-import os
 import json
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+import numpy as np
 from langchain_core.prompts import ChatPromptTemplate
-from tavily import TavilyClient
-from typing import Dict, Any
-from sentence_transformers import SentenceTransformer, util
-from compresr import CompressionClient
+from typing import Dict, Any, List
+
+from model_registry import (
+    get_llm, get_tavily_client, get_embedding_model, get_compresr_client, LLM_MODEL_NAME, LLM_TEMPERATURE,
+)
+from embedding_batcher import get_embedding_batcher
+from embedding_cache import EMBEDDING_CACHE_ENABLED, get_embedding_cache
+from chunked_embeddings import CHUNKED_SCORES_ENABLED, chunked_similarity, site_documents
+from search_cache import SECTOR_SHARING, sector_hint
+from report_cache import REPORT_CACHE_ENABLED, get_report_cache, prompt_key
+from context_packer import CONTEXT_PACKER_ENABLED, PROMPT_BUDGET, pack_context, count_tokens
+from compression import compress_llms_txt
+from metrics import track
+from tracing import span
+
+
+# Fields of a Tavily response that differ on every request for the same results
+_SEARCH_METADATA = ("response_time", "request_id")
+
+
+def cosine_similarity(vector_a: np.ndarray, vector_b: np.ndarray) -> float:
+    denominator = float(np.linalg.norm(vector_a) * np.linalg.norm(vector_b))
+    return float(np.dot(vector_a, vector_b)) / denominator if denominator else 0.0
+
+
+REPORT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert in Generative Engine Optimization (GEO).
+            Your role is to analyze the content of a business to maximize its chances of being cited by LLMs.
+            
+            You must produce two things:
+            1. An AUDIT: strengths, weaknesses, and 5 priority recommendations.
+            2. A LLMS.TXT FILE: An ultra-condensed summary in structured Markdown for AI bots.
+            """),
+    ("user", """Here is the site data:
+            URL: {url}
+            STRUCTURED DATA: {structured_data}
+            MARKDOWN CONTENT: {markdown_content}
+             
+            EXTERNAL DATA (TAVILY):
+            {web_results}
+
+            COHERENCE SCORE (cosine similarity between the site and web sources, from 0 to 1): {coherence_score}
+            A high score (e.g. 0.85) means the site is consistent with its web reputation → High Trust Score.
+            A low score (e.g. 0.30) means a strong inconsistency → risk of being ignored or misquoted by LLMs.
+             
+            COMPARISON SCORE (cosine similarity between our client and the best in the sector according to Tavily): {comparison_score}
+            Reference leader identified by Tavily: {best_competitor}
+            Excerpt from leader content: {best_content}
+            A high score means the client is positioned similarly to the leader → good semantic coverage.
+            A low score means the client is missing key industry topics → gaps to fill.
+            
+            Reply ONLY with a valid JSON object using EXACTLY these key names (do not rename or translate them).
+            ALL string values must be written in English, regardless of the language of the site being analyzed.
+            {{
+              "score": <integer 0-100>,
+              "critical_analysis": "<string: critical analysis of the site, in English>",
+              "top5_recommendations": ["<recommendation 1>", "<recommendation 2>", "<recommendation 3>", "<recommendation 4>", "<recommendation 5>"],
+              "llms_txt_content": "<string: condensed llms.txt in markdown, in English>",
+              "coherence_interpretation": "<string, in English>",
+              "comparison_interpretation": "<string, in English>"
+            }}""")
+])
+
 
 class GEOAuditor:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", temperature=0)
-        self.tavily = TavilyClient(api_key=os.environ["TAVILY_API_KEY"])
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.compresr = CompressionClient(api_key=os.environ["COMPRESR_API_KEY"])
+        # Models and clients are process-wide singletons: creating an auditor is free
+        self.llm = get_llm()
+        self.tavily = get_tavily_client()
+        self.embedding_model = get_embedding_model()
+        self.compresr = get_compresr_client()
+        self.batcher = get_embedding_batcher()
+        self.embedding_cache = get_embedding_cache() if EMBEDDING_CACHE_ENABLED else None
+        self.report_cache = get_report_cache() if REPORT_CACHE_ENABLED else None
 
     def close(self):
-        """Releases network resources associated with TavilyClient."""
-        try:
-            self.tavily.close()
-        except Exception:
-            pass
+        """
+        Kept for callers of the per-audit API. The clients are shared by every
+        auditor and released by model_registry.close_clients() at shutdown.
+        """
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds `texts` in one forward pass, batched with the encode requests
+        of every other in-flight audit. Texts already embedded (same model,
+        same normalised text) come from the embedding cache instead.
+        """
+        with span("embedding", texts=len(texts)):
+            if self.embedding_cache is None:
+                return self.batcher.encode(texts)
+            return self.embedding_cache.encode(texts, self.batcher.encode)
+
+    async def aencode(self, texts: List[str]) -> np.ndarray:
+        """Async variant of `encode`: the event loop is free during the forward pass."""
+        with span("embedding", texts=len(texts)):
+            if self.embedding_cache is None:
+                return await self.batcher.aencode(texts)
+            return await self.embedding_cache.aencode(texts, self.batcher.aencode)
+
+    async def asearch(self, **kwargs) -> Dict[str, Any]:
+        """Tavily search in a worker thread (the Tavily client is synchronous)."""
+        return await asyncio.to_thread(self.tavily.search, **kwargs)
+
+    def compute_chunked_scores(self, site_data: Dict[str, Any], source_texts: List[str]) -> Dict[str, Any]:
+        """
+        Full-document variant of the scores: every chunk of the site (all pages)
+        against every source text. Returns max / mean / coverage aggregates,
+        or None when there is no source to compare with.
+        """
+        return chunked_similarity(
+            site_documents(site_data),
+            source_texts,
+            self.encode,
+            tokenizer=getattr(self.embedding_model, "tokenizer", None),
+        )
+
+    async def acompute_chunked_scores(self, site_data: Dict[str, Any], source_texts: List[str]) -> Dict[str, Any]:
+        # Chunking and tokenisation are CPU-bound: keep them off the event loop
+        return await asyncio.to_thread(self.compute_chunked_scores, site_data, source_texts)
+
+    @staticmethod
+    def _coherence_texts(site_markdown: str, tavily_results: list):
+        # Text A: site summary (first 1000 characters)
+        text_a = site_markdown[:1000]
+        # Text B: aggregated content from Tavily results
+        text_b = " ".join([res['content'] for res in tavily_results[:5] if 'content' in res])
+        return text_a, text_b
 
     def compute_coherence_score(self, site_markdown: str, tavily_results: list) -> float:
         """
@@ -31,164 +140,285 @@ class GEOAuditor:
         - Low score (e.g. 0.30): site presents itself differently from its web image
           → risk of not being recommended by LLMs.
         """
-        # Text A: site summary (first 1000 characters)
-        text_a = site_markdown[:1000]
+        text_a, text_b = self._coherence_texts(site_markdown, tavily_results)
+        if not text_b.strip():
+            return 0.0
 
-        # Text B: aggregated content from Tavily results
-        text_b = " ".join([res['content'] for res in tavily_results[:5] if 'content' in res])
+        # Encode as vectors (both texts in the same batch)
+        vector_a, vector_b = self.encode([text_a, text_b])
 
+        # Cosine similarity
+        return round(cosine_similarity(vector_a, vector_b), 4)
+
+    async def acompute_coherence_score(self, site_markdown: str, tavily_results: list) -> float:
+        """Async variant of `compute_coherence_score`."""
+        text_a, text_b = self._coherence_texts(site_markdown, tavily_results)
         if not text_b.strip():
             return 0.0
+        vector_a, vector_b = await self.aencode([text_a, text_b])
+        return round(cosine_similarity(vector_a, vector_b), 4)
 
-        # Encode as vectors
-        vector_a = self.embedding_model.encode(text_a, convert_to_tensor=True)
-        vector_b = self.embedding_model.encode(text_b, convert_to_tensor=True)
+    @staticmethod
+    def _competitor_query(company_name: str, site_data: Dict[str, Any] = None) -> Dict[str, Any]:
+        # With a sector declared in the JSON-LD the query (and its cached
+        # result) is shared by every company of that sector
+        sector = sector_hint(site_data.get("structured_data", [])) if site_data and SECTOR_SHARING else None
+        return {
+            "query": f"best world leader reference sector competitor {sector or company_name}",
+            "search_depth": "advanced",
+            "max_results": 5,
+        }
 
-        # Cosine similarity
-        cosine_score = util.pytorch_cos_sim(vector_a, vector_b)
-        return round(cosine_score.item(), 4)
+    @staticmethod
+    def _best_competitor(competitor_results: list):
+        # The 1st result is the most relevant according to Tavily
+        best = competitor_results[0]
+        best_name = best.get("title") or best.get("url", "unknown")
+        best_content = " ".join(
+            [res["content"] for res in competitor_results[:3] if "content" in res]
+        )
+        return best_name, best_content
+
+    def compute_comparison_score(self, site_markdown: str, company_name: str, site_data: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Finds the best sector player according to Tavily, then scores the
+        client content against it (see `_ascore_comparison`). Synchronous
+        entry point, for callers that are not running an event loop.
+        """
+        sector_search = self.tavily.search(**self._competitor_query(company_name, site_data))
+        return asyncio.run(self._ascore_comparison(site_markdown, sector_search.get("results", []), site_data))
+
+    async def acompute_comparison_score(self, site_markdown: str, company_name: str, site_data: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Async variant of `compute_comparison_score`: the search runs in a worker thread."""
+        sector_search = await self.asearch(**self._competitor_query(company_name, site_data))
+        return await self._ascore_comparison(site_markdown, sector_search.get("results", []), site_data)
 
-    def compute_comparison_score(self, site_markdown: str, company_name: str) -> Dict[str, Any]:
+    async def _ascore_comparison(self, site_markdown: str, competitor_results: list, site_data: Dict[str, Any] = None) -> Dict[str, Any]:
         """
-        Finds the best sector player according to Tavily, then calculates
-        a cosine similarity score between the client content and
-        what Tavily knows about that leader.
+        Cosine similarity between the client content and what Tavily knows
+        about the best sector player (its top result). The 1000-char score
+        and the chunked details are computed concurrently, off the event loop.
 
         Returns a dict with:
           - 'score'           : float (0 to 1)
           - 'best_competitor' : str  (name/URL of the found leader)
           - 'best_content'    : str  (excerpt used for comparison)
+          - 'details'         : chunked aggregates (only if site_data is given
+                                and GEO_CHUNKED_SCORES is on)
         """
-        # Step 1: ask Tavily which is the best in the sector
-        sector_search = self.tavily.search(
-            query=f"best world leader reference sector competitor {company_name}",
-            search_depth="advanced",
-            max_results=5
-        )
-        competitor_results = sector_search.get("results", [])
         if not competitor_results:
             return {"score": 0.0, "best_competitor": "unknown", "best_content": ""}
 
-        # Step 2: take the content of the 1st result (most relevant according to Tavily)
-        best = competitor_results[0]
-        best_name = best.get("title") or best.get("url", "unknown")
-        best_content = " ".join(
-            [res["content"] for res in competitor_results[:3] if "content" in res]
-        )
-
+        best_name, best_content = self._best_competitor(competitor_results)
         if not best_content.strip():
             return {"score": 0.0, "best_competitor": best_name, "best_content": ""}
 
-        # Step 3: cosine similarity client vs leader
-        text_client = site_markdown[:1000]
-        vec_client = self.embedding_model.encode(text_client, convert_to_tensor=True)
-        vec_best = self.embedding_model.encode(best_content, convert_to_tensor=True)
-        score = util.pytorch_cos_sim(vec_client, vec_best)
+        details = None
+        vectors = self.aencode([site_markdown[:1000], best_content])
+        if site_data is not None and CHUNKED_SCORES_ENABLED:
+            (vec_client, vec_best), details = await asyncio.gather(vectors, self.acompute_chunked_scores(
+                site_data, [res["content"] for res in competitor_results[:3] if "content" in res]
+            ))
+        else:
+            vec_client, vec_best = await vectors
 
-        return {
-            "score": round(score.item(), 4),
+        comparison = {
+            "score": round(cosine_similarity(vec_client, vec_best), 4),
             "best_competitor": best_name,
-            "best_content": best_content[:500]   # short excerpt for the report
+            "best_content": best_content[:500]
         }
+        if site_data is not None and CHUNKED_SCORES_ENABLED:
+            comparison["details"] = details
+        return comparison
 
-    async def generate_geo_report(self, site_data: Dict[str, Any]) -> Dict[str, Any]:
+    # ── Pipeline stages (wired together in audit_pipeline.py) ────────────────
+
+    @staticmethod
+    def company_name(site_data: Dict[str, Any]) -> str:
+        return site_data["metadata"].get("title", "cette entreprise")
+
+    @classmethod
+    def search_queries(cls, site_data: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Analyzes the data and generates the audit + llms.txt file
+        The Tavily queries of the site. They only depend on its title (and
+        sector), so a re-audit of a site whose body changed keeps them.
         """
+        company_name = cls.company_name(site_data)
+        return {
+            "reputation_query": {
+                "query": f"Reputation, services and reviews about {company_name}",
+                "search_depth": "advanced",
+            },
+            "competitor_query": cls._competitor_query(company_name, site_data),
+        }
 
-        company_name = site_data["metadata"].get("title", "cette entreprise")
-        web_context = self.tavily.search(
-            query=f"Reputation, services and reviews about {company_name}",
-            search_depth="advanced"
-        )
+    @staticmethod
+    def _search_content(response: Dict[str, Any]) -> Dict[str, Any]:
+        # Without the per-request metadata, identical results hash the same and
+        # the scores computed from them are reused by a re-audit
+        return {k: v for k, v in response.items() if k not in _SEARCH_METADATA}
+
+    async def search_reputation(self, reputation_query: Dict[str, Any]) -> Dict[str, Any]:
+        """What the web says about the company (Tavily)."""
+        return self._search_content(await self.asearch(**reputation_query))
+
+    async def search_competitors(self, competitor_query: Dict[str, Any]) -> Dict[str, Any]:
+        """The leaders of the company's sector (Tavily)."""
+        return self._search_content(await self.asearch(**competitor_query))
 
-        # Calculate coherence score between site and web sources
+    async def score_coherence(self, site_data: Dict[str, Any], web_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Coherence between the site and its web reputation (1000-char score + chunked details)."""
         tavily_results = web_context.get("results", [])
-        coherence_score = self.compute_coherence_score(
-            site_data["markdown_content"],
-            tavily_results
+        coherence = self.acompute_coherence_score(site_data["markdown_content"], tavily_results)
+        if not CHUNKED_SCORES_ENABLED:
+            return {"coherence_score": await coherence, "coherence_details": None}
+        coherence_score, coherence_details = await asyncio.gather(coherence, self.acompute_chunked_scores(
+            site_data, [res["content"] for res in tavily_results[:5] if "content" in res]
+        ))
+        return {"coherence_score": coherence_score, "coherence_details": coherence_details}
+
+    async def score_comparison(self, site_data: Dict[str, Any], competitor_search: Dict[str, Any]) -> Dict[str, Any]:
+        """Similarity between the site and the best in its sector."""
+        return await self._ascore_comparison(
+            site_data["markdown_content"], competitor_search.get("results", []), site_data
         )
 
-        # Calculate comparison score vs best in sector
-        comparison = self.compute_comparison_score(
-            site_data["markdown_content"],
-            company_name
+    @staticmethod
+    def render_prompt(
+        site_data: Dict[str, Any],
+        web_context: Dict[str, Any],
+        coherence_score: float,
+        comparison: Dict[str, Any],
+        pack: bool = CONTEXT_PACKER_ENABLED,
+        budget: int = PROMPT_BUDGET,
+    ) -> Dict[str, Any]:
+        """
+        The report prompt, fully rendered (the LLM input and the report cache
+        key). With `pack`, markdown, JSON-LD and Tavily results share a
+        `budget` of tokens (context_packer); "prompt_tokens" reports the tokens
+        used per section and by the whole prompt.
+        """
+        if pack:
+            packed = pack_context(site_data["markdown_content"], site_data["structured_data"], web_context, budget)
+            markdown, structured_data, web_results = packed["markdown"], packed["structured_data"], packed["web_results"]
+            tokens = packed["tokens"]
+        else:
+            # Limit markdown if too long to save tokens
+            markdown = site_data["markdown_content"][:1000]
+            structured_data, web_results = str(site_data["structured_data"]), web_context
+            tokens = {}
+        messages = REPORT_PROMPT.format_messages(
+            url=site_data["url"],
+            structured_data=structured_data,
+            markdown_content=markdown,
+            web_results=web_results,
+            coherence_score=coherence_score,
+            comparison_score=comparison["score"],
+            best_competitor=comparison["best_competitor"],
+            best_content=comparison["best_content"],
         )
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert in Generative Engine Optimization (GEO).
-            Your role is to analyze the content of a business to maximize its chances of being cited by LLMs.
-            
-            You must produce two things:
-            1. An AUDIT: strengths, weaknesses, and 5 priority recommendations.
-            2. A LLMS.TXT FILE: An ultra-condensed summary in structured Markdown for AI bots.
-            """),
-            ("user", """Here is the site data:
-            URL: {url}
-            STRUCTURED DATA: {structured_data}
-            MARKDOWN CONTENT: {markdown_content}
-             
-            EXTERNAL DATA (TAVILY):
-            {web_results}
+        tokens["prompt"] = count_tokens("\n".join(m.content for m in messages))
+        return {"prompt_messages": messages, "prompt_tokens": tokens}
 
-            COHERENCE SCORE (cosine similarity between the site and web sources, from 0 to 1): {coherence_score}
-            A high score (e.g. 0.85) means the site is consistent with its web reputation → High Trust Score.
-            A low score (e.g. 0.30) means a strong inconsistency → risk of being ignored or misquoted by LLMs.
-             
-            COMPARISON SCORE (cosine similarity between our client and the best in the sector according to Tavily): {comparison_score}
-            Reference leader identified by Tavily: {best_competitor}
-            Excerpt from leader content: {best_content}
-            A high score means the client is positioned similarly to the leader → good semantic coverage.
-            A low score means the client is missing key industry topics → gaps to fill.
-            
-            Reply ONLY with a valid JSON object using EXACTLY these key names (do not rename or translate them).
-            ALL string values must be written in English, regardless of the language of the site being analyzed.
-            {{
-              "score": <integer 0-100>,
-              "critical_analysis": "<string: critical analysis of the site, in English>",
-              "top5_recommendations": ["<recommendation 1>", "<recommendation 2>", "<recommendation 3>", "<recommendation 4>", "<recommendation 5>"],
-              "llms_txt_content": "<string: condensed llms.txt in markdown, in English>",
-              "coherence_interpretation": "<string, in English>",
-              "comparison_interpretation": "<string, in English>"
-            }}""")
-        ])
-
-        chain = prompt | self.llm
-        # Limit markdown if too long to save tokens
-        response = await chain.ainvoke({
-            "url": site_data["url"],
-            "structured_data": str(site_data["structured_data"]),
-            "markdown_content": site_data["markdown_content"][:1000],
-            "web_results": web_context,
-            "coherence_score": coherence_score,
-            "comparison_score": comparison["score"],
-            "best_competitor": comparison["best_competitor"],
-            "best_content": comparison["best_content"]
-        })
-
-        # Extraction et compression du llms_txt_content via Compresr
+    async def lookup_report(self, site_data: Dict[str, Any], prompt_messages: list) -> Dict[str, Any]:
+        """
+        Report cache lookup: same rendered prompt and model settings, or (near
+        hit) a report of the same URL whose site embedding barely moved.
+        """
+        if self.report_cache is None:
+            return {"report_key": None, "cached_report": None, "site_vector": None}
+        key = prompt_key(prompt_messages, LLM_MODEL_NAME, LLM_TEMPERATURE)
+        site_vector = None
+        if self.report_cache.near_hits_enabled:
+            site_vector = (await self.aencode([site_data["markdown_content"][:1000]]))[0]
+        cached = await asyncio.to_thread(
+            self.report_cache.lookup, key, site_data["url"], LLM_MODEL_NAME, site_vector
+        )
+        return {"report_key": key, "cached_report": cached, "site_vector": site_vector}
+
+    async def write_report(self, prompt_messages: list, cached_report: Dict[str, Any] = None, on_token=None) -> str:
+        """
+        Gemini audit + llms.txt, as the raw JSON text of the model (skipped on
+        a cache hit). With `on_token`, the answer is streamed and every chunk
+        of text is passed to it as it arrives.
+        """
+        if cached_report is not None:
+            return cached_report["llm_report"]
+        with track("gemini"):
+            if on_token is None:
+                response = await self.llm.ainvoke(prompt_messages)
+                return response.content
+            parts = []
+            async for chunk in self.llm.astream(prompt_messages):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    on_token(chunk.content)
+            return "".join(parts)
+
+    async def compress_report(self, llm_content: str, cached_report: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Compresses the llms.txt of the report (Compresr, or the local
+        extractive compressor when Compresr is slow / down or the text is
+        short). Never fails: a malformed report or a compression error keeps
+        the original content, with compression "failed". A cached report is
+        already compressed.
+        """
+        if cached_report is not None:
+            return {
+                "llm_report": cached_report["llm_report"],
+                "llms_txt_compressed": cached_report["llms_txt_compressed"],
+                "compression": "cached",
+            }
         llms_txt_compressed = None
+        method = None
         try:
-            raw = response.content.strip().lstrip("```json").rstrip("```").strip()
+            raw = llm_content.strip().lstrip("```json").rstrip("```").strip()
             report_dict = json.loads(raw)
             llms_txt_raw = report_dict.get("llms_txt_content", "")
             if llms_txt_raw:
-                compression_result = self.compresr.generate(
-                    context=llms_txt_raw,
-                    question="What are the services, expertise, strengths and key information of this company for an LLM in deep research?",
-                    compression_model_name="compresr_v1"
-                )
-                llms_txt_compressed = compression_result.data.compressed_context
+                llms_txt_compressed, method = await compress_llms_txt(llms_txt_raw, self.compresr, self.aencode)
                 report_dict["llms_txt_content"] = llms_txt_compressed
             llm_report_final = json.dumps(report_dict, ensure_ascii=False)
         except Exception:
             # If compression fails or JSON is malformed, keep the original
-            llm_report_final = response.content
+            llm_report_final = llm_content
+            method = "failed"
+        return {"llm_report": llm_report_final, "llms_txt_compressed": llms_txt_compressed, "compression": method}
 
-        return {
-            "llm_report": llm_report_final,
-            "coherence_score": coherence_score,
-            "comparison_score": comparison["score"],
-            "best_competitor": comparison["best_competitor"],
-            "llms_txt_compressed": llms_txt_compressed
-        }
\ No newline at end of file
+    async def store_report(
+        self,
+        site_data: Dict[str, Any],
+        report_key: str,
+        cached_report: Dict[str, Any],
+        site_vector,
+        llm_report: str,
+        llms_txt_compressed: str,
+        compression: str,
+    ) -> str:
+        """
+        Stores a freshly generated report; returns the cache state ("hit",
+        "near_hit", "miss", "off"). A report that is not valid JSON, or whose
+        llms.txt was compressed by the fallback (or not at all after an
+        error), is not stored: the next audit asks Gemini again.
+        """
+        if report_key is None:
+            return "off"
+        if cached_report is not None:
+            return cached_report["state"]
+        if compression in ("fallback", "failed"):
+            self.report_cache.count("not_stored")
+            return "miss"
+        await asyncio.to_thread(
+            self.report_cache.store, report_key, site_data["url"], LLM_MODEL_NAME,
+            llm_report, llms_txt_compressed, site_vector,
+        )
+        return "miss"
+
+    async def generate_geo_report(self, site_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Analyzes the data and generates the audit + llms.txt file
+        (the report stages of the audit pipeline, from already crawled data)
+        """
+        from audit_pipeline import run_report_stages
+        report, _ = await run_report_stages(self, site_data)
+        return report
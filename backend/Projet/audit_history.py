@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional
+
+from url_utils import normalize_url
+from settings import cache_path, process_singleton
+
+
+# ─── Audit history settings (overridable from the .env) ──────────────────────
+AUDIT_HISTORY_ENABLED = os.getenv("GEO_AUDIT_HISTORY", "1") != "0"
+# A re-audit reuses the previous audit (its stage outputs, or the whole report
+# when the crawl is unchanged) only if it is more recent than this (seconds)
+HISTORY_REUSE_MAX_AGE = float(os.getenv("GEO_HISTORY_REUSE_MAX_AGE", "86400"))
+HISTORY_KEEP = int(os.getenv("GEO_HISTORY_KEEP", "20"))              # audits kept per URL
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def history_key(url: str, max_pages: int, max_depth: int) -> str:
+    """Successive audits are compared only for the same URL and crawl budget."""
+    return f"{normalize_url(url)}|{max_pages}|{max_depth}"
+
+
+def parse_report(llm_report: Optional[str]) -> Dict[str, Any]:
+    """
+    Score (0-100) and recommendations of a Gemini report; empty values when
+    the report is not valid JSON.
+    """
+    try:
+        clean = (llm_report or "").strip().lstrip("```json").rstrip("```").strip()
+        report = json.loads(clean)
+    except (ValueError, AttributeError):
+        return {"score": None, "recommendations": []}
+    score = None
+    try:
+        raw_score = report.get("score")
+        if raw_score is not None:
+            raw_score = float(raw_score)
+            # score between 0 and 1 → bring to 100
+            score = int(raw_score * 100) if raw_score <= 1 else int(raw_score)
+    except (TypeError, ValueError):
+        pass
+    recommendations = report.get("top5_recommendations") or []
+    return {"score": score, "recommendations": [str(r) for r in recommendations]}
+
+
+def report_summary(report: Dict[str, Any]) -> Dict[str, Any]:
+    """What successive audits of a URL are compared on."""
+    return {
+        **parse_report(report.get("llm_report")),
+        "coherence_score": report.get("coherence_score"),
+        "comparison_score": report.get("comparison_score"),
+        "best_competitor": report.get("best_competitor"),
+    }
+
+
+def _delta(before, after) -> Dict[str, Any]:
+    delta = round(after - before, 4) if isinstance(before, (int, float)) and isinstance(after, (int, float)) else None
+    return {"before": before, "after": after, "delta": delta}
+
+
+def audit_diff(previous: Dict[str, Any], summary: Dict[str, Any], hashes: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Structured diff between the previous audit of a URL (a history entry) and
+    the current one: score deltas, recommendations added and removed, and
+    what changed (crawl, Tavily results, embeddings scores, report).
+    """
+    before = previous["summary"]
+    old_recommendations = set(before["recommendations"])
+    new_recommendations = set(summary["recommendations"])
+    return {
+        "previous_id": previous["id"],
+        "previous_at": previous["created_at"],
+        "score": _delta(before["score"], summary["score"]),
+        "coherence_score": _delta(before["coherence_score"], summary["coherence_score"]),
+        "comparison_score": _delta(before["comparison_score"], summary["comparison_score"]),
+        "best_competitor": {
+            "before": before["best_competitor"],
+            "after": summary["best_competitor"],
+            "changed": before["best_competitor"] != summary["best_competitor"],
+        },
+        "recommendations": {
+            "added": [r for r in summary["recommendations"] if r not in old_recommendations],
+            "removed": [r for r in before["recommendations"] if r not in new_recommendations],
+        },
+        "changed": sorted(name for name, digest in hashes.items() if previous["hashes"].get(name) != digest),
+    }
+
+
+class AuditHistory:
+    """
+    On-disk (SQLite) history of the audits of each URL: content hashes of the
+    crawl, Tavily results, embedding scores and report, the outputs of the
+    incremental stages (reused by the next audit when their inputs did not
+    change), the report and its summary.
+    """
+
+    def __init__(self, path: str = cache_path("audit_history.sqlite"), keep: int = HISTORY_KEEP):
+        self.keep = keep
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS audit_history (
+                id TEXT PRIMARY KEY,
+                key TEXT,
+                url TEXT,
+                created_at REAL,
+                hashes TEXT,
+                stages TEXT,
+                report TEXT,
+                summary TEXT
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS audit_history_key ON audit_history (key, created_at)")
+        self._db.commit()
+        self.counters = {"recorded": 0, "unchanged": 0, "stages_reused": 0}
+
+    @staticmethod
+    def _entry(row: sqlite3.Row, full: bool = True) -> Dict[str, Any]:
+        entry = {
+            "id": row["id"],
+            "url": row["url"],
+            "created_at": row["created_at"],
+            "hashes": json.loads(row["hashes"]),
+            "summary": json.loads(row["summary"]),
+        }
+        if full:
+            entry["stages"] = json.loads(row["stages"])
+            entry["report"] = json.loads(row["report"])
+        return entry
+
+    def latest(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM audit_history WHERE key = ? ORDER BY created_at DESC LIMIT 1", (key,)
+            ).fetchone()
+        return self._entry(row) if row is not None else None
+
+    def get(self, audit_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM audit_history WHERE id = ?", (audit_id,)).fetchone()
+        return self._entry(row) if row is not None else None
+
+    def list(self, key: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Latest audits first, each with its diff against the one before it."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM audit_history WHERE key = ? ORDER BY created_at DESC LIMIT ?", (key, limit + 1)
+            ).fetchall()
+        entries = [self._entry(row, full=False) for row in rows]
+        for entry, previous in zip(entries, entries[1:] + [None]):
+            entry["diff"] = audit_diff(previous, entry["summary"], entry["hashes"]) if previous else None
+        return entries[:limit]
+
+    def record(
+        self,
+        key: str,
+        url: str,
+        hashes: Dict[str, str],
+        stages: Dict[str, Any],
+        report: Dict[str, Any],
+        summary: Dict[str, Any],
+    ) -> str:
+        audit_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO audit_history (id, key, url, created_at, hashes, stages, report, summary) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    audit_id, key, url, time.time(),
+                    json.dumps(hashes),
+                    json.dumps(stages, ensure_ascii=False, default=str),
+                    json.dumps(report, ensure_ascii=False, default=str),
+                    json.dumps(summary, ensure_ascii=False, default=str),
+                ),
+            )
+            self._db.execute(
+                "DELETE FROM audit_history WHERE key = ? AND id NOT IN "
+                "(SELECT id FROM audit_history WHERE key = ? ORDER BY created_at DESC LIMIT ?)",
+                (key, key, self.keep),
+            )
+            self._db.commit()
+            self.counters["recorded"] += 1
+        return audit_id
+
+    def count(self, counter: str, n: int = 1):
+        with self._lock:
+            self.counters[counter] += n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, urls = self._db.execute("SELECT COUNT(*), COUNT(DISTINCT key) FROM audit_history").fetchone()
+            counters = dict(self.counters)
+        return {"entries": entries, "urls": urls, **counters}
+
+
+# ── Process-wide history ─────────────────────────────────────────────────────
+
+@process_singleton
+def get_audit_history() -> AuditHistory:
+    return AuditHistory()
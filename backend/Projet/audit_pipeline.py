@@ -0,0 +1,320 @@
+import os
+import time
+import asyncio
+from typing import Dict, Any, List, Tuple, Callable, Optional
+
+from Crawler import extract_pme_data
+from site_crawler import extract_site_data, crawl_content, SITE_MAX_DEPTH
+from audit_engine import GEOAuditor
+from chunked_embeddings import CHUNKED_SCORES_ENABLED
+from stage_graph import Stage, StageGraph, content_key, get_stage_memo
+from tracing import span, current_span
+from audit_history import (
+    AUDIT_HISTORY_ENABLED, HISTORY_REUSE_MAX_AGE, get_audit_history, history_key, report_summary, audit_diff,
+)
+from json_stream import JsonFieldStream
+
+
+# ─── Stage timeouts / retries (overridable from the .env) ────────────────────
+CRAWL_TIMEOUT = float(os.getenv("GEO_CRAWL_TIMEOUT", "180"))
+SEARCH_TIMEOUT = float(os.getenv("GEO_SEARCH_TIMEOUT", "30"))
+SEARCH_RETRIES = int(os.getenv("GEO_SEARCH_RETRIES", "2"))
+SCORE_TIMEOUT = float(os.getenv("GEO_SCORE_TIMEOUT", "120"))
+LLM_TIMEOUT = float(os.getenv("GEO_LLM_TIMEOUT", "120"))
+LLM_RETRIES = int(os.getenv("GEO_LLM_RETRIES", "1"))
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Values of a finished run that make up the report
+REPORT_OUTPUTS = [
+    "coherence_score", "coherence_details", "comparison", "prompt_tokens",
+    "llm_report", "llms_txt_compressed", "compression", "report_cache",
+]
+
+
+async def crawl(url: str, max_pages: int, max_depth: int) -> Dict[str, Any]:
+    """Single page, or the whole site when max_pages > 1."""
+    if max_pages > 1:
+        site_data = await extract_site_data(url, max_pages=max_pages, max_depth=max_depth)
+    else:
+        site_data = await extract_pme_data(url)
+    if not site_data["markdown_content"]:
+        raise ValueError("Unable to crawl this URL.")
+    return site_data
+
+
+def _in_thread(fn):
+    """Stage adapter for a CPU-bound synchronous function."""
+    async def stage(**kwargs):
+        return await asyncio.to_thread(fn, **kwargs)
+    return stage
+
+
+def audit_stages(auditor: GEOAuditor, on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Stage]:
+    """
+    The audit as a stage graph:
+
+        crawl ── plan_searches ─┬─ search_reputation ─── score_coherence ──┬─ render_prompt
+                                └─ search_competitors ── score_comparison ─┘
+        render_prompt ── lookup_report ── write_report ── compress_report ── store_report
+
+    On a report cache hit, write_report and compress_report return the
+    cached report without calling Gemini or Compresr. The searches always
+    run (through the search cache), so the web results are never older than
+    the cache allows; the scores are incremental: a re-audit reuses their
+    outputs from the previous audit of the URL when the crawl and the
+    results they are computed from did not change.
+
+    Adding or swapping a stage only touches this list. With `on_event`, the
+    Gemini answer is streamed: "token" events carry the raw text and "field"
+    events each report field (or recommendation) as soon as it is complete.
+    """
+    async def write(prompt_messages: list, cached_report: Dict[str, Any]) -> str:
+        if on_event is None:
+            return await auditor.write_report(prompt_messages, cached_report)
+        fields = JsonFieldStream()
+
+        def on_token(text: str):
+            on_event({"event": "token", "text": text})
+            for field in fields.feed(text):
+                on_event({"event": "field", **field})
+
+        # Sent on every attempt: clients drop what a failed attempt streamed
+        on_event({"event": "report_started"})
+        content = await auditor.write_report(prompt_messages, cached_report, on_token if cached_report is None else None)
+        if cached_report is not None:
+            for field in fields.feed(content):
+                on_event({"event": "field", **field})
+        return content
+
+    return [
+        Stage("crawl", crawl, inputs=["url", "max_pages", "max_depth"], outputs=["site_data"],
+              timeout=CRAWL_TIMEOUT, retries=1),
+        Stage("plan_searches", _in_thread(auditor.search_queries), inputs=["site_data"],
+              outputs=["reputation_query", "competitor_query"]),
+        Stage("search_reputation", auditor.search_reputation, inputs=["reputation_query"], outputs=["web_context"],
+              timeout=SEARCH_TIMEOUT, retries=SEARCH_RETRIES),
+        Stage("search_competitors", auditor.search_competitors, inputs=["competitor_query"], outputs=["competitor_search"],
+              timeout=SEARCH_TIMEOUT, retries=SEARCH_RETRIES),
+        Stage("score_coherence", auditor.score_coherence, inputs=["site_data", "web_context"],
+              outputs=["coherence_score", "coherence_details"], timeout=SCORE_TIMEOUT, memoize=True, incremental=True),
+        Stage("score_comparison", auditor.score_comparison, inputs=["site_data", "competitor_search"],
+              outputs=["comparison"], timeout=SCORE_TIMEOUT, memoize=True, incremental=True),
+        Stage("render_prompt", _in_thread(auditor.render_prompt),
+              inputs=["site_data", "web_context", "coherence_score", "comparison"],
+              outputs=["prompt_messages", "prompt_tokens"]),
+        Stage("lookup_report", auditor.lookup_report, inputs=["site_data", "prompt_messages"],
+              outputs=["report_key", "cached_report", "site_vector"]),
+        Stage("write_report", write, inputs=["prompt_messages", "cached_report"],
+              outputs=["llm_content"], timeout=LLM_TIMEOUT, retries=LLM_RETRIES),
+        Stage("compress_report", auditor.compress_report, inputs=["llm_content", "cached_report"],
+              outputs=["llm_report", "llms_txt_compressed", "compression"]),
+        Stage("store_report", auditor.store_report,
+              inputs=["site_data", "report_key", "cached_report", "site_vector", "llm_report", "llms_txt_compressed",
+                      "compression"],
+              outputs=["report_cache"]),
+    ]
+
+
+def _stage_summary(stage: str, outputs: Dict[str, Any]) -> Dict[str, Any]:
+    """The headline results of a finished stage, for streaming clients."""
+    if stage == "crawl":
+        site_data = outputs["site_data"]
+        return {
+            "title": site_data["metadata"].get("title", ""),
+            "markdown_length": len(site_data["markdown_content"]),
+            "json_ld_count": len(site_data["structured_data"]),
+        }
+    if stage == "score_coherence":
+        return {"coherence_score": outputs["coherence_score"]}
+    if stage == "score_comparison":
+        comparison = outputs["comparison"]
+        return {"comparison_score": comparison["score"], "best_competitor": comparison["best_competitor"]}
+    if stage == "render_prompt":
+        return {"prompt_tokens": outputs["prompt_tokens"]["prompt"]}
+    if stage == "store_report":
+        return {"report_cache": outputs["report_cache"]}
+    return {}
+
+
+def _span_attributes(stage: str, outputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Sizes and counts of a finished stage, for its tracing span."""
+    if stage == "crawl":
+        site_data = outputs["site_data"]
+        return {
+            "markdown_chars": len(site_data["markdown_content"]),
+            "json_ld_count": len(site_data["structured_data"]),
+            "pages": len(site_data.get("pages", [])) or 1,
+        }
+    if stage == "search_reputation":
+        return {"results": len(outputs["web_context"].get("results", []))}
+    if stage == "search_competitors":
+        return {"results": len(outputs["competitor_search"].get("results", []))}
+    if stage == "render_prompt":
+        return {f"prompt_tokens.{section}": tokens for section, tokens in outputs["prompt_tokens"].items()}
+    if stage == "lookup_report":
+        cached = outputs["cached_report"]
+        return {"report_cache": cached["state"] if cached is not None else "miss"}
+    if stage == "write_report":
+        return {"report_chars": len(outputs["llm_content"] or "")}
+    if stage == "compress_report":
+        return {"compression": outputs["compression"], "llms_txt_chars": len(outputs["llms_txt_compressed"] or "")}
+    if stage == "store_report":
+        return {"report_cache": outputs["report_cache"]}
+    return {}
+
+
+_TIMING_KEYS = {"event", "stage", "status", "attempts", "seconds", "error"}
+
+
+def audit_progress(state: Optional[Dict[str, Any]], event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Folds the events of a running audit into its progress: status of each
+    stage, the stages running now, the partial results of the finished ones
+    (scores, best competitor...) and the report fields already written.
+    Returns None for events that change nothing (Gemini tokens).
+    """
+    state = state or {"running": [], "stages": {}, "partial": {}, "report": {}}
+    if event["event"] == "stage":
+        state["stages"][event["stage"]] = event["status"]
+        state["running"] = [name for name, status in state["stages"].items() if status == "running"]
+        state["partial"].update({k: v for k, v in event.items() if k not in _TIMING_KEYS})
+    elif event["event"] == "report_started":
+        state["report"] = {}
+    elif event["event"] == "field":
+        if "index" in event:
+            state["report"].setdefault(event["field"], []).append(event["value"])
+        else:
+            state["report"][event["field"]] = event["value"]
+    else:
+        return None
+    return state
+
+
+def build_audit_graph(
+    auditor: GEOAuditor,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    previous: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> StageGraph:
+    on_stage = None
+    if on_event is not None:
+        def on_stage(name: str, timing: Dict[str, Any], outputs: Optional[Dict[str, Any]]):
+            on_event({"event": "stage", "stage": name, **timing, **(_stage_summary(name, outputs) if outputs else {})})
+    return StageGraph(
+        audit_stages(auditor, on_event), memo=get_stage_memo(), on_stage=on_stage, previous=previous,
+        describe=_span_attributes,
+    )
+
+
+def build_report(values: Dict[str, Any]) -> Dict[str, Any]:
+    """The report returned by the API, from the values of a finished run."""
+    comparison = values["comparison"]
+    report = {
+        "llm_report": values["llm_report"],
+        "coherence_score": values["coherence_score"],
+        "comparison_score": comparison["score"],
+        "best_competitor": comparison["best_competitor"],
+        "llms_txt_compressed": values["llms_txt_compressed"],
+        # "remote" (Compresr), "local" (extractive fallback), "cached" or None
+        "compression": values["compression"],
+        # "hit" / "near_hit": served from the report cache, no Gemini nor Compresr call
+        "report_cache": values["report_cache"],
+        # Prompt size per section (markdown / structured_data / web_results) and in total
+        "prompt_tokens": values["prompt_tokens"],
+    }
+    if CHUNKED_SCORES_ENABLED:
+        # Whole-site scores, reported alongside the legacy 1000-char ones
+        report["coherence_details"] = values["coherence_details"]
+        report["comparison_details"] = comparison.get("details")
+    return report
+
+
+async def run_report_stages(auditor: GEOAuditor, site_data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Every stage after the crawl, from already crawled data. Returns (report, timings)."""
+    run = await build_audit_graph(auditor).run({"site_data": site_data}, targets=REPORT_OUTPUTS)
+    return build_report(run.values), run.breakdown()
+
+
+# What the report is computed from: a re-audit with the same hashes for these
+# keeps the previous report
+SOURCE_OUTPUTS = ["site_data", "web_context", "competitor_search"]
+
+
+def source_hashes(values: Dict[str, Any]) -> Dict[str, str]:
+    """Content hashes of the crawl and of the Tavily results."""
+    return {
+        "crawl": content_key("crawl", crawl_content(values["site_data"])),
+        "search_reputation": content_key("search_reputation", values["web_context"].get("results", [])),
+        "search_competitors": content_key("search_competitors", values["competitor_search"].get("results", [])),
+    }
+
+
+def audit_hashes(values: Dict[str, Any]) -> Dict[str, str]:
+    """Content hashes of what an audit depends on, compared between successive audits."""
+    return {
+        **source_hashes(values),
+        "score_coherence": content_key("score_coherence", [values["coherence_score"], values["coherence_details"]]),
+        "score_comparison": content_key("score_comparison", values["comparison"]),
+        "report": content_key("report", [values["llm_report"], values["llms_txt_compressed"]]),
+    }
+
+
+async def run_audit_pipeline(
+    url: str,
+    max_pages: int = 1,
+    max_depth: int = SITE_MAX_DEPTH,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    The full audit of `url`. Returns (site_data, report, timings). `on_event`
+    receives stage, token and report field events while it runs.
+
+    With the audit history, the crawl and the Tavily results (searches go
+    through the search cache) are compared with the previous audit of the URL
+    (if recent enough): all unchanged, its report is returned as is;
+    otherwise the scores whose inputs did not change reuse its outputs. report["history"] gives the audit id, the reused
+    stages and the diff with the previous audit.
+    """
+    history = get_audit_history() if AUDIT_HISTORY_ENABLED else None
+    key = history_key(url, max_pages, max_depth)
+    previous = await asyncio.to_thread(history.latest, key) if history is not None else None
+    fresh = previous is not None and time.time() - previous["created_at"] <= HISTORY_REUSE_MAX_AGE
+
+    auditor = GEOAuditor()
+    try:
+        graph = build_audit_graph(auditor, on_event, previous["stages"] if fresh else None)
+        crawl_run = await graph.run({"url": url, "max_pages": max_pages, "max_depth": max_depth}, targets=SOURCE_OUTPUTS)
+        site_data = crawl_run.values["site_data"]
+        if fresh and all(previous["hashes"].get(name) == digest for name, digest in source_hashes(crawl_run.values).items()):
+            history.count("unchanged")
+            current_span().set(unchanged=True, previous_audit=previous["id"])
+            if on_event is not None:
+                on_event({"event": "unchanged", "previous_id": previous["id"], "audited_at": previous["created_at"]})
+            report = {
+                **previous["report"],
+                "history": {"audit_id": previous["id"], "unchanged": True, "reused_stages": [], "diff": None},
+            }
+            return site_data, report, crawl_run.breakdown()
+        run = await graph.run(crawl_run.values, targets=REPORT_OUTPUTS)
+    finally:
+        auditor.close()
+
+    report = build_report(run.values)
+    timings = {
+        "total_seconds": round(crawl_run.total_seconds + run.total_seconds, 3),
+        "stages": {**crawl_run.timings, **run.timings},
+    }
+    if history is not None:
+        hashes = audit_hashes(run.values)
+        summary = report_summary(report)
+        with span("persist_history", stages=len(run.incremental)):
+            audit_id = await asyncio.to_thread(history.record, key, url, hashes, run.incremental, report, summary)
+        reused = [name for name, timing in run.timings.items() if timing["status"] == "unchanged"]
+        current_span().set(unchanged=False, reused_stages=len(reused))
+        history.count("stages_reused", len(reused))
+        report["history"] = {
+            "audit_id": audit_id,
+            "unchanged": False,
+            "reused_stages": reused,
+            "diff": audit_diff(previous, summary, hashes) if previous is not None else None,
+        }
+    return site_data, report, timings
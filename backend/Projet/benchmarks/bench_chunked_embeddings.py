@@ -0,0 +1,69 @@
+"""
+Benchmark: chunked full-document similarity at several document sizes.
+
+Builds documents of 1k → 100k characters from the article fixture, embeds
+every chunk with the real model (no cache) against 5 source texts, and
+reports chunk count, wall time and peak Python memory.
+
+    cd backend/Projet
+    python benchmarks/bench_chunked_embeddings.py [--sizes 1000 10000 100000]
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from sentence_transformers import SentenceTransformer
+
+from chunked_embeddings import chunked_similarity, CHUNK_TOKENS, CHUNK_BATCH_SIZE
+from model_registry import EMBEDDING_MODEL_NAME
+from static_fetch import html_to_markdown
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "article_large.html")
+SOURCES = [
+    "Northbridge Partners is an impact investing advisory firm helping enterprises in emerging markets.",
+    "Reviews praise their capital raising and due diligence work for sustainable funds.",
+    "The firm offers ESG reporting, climate finance strategy and portfolio impact measurement.",
+    "Clients describe the training programmes on governance as practical and well structured.",
+    "Competitors include large consulting networks with dedicated sustainability practices.",
+]
+
+
+def build_document(size: int) -> str:
+    with open(FIXTURE, encoding="utf-8") as f:
+        base = html_to_markdown(f.read())
+    text = base
+    while len(text) < size:
+        text += "\n\n" + base
+    return text[:size]
+
+
+def main(sizes):
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    encode = lambda texts: model.encode(texts, batch_size=CHUNK_BATCH_SIZE, convert_to_numpy=True)
+    encode(["warmup"])
+
+    print(f"\n{'='*84}")
+    print(f"  CHUNKED SIMILARITY — {EMBEDDING_MODEL_NAME}, {CHUNK_TOKENS} tokens/chunk, batch {CHUNK_BATCH_SIZE}")
+    print(f"{'='*84}")
+    print(f"  {'chars':>8}{'chunks':>8}{'time':>11}{'ms/chunk':>10}{'peak mem':>11}{'max':>8}{'mean':>8}{'coverage':>10}")
+    for size in sizes:
+        document = build_document(size)
+        tracemalloc.start()
+        start = time.perf_counter()
+        scores = chunked_similarity([document], SOURCES, encode, tokenizer=model.tokenizer)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {size:>8}{scores['chunks']:>8}{elapsed:>9.2f} s{elapsed * 1000 / scores['chunks']:>10.1f}"
+              f"{peak / (1024 * 1024):>8.1f} MB{scores['max']:>8.3f}{scores['mean']:>8.3f}{scores['coverage']:>10.2f}")
+    print(f"{'='*84}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000, 100000])
+    args = parser.parse_args()
+    main(args.sizes)
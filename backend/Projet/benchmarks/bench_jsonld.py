@@ -0,0 +1,74 @@
+"""
+Micro-benchmark: regex/streaming JSON-LD extractor vs the former
+BeautifulSoup path, on the saved pages of benchmarks/fixtures/.
+
+    cd backend/Projet
+    python benchmarks/bench_jsonld.py [--iterations 50] [--fixtures DIR]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from jsonld_extractor import extract_json_ld, extract_structured_data
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def bs4_json_ld(html: str) -> list:
+    """The extraction Crawler.py used before jsonld_extractor (reference)."""
+    structured_data = []
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            structured_data.append(json.loads(script.string))
+        except (json.JSONDecodeError, TypeError):
+            continue
+    return structured_data
+
+
+def _bench(func, html: str, iterations: int):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(html)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main(iterations: int, fixtures_dir: str):
+    pages = sorted(f for f in os.listdir(fixtures_dir) if f.endswith(".html"))
+
+    print(f"\n{'='*86}")
+    print(f"  JSON-LD EXTRACTION — {len(pages)} pages, {iterations} iterations (median)")
+    print(f"{'='*86}")
+    print(f"  {'page':<28}{'size':>10}{'bs4':>12}{'json-ld':>12}{'+micro/og':>12}{'speed-up':>10}  same")
+    total_bs4 = total_fast = 0.0
+    for page in pages:
+        with open(os.path.join(fixtures_dir, page), encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        t_bs4 = _bench(bs4_json_ld, html, iterations)
+        t_fast = _bench(extract_json_ld, html, iterations)
+        t_full = _bench(extract_structured_data, html, iterations)
+        same = bs4_json_ld(html) == extract_json_ld(html)
+        total_bs4 += t_bs4
+        total_fast += t_fast
+        print(f"  {page:<28}{len(html) // 1024:>8} KB{t_bs4:>9.2f} ms{t_fast:>9.2f} ms"
+              f"{t_full:>9.2f} ms{t_bs4 / max(t_fast, 1e-6):>9.1f}x  {'yes' if same else 'NO'}")
+    print(f"{'─'*86}")
+    print(f"  corpus total: bs4 {total_bs4:.2f} ms vs fast {total_fast:.2f} ms "
+          f"(x{total_bs4 / max(total_fast, 1e-6):.1f})")
+    print(f"{'='*86}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    args = parser.parse_args()
+    main(args.iterations, args.fixtures)
@@ -0,0 +1,113 @@
+"""
+Benchmark: report prompt size (and optionally Gemini latency) before and
+after the token-budget context packer.
+
+Builds site_data from the saved pages of benchmarks/fixtures/ and a
+Tavily-shaped response (answer, images, raw_content...) from the article
+fixture, then renders the report prompt the legacy way (full JSON-LD repr,
+raw Tavily dict, markdown[:1000]) and packed (GEO_PROMPT_BUDGET tokens).
+With --llm, each prompt is also sent to Gemini --runs times (needs
+GOOGLE_API_KEY in the .env).
+
+    cd backend/Projet
+    python benchmarks/bench_prompt_packing.py [--budget 6000] [--llm --runs 3]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+from context_packer import PROMPT_BUDGET
+from audit_engine import GEOAuditor
+from chunked_embeddings import chunk_text
+from Crawler import _process_static_html
+from static_fetch import html_to_markdown
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+COMPARISON = {"score": 0.61, "best_competitor": "Northbridge Partners", "best_content": "Leading advisory firm. " * 20}
+
+
+def load_site(name: str):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        html = f.read()
+    site_data = _process_static_html(html, f"https://example.com/{name}")
+    site_data["url"] = f"https://example.com/{name}"
+    return site_data
+
+
+def tavily_response(n_results: int = 8):
+    """A response shaped like Tavily's advanced search, built from the article fixture."""
+    with open(os.path.join(FIXTURES_DIR, "article_large.html"), encoding="utf-8") as f:
+        chunks = list(chunk_text(html_to_markdown(f.read()), max_tokens=120))
+    return {
+        "query": "Reputation, services and reviews about Example",
+        "answer": chunks[0],
+        "images": [f"https://images.example.com/{i}.jpg" for i in range(10)],
+        "follow_up_questions": None,
+        "results": [
+            {
+                "title": f"Result {i}",
+                "url": f"https://source{i}.example.com/article",
+                "content": chunks[(i + 1) % len(chunks)],
+                "raw_content": " ".join(chunks[i:i + 12]),
+                "score": round(0.9 - i * 0.05, 2),
+                "favicon": f"https://source{i}.example.com/favicon.ico",
+            }
+            for i in range(n_results)
+        ],
+        "response_time": 1.84,
+    }
+
+
+def render(site_data, web_context, pack: bool, budget: int):
+    start = time.perf_counter()
+    rendered = GEOAuditor.render_prompt(site_data, web_context, 0.72, COMPARISON, pack=pack, budget=budget)
+    return rendered, (time.perf_counter() - start) * 1000
+
+
+async def llm_latency(messages, runs: int):
+    from model_registry import get_llm
+    llm = get_llm()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await llm.ainvoke(messages)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main(budget: int, use_llm: bool, runs: int):
+    web_context = tavily_response()
+    print(f"\n{'='*86}")
+    print(f"  REPORT PROMPT — legacy vs packed (budget {budget} tokens for markdown + JSON-LD + web)")
+    print(f"{'='*86}")
+    print(f"  {'fixture':<22}{'mode':<9}{'prompt tok':>11}{'markdown':>10}{'json-ld':>9}{'web':>8}{'render':>10}"
+          + (f"{'LLM p50':>10}" if use_llm else ""))
+    for name in ("company_ssr.html", "article_large.html"):
+        site_data = load_site(name)
+        for mode, pack in (("legacy", False), ("packed", True)):
+            rendered, render_ms = render(site_data, web_context, pack, budget)
+            tokens = rendered["prompt_tokens"]
+            sections = [tokens[s]["used"] if s in tokens else "-" for s in ("markdown", "structured_data", "web_results")]
+            line = (f"  {name:<22}{mode:<9}{tokens['prompt']:>11}{sections[0]:>10}{sections[1]:>9}{sections[2]:>8}"
+                    f"{render_ms:>7.1f} ms")
+            if use_llm:
+                latency = asyncio.run(llm_latency(rendered["prompt_messages"], runs))
+                line += f"{latency:>8.2f} s"
+            print(line)
+    print(f"{'='*86}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=PROMPT_BUDGET)
+    parser.add_argument("--llm", action="store_true", help="also measure Gemini latency (API calls)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    main(args.budget, args.llm, args.runs)
@@ -0,0 +1,99 @@
+"""
+Benchmark: float32 SentenceTransformer vs int8 ONNX Runtime embeddings.
+
+Embeds a fixed corpus (sentences of the fixtures + audit-like source texts)
+with both backends and reports throughput, single-text latency (p50/p99)
+and how far the int8 vectors drift from the float32 ones: per-text cosine
+and the error on pairwise similarities, which is what the GEO scores use.
+
+    cd backend/Projet
+    python benchmarks/bench_quantized_embeddings.py [--runs 50] [--batch 32]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from sentence_transformers import SentenceTransformer
+
+from chunked_embeddings import chunk_text
+from model_registry import EMBEDDING_MODEL_NAME
+from quantized_backend import OnnxInt8Embedder
+from static_fetch import html_to_markdown
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SOURCES = [
+    "Northbridge Partners is an impact investing advisory firm helping enterprises in emerging markets.",
+    "Reviews praise their capital raising and due diligence work for sustainable funds.",
+    "The firm offers ESG reporting, climate finance strategy and portfolio impact measurement.",
+    "Clients describe the training programmes on governance as practical and well structured.",
+    "Competitors include large consulting networks with dedicated sustainability practices.",
+]
+
+
+def build_corpus():
+    corpus = list(SOURCES)
+    for name in ("company_ssr.html", "article_large.html"):
+        with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+            corpus.extend(chunk_text(html_to_markdown(f.read()), max_tokens=60))
+    return corpus
+
+
+def throughput(encode, corpus, batch_size):
+    start = time.perf_counter()
+    encode(corpus, batch_size)
+    return len(corpus) / (time.perf_counter() - start)
+
+
+def latencies(encode, corpus, runs):
+    samples = []
+    for i in range(runs):
+        start = time.perf_counter()
+        encode([corpus[i % len(corpus)]], 1)
+        samples.append((time.perf_counter() - start) * 1000)
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def main(runs, batch_size):
+    corpus = build_corpus()
+    backends = {
+        "torch fp32": SentenceTransformer(EMBEDDING_MODEL_NAME),
+        "onnx int8": OnnxInt8Embedder(EMBEDDING_MODEL_NAME),
+    }
+    vectors = {}
+
+    print(f"\n{'='*72}")
+    print(f"  EMBEDDING BACKENDS — {EMBEDDING_MODEL_NAME}, {len(corpus)} texts, batch {batch_size}")
+    print(f"{'='*72}")
+    print(f"  {'backend':<14}{'texts/s':>10}{'p50 (1 text)':>16}{'p99 (1 text)':>16}")
+    for name, model in backends.items():
+        encode = lambda texts, bs, m=model: m.encode(texts, batch_size=bs, convert_to_numpy=True)
+        encode(["warmup"], 1)
+        rate = throughput(encode, corpus, batch_size)
+        p50, p99 = latencies(encode, corpus, runs)
+        vectors[name] = _normalize(encode(corpus, batch_size))
+        print(f"  {name:<14}{rate:>10.1f}{p50:>13.2f} ms{p99:>13.2f} ms")
+
+    reference, quantized = vectors["torch fp32"], vectors["onnx int8"]
+    per_text = (reference * quantized).sum(axis=1)
+    pair_error = np.abs(reference @ reference.T - quantized @ quantized.T)
+    print(f"{'-'*72}")
+    print(f"  cosine(fp32, int8) per text : mean {per_text.mean():.4f}   min {per_text.min():.4f}")
+    print(f"  |Δ similarity| text pairs   : mean {pair_error.mean():.4f}   max {pair_error.max():.4f}")
+    print(f"{'='*72}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50, help="single-text encodes for the latency percentiles")
+    parser.add_argument("--batch", type=int, default=32)
+    args = parser.parse_args()
+    main(args.runs, args.batch)
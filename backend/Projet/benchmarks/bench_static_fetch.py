@@ -0,0 +1,97 @@
+"""
+Benchmark: HTTP-first static path vs crawl4ai/Playwright path.
+
+Serves the saved pages of benchmarks/fixtures/ from a local HTTP server and
+crawls each one through both paths of Crawler.py.
+
+    cd backend/Projet
+    python benchmarks/bench_static_fetch.py [--runs 5] [--fixtures DIR]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+import statistics
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from Crawler import _crawl, _static_page
+from static_fetch import close_http_client, fetch_stats, fetch_html, StaticFetchError
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _serve(directory: str) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def _static_path(url: str):
+    try:
+        response = await fetch_html(url)
+    except StaticFetchError:
+        return None
+    return await _static_page(response)
+
+
+async def _time(coro_factory, runs: int):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = await coro_factory()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, result
+
+
+def _fmt(timings) -> str:
+    return f"mean {statistics.mean(timings):8.1f} ms | p50 {statistics.median(timings):8.1f} ms"
+
+
+async def main(runs: int, fixtures_dir: str, skip_browser: bool):
+    server = _serve(fixtures_dir)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    pages = sorted(f for f in os.listdir(fixtures_dir) if f.endswith(".html"))
+
+    print(f"\n{'='*78}")
+    print(f"  STATIC vs BROWSER — {len(pages)} fixtures, {runs} runs each")
+    print(f"{'='*78}")
+    try:
+        for page in pages:
+            url = f"{base}/{page}"
+            static_t, static_result = await _time(lambda: _static_path(url), runs)
+            if static_result is None:
+                outcome = "ESCALATED"
+            else:
+                outcome = f"{len(static_result['markdown_content'])} md chars"
+            print(f"\n{page}")
+            print(f"  static  : {_fmt(static_t)} | {outcome}")
+            if not skip_browser:
+                browser_t, result = await _time(lambda: _crawl(url), runs)
+                print(f"  browser : {_fmt(browser_t)} | {len(result.markdown or '')} md chars")
+                print(f"  speed-up: x{statistics.median(browser_t) / statistics.median(static_t):.1f}")
+    finally:
+        await close_http_client()
+        server.shutdown()
+
+    print(f"\n{'─'*78}")
+    print(f"  Fetch counters: {fetch_stats()}")
+    print(f"{'='*78}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--skip-browser", action="store_true", help="only time the static path")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.fixtures, args.skip_browser))
@@ -0,0 +1,303 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
+
+from crawl4ai import AsyncWebCrawler
+
+try:
+    import psutil
+except ImportError:  # memory-based recycling is simply disabled without psutil
+    psutil = None
+
+from settings import process_singleton
+
+
+# ─── Pool settings (overridable from the .env) ───────────────────────────────
+POOL_SIZE = int(os.getenv("GEO_BROWSER_POOL_SIZE", "2"))
+CONTEXTS_PER_BROWSER = int(os.getenv("GEO_BROWSER_CONTEXTS", "2"))
+MAX_PAGES_PER_BROWSER = int(os.getenv("GEO_BROWSER_MAX_PAGES", "100"))
+MAX_POOL_RSS_MB = int(os.getenv("GEO_BROWSER_MAX_RSS_MB", "1536"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("GEO_BROWSER_HEALTH_INTERVAL", "30"))
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class _PooledBrowser:
+    """One warm AsyncWebCrawler (one Chromium) and its usage counters."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.crawler: Optional[AsyncWebCrawler] = None
+        self.leased = 0
+        self.pages_served = 0
+        self.started_at = 0.0
+        self.retiring = False
+        self.broken = False
+
+
+class BrowserLease:
+    """
+    A page slot on one pooled browser. `arun` has the same signature as
+    AsyncWebCrawler.arun but always executes on the pool's own event loop,
+    so callers running in other loops/threads can use it safely.
+    """
+
+    def __init__(self, pool: "BrowserPool", browser: _PooledBrowser):
+        self._pool = pool
+        self._browser = browser
+
+    async def arun(self, url: str, **kwargs):
+        return await self._pool._call(self._browser.crawler.arun(url=url, **kwargs))
+
+
+class BrowserPool:
+    """
+    Long-lived pool of headless browsers owned by the API process.
+
+    The browsers live on a dedicated event-loop thread (Playwright objects are
+    bound to the loop that created them). Each audit leases a slot, crawls, and
+    gives it back; a browser is recycled after `max_pages` pages, when the
+    browser processes exceed `max_rss_mb`, or when the health check fails.
+    """
+
+    def __init__(
+        self,
+        size: int = POOL_SIZE,
+        contexts_per_browser: int = CONTEXTS_PER_BROWSER,
+        max_pages: int = MAX_PAGES_PER_BROWSER,
+        max_rss_mb: int = MAX_POOL_RSS_MB,
+        health_check_interval: float = HEALTH_CHECK_INTERVAL,
+    ):
+        self.size = max(1, size)
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.health_check_interval = health_check_interval
+
+        self._browsers: List[_PooledBrowser] = [_PooledBrowser(i) for i in range(self.size)]
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._cond: Optional[asyncio.Condition] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._start_lock = threading.Lock()
+        self.recycled = 0
+
+    @property
+    def started(self) -> bool:
+        return self._loop is not None
+
+    def healthy(self) -> int:
+        """Browsers launched and not broken (leasable, or about to be once recycled)."""
+        return sum(1 for b in self._browsers if b.crawler is not None and not b.broken)
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        Launches every browser (blocking) on `loop`, a running event loop of
+        another thread (e.g. the pipeline runtime), or on a loop thread of its
+        own when no loop is given.
+        """
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            if loop is None:
+                if sys.platform == "win32":
+                    # Playwright needs a ProactorEventLoop to spawn the browser on Windows
+                    loop = asyncio.ProactorEventLoop()
+                else:
+                    loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=loop.run_forever, name="browser-pool", daemon=True
+                )
+                self._thread.start()
+            self._loop = loop
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+
+    async def _start(self):
+        self._cond = asyncio.Condition()
+        await asyncio.gather(*(self._launch(b) for b in self._browsers))
+        self._health_task = asyncio.ensure_future(self._health_loop())
+
+    def stop(self):
+        """Closes every browser, and stops the pool loop thread if the pool owns it."""
+        if self._loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result(timeout=30)
+        finally:
+            if self._thread is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop.close()
+                self._thread = None
+            self._loop = None
+
+    async def _stop(self):
+        if self._health_task:
+            self._health_task.cancel()
+        await asyncio.gather(*(self._close(b) for b in self._browsers))
+
+    async def _launch(self, browser: _PooledBrowser):
+        try:
+            crawler = AsyncWebCrawler(verbose=False)
+            await crawler.start()
+        except Exception as e:
+            print(f"Browser pool: launch of browser #{browser.index} failed: {e}")
+            browser.crawler = None
+            browser.broken = True
+            # The health loop relaunches it
+            browser.retiring = False
+            return
+        browser.crawler = crawler
+        browser.pages_served = 0
+        browser.started_at = time.monotonic()
+        browser.retiring = False
+        browser.broken = False
+
+    async def _close(self, browser: _PooledBrowser):
+        crawler, browser.crawler = browser.crawler, None
+        if crawler is not None:
+            try:
+                await crawler.close()
+            except Exception:
+                pass
+
+    async def _recycle(self, browser: _PooledBrowser):
+        await self._close(browser)
+        await self._launch(browser)
+        self.recycled += 1
+        async with self._cond:
+            self._cond.notify_all()
+
+    # ── Leasing ──────────────────────────────────────────────────────────────
+
+    async def _call(self, coro):
+        """Runs `coro` on the pool loop and awaits it from the caller's loop."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    def _pick(self) -> Optional[_PooledBrowser]:
+        candidates = [
+            b for b in self._browsers
+            if b.crawler is not None and not b.retiring and not b.broken
+            and b.leased < self.contexts_per_browser
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda b: (b.leased, b.pages_served))
+
+    async def _acquire(self) -> _PooledBrowser:
+        async with self._cond:
+            browser = self._pick()
+            while browser is None:
+                if all(b.broken for b in self._browsers):
+                    raise RuntimeError("No healthy browser available in the pool.")
+                await self._cond.wait()
+                browser = self._pick()
+            browser.leased += 1
+            return browser
+
+    async def _release(self, browser: _PooledBrowser):
+        over_memory = await self._over_memory_limit()
+        async with self._cond:
+            browser.leased -= 1
+            browser.pages_served += 1
+            if browser.pages_served >= self.max_pages or over_memory:
+                browser.retiring = True
+            if browser.retiring and browser.leased == 0:
+                asyncio.ensure_future(self._recycle(browser))
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def lease(self):
+        """
+        Leases a page slot for one audit:
+
+            async with pool.lease() as crawler:
+                result = await crawler.arun(url=url)
+        """
+        if not self.started:
+            raise RuntimeError("BrowserPool.start() must be called before leasing.")
+        browser = await self._call(self._acquire())
+        try:
+            yield BrowserLease(self, browser)
+        finally:
+            await self._call(self._release(browser))
+
+    # ── Health & memory ──────────────────────────────────────────────────────
+
+    async def _over_memory_limit(self) -> bool:
+        if psutil is None or not self.max_rss_mb:
+            return False
+        # Walking the process tree is slow: keep it off the pool loop
+        return await asyncio.to_thread(self.browser_rss_mb) > self.max_rss_mb
+
+    @staticmethod
+    def browser_rss_mb() -> float:
+        """Resident memory of every browser process spawned by this process."""
+        if psutil is None:
+            return 0.0
+        total = 0
+        for child in psutil.Process().children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+    @staticmethod
+    def _is_connected(browser: _PooledBrowser) -> bool:
+        # crawl4ai does not expose the Playwright browser publicly; walk its
+        # internals defensively and assume healthy if the layout changes.
+        strategy = getattr(browser.crawler, "crawler_strategy", None)
+        manager = getattr(strategy, "browser_manager", None)
+        pw_browser = getattr(manager, "browser", None)
+        if pw_browser is None or not hasattr(pw_browser, "is_connected"):
+            return True
+        return pw_browser.is_connected()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            over_memory = await self._over_memory_limit()
+            for browser in self._browsers:
+                if browser.leased:
+                    continue
+                if browser.broken:
+                    await self._recycle(browser)
+                elif browser.retiring:
+                    # Being recycled after its last lease
+                    continue
+                elif browser.crawler is None:
+                    await self._recycle(browser)
+                elif over_memory or not self._is_connected(browser):
+                    browser.retiring = True
+                    await self._recycle(browser)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "contexts_per_browser": self.contexts_per_browser,
+            "leased": sum(b.leased for b in self._browsers),
+            "healthy": self.healthy(),
+            "pages_served": [b.pages_served for b in self._browsers],
+            "recycled": self.recycled,
+            "rss_mb": round(self.browser_rss_mb(), 1),
+        }
+
+
+# ── Process-wide pool ────────────────────────────────────────────────────────
+
+@process_singleton
+def get_browser_pool() -> BrowserPool:
+    """Returns the process-wide browser pool (not started until `start()`)."""
+    return BrowserPool()
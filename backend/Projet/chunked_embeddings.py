@@ -0,0 +1,140 @@
+import os
+import re
+from typing import Dict, Any, List, Iterator, Iterable, Callable, Optional
+
+import numpy as np
+
+
+# ─── Chunked scoring settings (overridable from the .env) ────────────────────
+CHUNKED_SCORES_ENABLED = os.getenv("GEO_CHUNKED_SCORES", "1") != "0"
+CHUNK_TOKENS = int(os.getenv("GEO_CHUNK_TOKENS", "200"))       # all-MiniLM-L6-v2 truncates at 256
+CHUNK_BATCH_SIZE = int(os.getenv("GEO_CHUNK_BATCH", "64"))      # chunks embedded (and held) at once
+COVERAGE_THRESHOLD = float(os.getenv("GEO_CHUNK_COVERAGE_THRESHOLD", "0.5"))
+# ─────────────────────────────────────────────────────────────────────────────
+
+_UNITS_RE = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+
+def _word_count(units: List[str]) -> List[int]:
+    # ~1.3 word-piece tokens per word for English/French prose
+    return [int(len(u.split()) * 1.3) + 1 for u in units]
+
+
+def token_counter(tokenizer=None) -> Callable[[List[str]], List[int]]:
+    """Batched token counter using the model's tokenizer, or a word estimate."""
+    if tokenizer is None:
+        return _word_count
+
+    def count(units: List[str]) -> List[int]:
+        return [len(ids) for ids in tokenizer(units, add_special_tokens=False)["input_ids"]]
+    return count
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int = CHUNK_TOKENS,
+    count_tokens: Callable[[List[str]], List[int]] = _word_count,
+) -> Iterator[str]:
+    """
+    Splits `text` into chunks of at most ~`max_tokens` tokens, packing whole
+    sentences/paragraphs greedily; oversized sentences are split on words.
+    """
+    units = [u.strip() for u in _UNITS_RE.split(text) if u and u.strip()]
+    if not units:
+        return
+    lengths = count_tokens(units)
+
+    current: List[str] = []
+    current_tokens = 0
+    for unit, n_tokens in zip(units, lengths):
+        if n_tokens > max_tokens:
+            if current:
+                yield " ".join(current)
+                current, current_tokens = [], 0
+            words = unit.split()
+            step = max(1, int(len(words) * max_tokens / n_tokens))
+            for start in range(0, len(words), step):
+                yield " ".join(words[start:start + step])
+            continue
+        if current_tokens + n_tokens > max_tokens and current:
+            yield " ".join(current)
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += n_tokens
+    if current:
+        yield " ".join(current)
+
+
+def site_documents(site_data: Dict[str, Any]) -> List[str]:
+    """Full site text: one document per crawled page, or the page markdown."""
+    pages = [p["markdown_content"] for p in site_data.get("pages", []) if p.get("markdown_content")]
+    return pages or [site_data["markdown_content"]]
+
+
+def _batched(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def chunked_similarity(
+    documents: List[str],
+    sources: List[str],
+    encode: Callable[[List[str]], np.ndarray],
+    max_tokens: int = CHUNK_TOKENS,
+    batch_size: int = CHUNK_BATCH_SIZE,
+    threshold: float = COVERAGE_THRESHOLD,
+    tokenizer=None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Chunk × source cosine similarity over the WHOLE site text.
+
+    Chunks are embedded `batch_size` at a time and folded into running
+    aggregates, so memory stays bounded whatever the site size:
+      - max            : best chunk/source similarity
+      - mean           : mean over the full chunk × source matrix
+      - mean_best      : mean over sources of their best-matching chunk
+      - coverage       : share of sources matched by some chunk >= threshold
+      - chunk_coverage : share of chunks matching some source >= threshold
+    Returns None when there is nothing to compare.
+    """
+    sources = [s for s in sources if s and s.strip()]
+    if not sources:
+        return None
+    source_vectors = _normalize(encode(sources))            # S × d
+    count_tokens = token_counter(tokenizer)
+    chunks = (c for doc in documents for c in chunk_text(doc, max_tokens, count_tokens))
+
+    n_chunks = 0
+    sim_sum = 0.0
+    matched_chunks = 0
+    best_per_source = np.full(len(sources), -1.0, dtype=np.float32)
+    for batch in _batched(chunks, batch_size):
+        sims = _normalize(encode(batch)) @ source_vectors.T  # b × S
+        n_chunks += len(batch)
+        sim_sum += float(sims.sum())
+        matched_chunks += int((sims.max(axis=1) >= threshold).sum())
+        np.maximum(best_per_source, sims.max(axis=0), out=best_per_source)
+
+    if n_chunks == 0:
+        return None
+    return {
+        "max": round(float(best_per_source.max()), 4),
+        "mean": round(sim_sum / (n_chunks * len(sources)), 4),
+        "mean_best": round(float(best_per_source.mean()), 4),
+        "coverage": round(float((best_per_source >= threshold).mean()), 4),
+        "chunk_coverage": round(matched_chunks / n_chunks, 4),
+        "chunks": n_chunks,
+        "sources": len(sources),
+    }
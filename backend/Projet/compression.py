@@ -0,0 +1,199 @@
+import os
+import re
+import time
+import asyncio
+import threading
+from typing import Dict, Any, List, Tuple, Callable, Awaitable, Optional
+
+import numpy as np
+
+from metrics import track
+from settings import process_singleton
+
+
+# ─── llms.txt compression settings (overridable from the .env) ───────────────
+# "auto": Compresr with a timeout, local extractive compressor when it is
+# slow / down or for short inputs; "remote" or "local" to force one of them.
+COMPRESSION_MODE = os.getenv("GEO_COMPRESSION_MODE", "auto")
+REMOTE_TIMEOUT = float(os.getenv("GEO_COMPRESS_TIMEOUT", "10"))
+LOCAL_BELOW_CHARS = int(os.getenv("GEO_COMPRESS_LOCAL_BELOW", "1500"))   # shorter inputs never leave the process
+LOCAL_RATIO = float(os.getenv("GEO_COMPRESS_LOCAL_RATIO", "0.5"))        # share of the text the local compressor keeps
+LOCAL_MIN_CHARS = 400
+# After this many consecutive remote failures / timeouts, Compresr is skipped for the cooldown
+BREAKER_FAILURES = int(os.getenv("GEO_COMPRESS_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN = float(os.getenv("GEO_COMPRESS_BREAKER_COOLDOWN", "300"))
+# ─────────────────────────────────────────────────────────────────────────────
+
+QUESTION = "What are the services, expertise, strengths and key information of this company for an LLM in deep research?"
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9À-Ý\"'(])")
+
+
+# ── Local extractive compressor ──────────────────────────────────────────────
+
+def split_units(text: str) -> List[Tuple[int, str, bool]]:
+    """(line number, text, is heading) for each heading line and each sentence of the other lines."""
+    units = []
+    for line_no, line in enumerate(text.splitlines()):
+        line = line.rstrip()
+        if not line.strip():
+            continue
+        if line.lstrip().startswith("#"):
+            units.append((line_no, line, True))
+            continue
+        for sentence in _SENTENCE_RE.split(line):
+            if sentence.strip():
+                units.append((line_no, sentence, False))
+    return units
+
+
+async def extractive_compress(
+    text: str,
+    aencode: Callable[[List[str]], Awaitable[np.ndarray]],
+    question: str = QUESTION,
+    max_chars: Optional[int] = None,
+) -> str:
+    """
+    Keeps the sentences closest to `question` (cosine with the embedding
+    model) within `max_chars`, in their original order, with the markdown
+    headings of the sections that keep at least one sentence.
+    """
+    max_chars = max_chars or max(LOCAL_MIN_CHARS, int(len(text) * LOCAL_RATIO))
+    units = split_units(text)
+    sentences = [i for i, unit in enumerate(units) if not unit[2]]
+    if len(text) <= max_chars or len(sentences) <= 1:
+        return text
+
+    vectors = np.asarray(await aencode([question] + [units[i][1] for i in sentences]), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    scores = vectors[1:] @ vectors[0]
+
+    # Section heading of each sentence: kept with the first sentence kept below it
+    section, heading = {}, None
+    for i, unit in enumerate(units):
+        if unit[2]:
+            heading = i
+        else:
+            section[i] = heading
+
+    kept, used = set(), 0
+    for rank in np.argsort(-scores):
+        i = sentences[rank]
+        added = [i] + ([section[i]] if section[i] is not None and section[i] not in kept else [])
+        cost = sum(len(units[j][1]) + 1 for j in added)
+        if used + cost > max_chars and kept:
+            continue
+        kept.update(added)
+        used += cost
+
+    lines: Dict[int, List[str]] = {}
+    for i in sorted(kept):
+        line_no, unit_text, _ = units[i]
+        lines.setdefault(line_no, []).append(unit_text.strip() if lines.get(line_no) else unit_text)
+    return "\n".join(" ".join(parts) for _, parts in sorted(lines.items()))
+
+
+# ── Remote health (circuit breaker) ──────────────────────────────────────────
+
+class RemoteCircuit:
+    """Consecutive-failure circuit breaker for Compresr, with usage counters."""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._open_until = 0.0
+        self.counters = {"remote": 0, "local": 0, "remote_errors": 0, "remote_timeouts": 0, "breaker_trips": 0}
+        self.remote_seconds = 0.0
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return time.time() < self._open_until
+
+    def success(self, seconds: float):
+        with self._lock:
+            self._consecutive = 0
+            self.counters["remote"] += 1
+            self.remote_seconds += seconds
+
+    def failure(self, timeout: bool):
+        with self._lock:
+            self._consecutive += 1
+            self.counters["remote_timeouts" if timeout else "remote_errors"] += 1
+            if self._consecutive >= self.failures:
+                self._open_until = time.time() + self.cooldown
+                self._consecutive = 0
+                self.counters["breaker_trips"] += 1
+                print(f"Compresr: {self.failures} failures in a row, using the local compressor for {self.cooldown:.0f}s")
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            remote_seconds = self.remote_seconds
+            open_for = max(0.0, self._open_until - time.time())
+        return {
+            "mode": COMPRESSION_MODE,
+            **counters,
+            "remote_avg_seconds": round(remote_seconds / counters["remote"], 3) if counters["remote"] else None,
+            "breaker_open_seconds": round(open_for, 1),
+        }
+
+
+@process_singleton
+def get_remote_circuit() -> RemoteCircuit:
+    return RemoteCircuit()
+
+
+# ── Policy ───────────────────────────────────────────────────────────────────
+
+async def _remote(compresr, text: str, question: str, timeout: float) -> str:
+    # The Compresr client is synchronous: run it in a worker thread, bounded by the timeout
+    with track("compresr"):
+        result = await asyncio.wait_for(
+            asyncio.to_thread(
+                compresr.generate, context=text, question=question, compression_model_name="compresr_v1"
+            ),
+            timeout,
+        )
+    return result.data.compressed_context
+
+
+async def compress_llms_txt(
+    text: str,
+    compresr,
+    aencode: Callable[[List[str]], Awaitable[np.ndarray]],
+    mode: str = COMPRESSION_MODE,
+    timeout: float = REMOTE_TIMEOUT,
+    question: str = QUESTION,
+) -> Tuple[str, str]:
+    """
+    Compresses an llms.txt; returns (compressed text, method) where method is
+    "remote" (Compresr), "local" (extractive, embedding model, chosen) or
+    "fallback" (local because Compresr failed or its breaker is open). In
+    "auto" mode, short inputs go local, and a tripped breaker or a Compresr
+    error or timeout falls back to local; in "remote" mode it is raised instead.
+    """
+    circuit = get_remote_circuit()
+    wanted_remote = compresr is not None and (mode == "remote" or (mode == "auto" and len(text) >= LOCAL_BELOW_CHARS))
+    use_remote = wanted_remote and (mode == "remote" or not circuit.is_open())
+    if use_remote:
+        start = time.perf_counter()
+        try:
+            compressed = await _remote(compresr, text, question, timeout)
+            circuit.success(time.perf_counter() - start)
+            return compressed, "remote"
+        except Exception as e:
+            timed_out = isinstance(e, asyncio.TimeoutError)
+            circuit.failure(timeout=timed_out)
+            if mode == "remote":
+                raise
+            reason = f"no answer within {timeout}s" if timed_out else f"{type(e).__name__}: {e}"
+            print(f"Compresr failed ({reason}), compressing locally")
+    compressed = await extractive_compress(text, aencode, question)
+    circuit.count("local")
+    return compressed, "fallback" if wanted_remote else "local"
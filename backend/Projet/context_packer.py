@@ -0,0 +1,281 @@
+import os
+import re
+import json
+from typing import Dict, Any, List, Optional
+
+from settings import process_singleton
+
+
+# ─── Prompt packing settings (overridable from the .env) ─────────────────────
+CONTEXT_PACKER_ENABLED = os.getenv("GEO_PROMPT_PACKER", "1") != "0"
+PROMPT_BUDGET = int(os.getenv("GEO_PROMPT_BUDGET", "6000"))      # tokens for the three context sections
+# Guaranteed share of the budget per section, in priority order; what a
+# section does not use goes to the next ones that still need room.
+SECTION_SHARES = {"markdown": 0.5, "structured_data": 0.25, "web_results": 0.25}
+TAVILY_FIELDS = ("title", "url", "content")
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+# ── Token counting ───────────────────────────────────────────────────────────
+
+class _Tokenizer:
+    """
+    Token counts for the prompt. Gemini's tokenizer is only reachable through
+    an API call, so cl100k_base (tiktoken) is used as a close offline proxy;
+    without tiktoken, ~4 characters per token.
+    """
+
+    def __init__(self):
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            self._encoding = None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is None:
+            return (len(text) + 3) // 4
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is None:
+            return text[:max_tokens * 4]
+        tokens = self._encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else self._encoding.decode(tokens[:max_tokens])
+
+
+@process_singleton
+def get_tokenizer() -> _Tokenizer:
+    return _Tokenizer()
+
+
+def count_tokens(text: str) -> int:
+    return get_tokenizer().count(text)
+
+
+# ── Section normalisation ────────────────────────────────────────────────────
+
+# Least useful first to go: page scaffolding comes after the business entities
+_LOW_PRIORITY_TYPES = {"website", "webpage", "breadcrumblist", "listitem", "sitenavigationelement",
+                       "searchaction", "imageobject", "wpheader", "wpfooter", "readaction", "entrypoint"}
+
+
+def _compact(value: Any) -> Any:
+    """Drops @context, empty values and whitespace noise, recursively."""
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            if key == "@context":
+                continue
+            item = _compact(item)
+            if item not in (None, "", [], {}):
+                out[key] = item
+        return out
+    if isinstance(value, list):
+        items = [_compact(v) for v in value]
+        return [v for v in items if v not in (None, "", [], {})]
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value).strip()
+    return value
+
+
+def _flatten(blocks: Any) -> List[Dict[str, Any]]:
+    nodes = []
+    for block in blocks if isinstance(blocks, list) else [blocks]:
+        if isinstance(block, list):
+            nodes.extend(_flatten(block))
+        elif isinstance(block, dict):
+            graph = block.get("@graph")
+            rest = {k: v for k, v in block.items() if k != "@graph"}
+            if graph is not None:
+                nodes.extend(_flatten(graph))
+                if set(rest) - {"@context"}:
+                    nodes.append(rest)
+            else:
+                nodes.append(block)
+    return nodes
+
+
+def _is_low_priority(node: Dict[str, Any]) -> bool:
+    types = node.get("@type", [])
+    types = types if isinstance(types, list) else [types]
+    return bool(types) and all(str(t).lower() in _LOW_PRIORITY_TYPES for t in types)
+
+
+def normalize_json_ld(blocks: Any) -> List[Dict[str, Any]]:
+    """
+    Flattens @graph containers, drops @context and empty values, merges nodes
+    sharing an @id and removes exact duplicates. Business entities come
+    first, page scaffolding (WebSite, BreadcrumbList...) last.
+    """
+    by_id: Dict[str, Dict[str, Any]] = {}
+    seen = set()
+    nodes: List[Dict[str, Any]] = []
+    for node in _flatten(blocks):
+        node = _compact(node)
+        if not node or set(node) <= {"@id", "@type"}:
+            continue
+        node_id = node.get("@id")
+        if isinstance(node_id, str):
+            if node_id in by_id:
+                for key, value in node.items():
+                    by_id[node_id].setdefault(key, value)
+                continue
+            by_id[node_id] = node
+        canonical = json.dumps(node, sort_keys=True, ensure_ascii=False)
+        if canonical in seen:
+            continue
+        seen.add(canonical)
+        nodes.append(node)
+    return sorted(nodes, key=_is_low_priority)
+
+
+def prune_web_results(web_context: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Keeps the fields the audit uses (title, url, content) of each Tavily result, plus the answer."""
+    items = []
+    if web_context.get("answer"):
+        items.append({"answer": web_context["answer"]})
+    seen = set()
+    for result in web_context.get("results", []):
+        item = {k: _compact(result[k]) for k in TAVILY_FIELDS if result.get(k)}
+        key = item.get("url") or item.get("content")
+        if not item or key in seen:
+            continue
+        seen.add(key)
+        items.append(item)
+    return items
+
+
+# ── Packing ──────────────────────────────────────────────────────────────────
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _pack_markdown(text: str, budget: int) -> str:
+    """Whole paragraphs while they fit, then a token-exact cut of the next one."""
+    tokenizer = get_tokenizer()
+    out, used = [], 0
+    for paragraph in re.split(r"\n{2,}", text.strip()):
+        n = tokenizer.count(paragraph) + 1
+        if used + n > budget:
+            rest = tokenizer.truncate(paragraph, budget - used - 1)
+            if rest:
+                out.append(rest)
+            break
+        out.append(paragraph)
+        used += n
+    return "\n\n".join(out)
+
+
+def _pack_items(items: List[Any], budget: int) -> str:
+    """A JSON list of whole items, in order, while they fit."""
+    kept, used = [], 2
+    for item in items:
+        n = count_tokens(_dumps(item)) + 1
+        if used + n > budget:
+            break
+        kept.append(item)
+        used += n
+    return _dumps(kept) if kept else ""
+
+
+def _pack_results(items: List[Dict[str, Any]], budget: int) -> str:
+    """
+    Shares the budget evenly across the web results (water-filling: short
+    results are kept whole, the rest split what is left), so every source
+    stays represented instead of the first ones taking everything.
+    """
+    sizes = [count_tokens(_dumps(item)) + 1 for item in items]
+    kept: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    left = budget - 2
+    order = sorted(range(len(items)), key=lambda i: sizes[i])
+    for position, i in enumerate(order):
+        share = left // (len(order) - position)
+        if sizes[i] <= share:
+            kept[i], used = items[i], sizes[i]
+        elif share > 20:
+            kept[i] = _shorten_result(items[i], share - 1)
+            used = count_tokens(_dumps(kept[i])) + 1
+        else:
+            used = 0
+        left -= used
+    kept = [item for item in kept if item is not None]
+    return _dumps(kept) if kept else ""
+
+
+def _shorten_result(item: Dict[str, Any], budget: int) -> Dict[str, Any]:
+    item = dict(item)
+    field = "content" if "content" in item else "answer"
+    if field in item:
+        fixed = count_tokens(_dumps({k: v for k, v in item.items() if k != field})) + 4
+        item[field] = get_tokenizer().truncate(item[field], max(budget - fixed, 0))
+    return item
+
+
+def allocate(demands: Dict[str, int], budget: int, shares: Dict[str, float] = SECTION_SHARES) -> Dict[str, int]:
+    """
+    Splits `budget` across sections: each first gets min(demand, share of the
+    budget), then the leftover goes to unmet sections in priority order.
+    """
+    grants = {name: min(demands.get(name, 0), int(budget * share)) for name, share in shares.items()}
+    left = budget - sum(grants.values())
+    for name in shares:
+        extra = min(left, demands.get(name, 0) - grants[name])
+        if extra > 0:
+            grants[name] += extra
+            left -= extra
+    return grants
+
+
+def pack_context(
+    markdown: str,
+    structured_data: Any,
+    web_context: Dict[str, Any],
+    budget: int = PROMPT_BUDGET,
+) -> Dict[str, Any]:
+    """
+    Fits the prompt context into `budget` tokens. Returns the packed text of
+    each section and a per-section report (original tokens, allotted budget,
+    tokens used, whether it was truncated).
+    """
+    json_ld = normalize_json_ld(structured_data)
+    results = prune_web_results(web_context)
+    raw = {
+        "markdown": markdown.strip(),
+        "structured_data": _dumps(json_ld) if json_ld else "",
+        "web_results": _dumps(results) if results else "",
+    }
+    demands = {name: count_tokens(text) for name, text in raw.items()}
+    grants = allocate(demands, budget)
+
+    packed = {
+        "markdown": raw["markdown"] if demands["markdown"] <= grants["markdown"]
+        else _pack_markdown(raw["markdown"], grants["markdown"]),
+        "structured_data": raw["structured_data"] if demands["structured_data"] <= grants["structured_data"]
+        else _pack_items(json_ld, grants["structured_data"]),
+        "web_results": raw["web_results"] if demands["web_results"] <= grants["web_results"]
+        else _pack_results(results, grants["web_results"]),
+    }
+    report = {}
+    for name, text in packed.items():
+        report[name] = {
+            "original": count_tokens(
+                str(structured_data) if name == "structured_data"
+                else str(web_context) if name == "web_results" else markdown
+            ),
+            "normalized": demands[name],
+            "budget": grants[name],
+            "used": count_tokens(text),
+            "truncated": demands[name] > grants[name],
+        }
+    report["total"] = {
+        "budget": budget,
+        "used": sum(r["used"] for r in report.values()),
+        "original": sum(r["original"] for r in report.values()),
+    }
+    return {**packed, "tokens": report}
@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional
+
+from url_utils import normalize_url
+from settings import cache_path, process_singleton
+
+
+# ─── Crawl cache settings (overridable from the .env) ────────────────────────
+CRAWL_CACHE_ENABLED = os.getenv("GEO_CRAWL_CACHE", "1") != "0"
+# Entries younger than the TTL are served without any network round trip;
+# older ones are revalidated with a conditional GET.
+CRAWL_CACHE_TTL = float(os.getenv("GEO_CRAWL_CACHE_TTL", "3600"))
+CRAWL_CACHE_MAX_AGE = float(os.getenv("GEO_CRAWL_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+CRAWL_CACHE_MAX_MB = float(os.getenv("GEO_CRAWL_CACHE_MAX_MB", "256"))
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class CacheEntry:
+    """One cached page: its result_data, links and HTTP validators."""
+
+    def __init__(self, row: sqlite3.Row, ttl: float):
+        self.key = row["key"]
+        self.etag = row["etag"]
+        self.last_modified = row["last_modified"]
+        self.content_hash = row["content_hash"]
+        self.result_data: Dict[str, Any] = json.loads(row["result_json"])
+        self.links: List[str] = json.loads(row["links_json"])
+        self.stored_at = row["stored_at"]
+        self.fresh = time.time() - self.stored_at < ttl
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class CrawlCache:
+    """
+    On-disk (SQLite) cache of crawled pages keyed by normalised URL.
+
+    Stores the result_data (markdown, JSON-LD, metadata), the page links,
+    the ETag / Last-Modified validators and a hash of the raw HTML, with a
+    freshness TTL and a total-size bound enforced by LRU eviction.
+    """
+
+    def __init__(
+        self,
+        path: str = cache_path("crawl_cache.sqlite"),
+        ttl: float = CRAWL_CACHE_TTL,
+        max_age: float = CRAWL_CACHE_MAX_AGE,
+        max_bytes: int = int(CRAWL_CACHE_MAX_MB * 1024 * 1024),
+    ):
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS crawl_cache (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                result_json TEXT,
+                links_json TEXT,
+                size INTEGER,
+                stored_at REAL,
+                accessed_at REAL
+            )"""
+        )
+        self._db.commit()
+        self.counters = {"hits": 0, "misses": 0, "not_modified": 0, "unchanged": 0, "changed": 0, "evictions": 0}
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(normalize_url(url).encode()).hexdigest()
+
+    def _count(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """Returns the cached entry (fresh or stale), counting hits and misses."""
+        key = self.key(url)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT * FROM crawl_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row["stored_at"] > self.max_age:
+                self._db.execute("DELETE FROM crawl_cache WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            if row is None:
+                self._count("misses")
+                return None
+            self._db.execute("UPDATE crawl_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        entry = CacheEntry(row, self.ttl)
+        if entry.fresh:
+            with self._lock:
+                self._count("hits")
+        return entry
+
+    def revalidated(self, entry: CacheEntry, not_modified: bool):
+        """The origin confirmed the page is unchanged (304 or same content hash)."""
+        with self._lock:
+            self._count("not_modified" if not_modified else "unchanged")
+            self._db.execute("UPDATE crawl_cache SET stored_at = ? WHERE key = ?", (time.time(), entry.key))
+            self._db.commit()
+
+    def store(
+        self,
+        url: str,
+        result_data: Dict[str, Any],
+        links: List[str],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        body_hash: Optional[str] = None,
+        replaced: Optional[CacheEntry] = None,
+    ):
+        result_json = json.dumps(result_data, ensure_ascii=False, default=str)
+        links_json = json.dumps(links)
+        now = time.time()
+        with self._lock:
+            if replaced is not None:
+                self._count("changed")
+            self._db.execute(
+                "INSERT OR REPLACE INTO crawl_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.key(url), normalize_url(url), etag, last_modified, body_hash,
+                 result_json, links_json, len(result_json) + len(links_json), now, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM crawl_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM crawl_cache ORDER BY accessed_at").fetchall()
+        evicted = []
+        for row in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((row["key"],))
+            total -= row["size"]
+        self._db.executemany("DELETE FROM crawl_cache WHERE key = ?", evicted)
+        self._count("evictions", len(evicted))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM crawl_cache")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM crawl_cache"
+            ).fetchone()
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["misses"] + counters["not_modified"] + counters["unchanged"] + counters["changed"]
+        served = counters["hits"] + counters["not_modified"] + counters["unchanged"]
+        return {
+            "entries": entries,
+            "size_mb": round(size / (1024 * 1024), 2),
+            **counters,
+            "revalidations": counters["not_modified"] + counters["unchanged"] + counters["changed"],
+            "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+        }
+
+
+# ── Process-wide cache ───────────────────────────────────────────────────────
+
+@process_singleton
+def get_crawl_cache() -> CrawlCache:
+    return CrawlCache()
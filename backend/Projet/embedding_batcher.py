@@ -0,0 +1,175 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Dict, Any, List, Callable, Optional
+
+import numpy as np
+
+from model_registry import get_embedding_model
+from metrics import track
+from settings import process_singleton
+
+
+# ─── Batching settings (overridable from the .env) ───────────────────────────
+BATCH_WINDOW_MS = float(os.getenv("GEO_EMBED_BATCH_WINDOW_MS", "10"))
+MAX_BATCH_SIZE = int(os.getenv("GEO_EMBED_MAX_BATCH", "64"))
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class _EncodeRequest:
+    __slots__ = ("texts", "future", "enqueued_at")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class EmbeddingBatcher:
+    """
+    Cross-request micro-batcher for the embedding model.
+
+    Encode requests from every in-flight audit (whatever thread or event loop
+    they run on) are queued; a dedicated worker thread waits at most
+    `window_ms` after the first request, or until `max_batch_size` texts are
+    queued, then runs ONE forward pass and resolves each caller's future
+    with its own rows.
+    """
+
+    def __init__(
+        self,
+        model_getter: Callable[[], Any] = get_embedding_model,
+        window_ms: float = BATCH_WINDOW_MS,
+        max_batch_size: int = MAX_BATCH_SIZE,
+    ):
+        self.model_getter = model_getter
+        self.window = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue: "queue.Queue[_EncodeRequest]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._texts = 0
+        self._fill_sum = 0.0
+        self._waits_ms = deque(maxlen=2000)
+        self._forward_ms = deque(maxlen=2000)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    def submit(self, texts: List[str]) -> concurrent.futures.Future:
+        """Queues `texts`; the future resolves to an array of shape (len(texts), dim)."""
+        self._ensure_started()
+        request = _EncodeRequest(list(texts))
+        self._queue.put(request)
+        return request.future
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Blocking encode through the batcher (for synchronous callers)."""
+        return self.submit(texts).result()
+
+    async def aencode(self, texts: List[str]) -> np.ndarray:
+        """Encode through the batcher without blocking the caller's event loop."""
+        return await asyncio.wrap_future(self.submit(texts))
+
+    # ── Worker ───────────────────────────────────────────────────────────────
+
+    def _collect(self) -> List[_EncodeRequest]:
+        # Requests cancelled while queued (stage timeout, failed sibling
+        # stage) are dropped; the others can no longer be cancelled
+        batch, size = [], 0
+        deadline = None
+        while size < self.max_batch_size:
+            if deadline is None:
+                request = self._queue.get()
+            else:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if not request.future.set_running_or_notify_cancel():
+                continue
+            if deadline is None:
+                deadline = time.perf_counter() + self.window
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._encode_batch(batch)
+            except Exception as e:
+                # One bad batch must not end the only worker thread
+                print(f"Embedding batcher: batch of {len(batch)} request(s) failed: {type(e).__name__}: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _encode_batch(self, batch: List[_EncodeRequest]):
+        texts = [text for request in batch for text in request.texts]
+        started = time.perf_counter()
+        with track("embeddings"):
+            vectors = self.model_getter().encode(
+                texts, batch_size=self.max_batch_size, convert_to_numpy=True
+            )
+        forward_ms = (time.perf_counter() - started) * 1000
+
+        offset = 0
+        for request in batch:
+            n = len(request.texts)
+            request.future.set_result(vectors[offset:offset + n])
+            offset += n
+        self._record(batch, len(texts), started, forward_ms)
+
+    def _record(self, batch: List[_EncodeRequest], n_texts: int, started: float, forward_ms: float):
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._texts += n_texts
+            self._fill_sum += min(1.0, n_texts / self.max_batch_size)
+            self._waits_ms.extend((started - r.enqueued_at) * 1000 for r in batch)
+            self._forward_ms.append(forward_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            waits = sorted(self._waits_ms)
+            batches = self._batches
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch_size": self.max_batch_size,
+                "batches": batches,
+                "requests": self._requests,
+                "texts": self._texts,
+                "queued": self._queue.qsize(),
+                "requests_per_batch": round(self._requests / batches, 2) if batches else 0.0,
+                "mean_batch_fill": round(self._fill_sum / batches, 4) if batches else 0.0,
+                "queue_wait_ms_p50": round(waits[len(waits) // 2], 2) if waits else 0.0,
+                "queue_wait_ms_p95": round(waits[int(len(waits) * 0.95)], 2) if waits else 0.0,
+                "forward_ms_mean": round(sum(self._forward_ms) / len(self._forward_ms), 2) if self._forward_ms else 0.0,
+            }
+
+
+# ── Process-wide batcher ─────────────────────────────────────────────────────
+
+@process_singleton
+def get_embedding_batcher() -> EmbeddingBatcher:
+    return EmbeddingBatcher()
@@ -0,0 +1,225 @@
+import os
+import re
+import sqlite3
+import asyncio
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable
+
+import numpy as np
+
+from model_registry import embedding_model_id
+from settings import cache_path, process_singleton
+
+
+# ─── Embedding cache settings (overridable from the .env) ────────────────────
+EMBEDDING_CACHE_ENABLED = os.getenv("GEO_EMBED_CACHE", "1") != "0"
+MEMORY_CAPACITY = int(os.getenv("GEO_EMBED_CACHE_MEMORY", "20000"))
+# Vectors live in fixed-size float16 segment files that are never resized,
+# so other processes can keep them memory-mapped (also on Windows).
+SEGMENT_ROWS = 16384
+# ─────────────────────────────────────────────────────────────────────────────
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WS.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def text_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class _DiskTier:
+    """
+    Hash index (SQLite, WAL) + memory-mapped float16 vector segments.
+
+    Writers allocate rows inside a `BEGIN IMMEDIATE` transaction, write and
+    flush the vectors, and only then commit the index rows: a reader in any
+    uvicorn worker never sees a key whose vector is not on disk yet.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._db = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._segments: Dict[int, np.memmap] = {}
+        self.dim: Optional[int] = self._meta("dim")
+
+    def _meta(self, name: str) -> Optional[int]:
+        row = self._db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _segment(self, index: int, create: bool = False) -> Optional[np.memmap]:
+        segment = self._segments.get(index)
+        if segment is not None:
+            return segment
+        path = os.path.join(self.directory, f"vectors-{index:05d}.f16")
+        if not os.path.exists(path):
+            if not create:
+                return None
+            segment = np.memmap(path, dtype=np.float16, mode="w+", shape=(SEGMENT_ROWS, self.dim))
+        else:
+            segment = np.memmap(path, dtype=np.float16, mode="r+", shape=(SEGMENT_ROWS, self.dim))
+        self._segments[index] = segment
+        return segment
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if not keys or self.dim is None:
+            return {}
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT key, row FROM vectors WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for key, row in rows:
+                segment = self._segment(row // SEGMENT_ROWS)
+                if segment is not None:
+                    found[key] = np.asarray(segment[row % SEGMENT_ROWS], dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            if self.dim is None:
+                self.dim = self._meta("dim") or len(next(iter(items.values())))
+                self._db.execute("INSERT OR IGNORE INTO meta VALUES ('dim', ?)", (self.dim,))
+            placeholders = ",".join("?" * len(items))
+            existing = {k for (k,) in self._db.execute(
+                f"SELECT key FROM vectors WHERE key IN ({placeholders})", list(items)
+            )}
+            new = [(k, v) for k, v in items.items() if k not in existing and len(v) == self.dim]
+            next_row = self._meta("next_row") or 0
+            touched = set()
+            for offset, (_, vector) in enumerate(new):
+                row = next_row + offset
+                segment = self._segment(row // SEGMENT_ROWS, create=True)
+                segment[row % SEGMENT_ROWS] = vector.astype(np.float16)
+                touched.add(row // SEGMENT_ROWS)
+            for index in touched:
+                self._segments[index].flush()
+            self._db.executemany(
+                "INSERT INTO vectors VALUES (?, ?)", [(k, next_row + i) for i, (k, _) in enumerate(new)]
+            )
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('next_row', ?)", (next_row + len(new),))
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by (model name, hash of normalised text):
+    an in-memory LRU in front of a memory-mapped float16 store on disk that
+    several uvicorn workers can share. Lookups are batched: `encode` only
+    sends the misses to the model.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        directory: Optional[str] = None,
+        memory_capacity: int = MEMORY_CAPACITY,
+    ):
+        # Default: the model as loaded (an onnx-int8 fallback to torch caches as torch)
+        model_name = model_name or embedding_model_id()
+        self.model_name = model_name
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self._disk = _DiskTier(directory or cache_path("embeddings", safe_name))
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.memory_capacity = memory_capacity
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_capacity:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for `texts` (None where missing), memory tier first."""
+        keys = [text_key(self.model_name, t) for t in texts]
+        with self._lock:
+            found = {}
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.counters["memory_hits"] += len(found)
+            missing = [k for k in dict.fromkeys(keys) if k not in found]
+            from_disk = self._disk.get_many(missing)
+            for key, vector in from_disk.items():
+                self._remember(key, vector)
+            self.counters["disk_hits"] += len(from_disk)
+            found.update(from_disk)
+            self.counters["misses"] += len([k for k in missing if k not in from_disk])
+        return [found.get(k) for k in keys]
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        items = {text_key(self.model_name, t): np.asarray(v, dtype=np.float32) for t, v in zip(texts, vectors)}
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            self._disk.put_many(items)
+
+    def _assemble(self, texts, cached, missing_idx, computed) -> np.ndarray:
+        if len(missing_idx):
+            self.put_many([texts[i] for i in missing_idx], computed)
+            for i, vector in zip(missing_idx, computed):
+                cached[i] = np.asarray(vector, dtype=np.float32)
+        return np.stack(cached) if cached else np.zeros((0, self._disk.dim or 0), dtype=np.float32)
+
+    def encode(self, texts: List[str], compute: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Embeds `texts`, calling `compute` once with only the cache misses."""
+        cached = self.get_many(texts)
+        missing_idx = [i for i, v in enumerate(cached) if v is None]
+        computed = compute([texts[i] for i in missing_idx]) if missing_idx else []
+        return self._assemble(texts, cached, missing_idx, computed)
+
+    async def aencode(self, texts: List[str], acompute) -> np.ndarray:
+        """
+        Async variant of `encode` (`acompute` is a coroutine function). The
+        lookups and stores (SQLite, possibly waiting on another worker's write
+        lock, memmap writes and flushes) run in a worker thread, off the
+        caller's event loop.
+        """
+        cached = await asyncio.to_thread(self.get_many, texts)
+        missing_idx = [i for i, v in enumerate(cached) if v is None]
+        computed = await acompute([texts[i] for i in missing_idx]) if missing_idx else []
+        return await asyncio.to_thread(self._assemble, texts, cached, missing_idx, computed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            lookups = sum(counters.values())
+            return {
+                "model": self.model_name,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk.count(),
+                **counters,
+                "hit_ratio": round((counters["memory_hits"] + counters["disk_hits"]) / lookups, 4) if lookups else 0.0,
+            }
+
+
+# ── Process-wide cache ───────────────────────────────────────────────────────
+
+@process_singleton
+def get_embedding_cache() -> EmbeddingCache:
+    return EmbeddingCache()
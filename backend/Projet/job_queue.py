@@ -0,0 +1,646 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from metrics import JOB_SECONDS, RETRIES
+from settings import cache_path, process_singleton
+
+
+# ─── Job queue settings (overridable from the .env) ──────────────────────────
+JOB_DB_PATH = os.getenv("GEO_JOB_DB", cache_path("jobs.sqlite"))
+JOB_WORKERS = int(os.getenv("GEO_JOB_WORKERS", "2"))            # audits running at the same time
+JOB_QUEUE_MAX = int(os.getenv("GEO_JOB_QUEUE_MAX", "50"))       # queued jobs before submit() refuses
+JOB_RETRIES = int(os.getenv("GEO_JOB_RETRIES", "2"))            # default for background job kinds
+JOB_BACKOFF = float(os.getenv("GEO_JOB_BACKOFF", "10"))         # seconds, doubled on every retry
+JOB_RETENTION = float(os.getenv("GEO_JOB_RETENTION", str(7 * 24 * 3600)))  # finished jobs kept this long
+# Single flight: a submission attaches to the unfinished job with the same key
+# if it was submitted less than WINDOW seconds ago, and (REUSE > 0) to one
+# that finished less than REUSE seconds ago
+COALESCE_WINDOW = float(os.getenv("GEO_COALESCE_WINDOW", "300"))
+COALESCE_REUSE = float(os.getenv("GEO_COALESCE_REUSE", "0"))
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Lower runs first: someone waiting on /audit goes ahead of webhook jobs
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+FINISHED = ("done", "failed")
+
+
+class QueueFull(Exception):
+    """Raised by submit() when JOB_QUEUE_MAX jobs of the same or higher priority are already waiting."""
+
+    def __init__(self, queued: int, retry_after: int):
+        super().__init__(f"Audit queue is full ({queued} jobs waiting), retry in {retry_after}s.")
+        self.queued = queued
+        self.retry_after = retry_after
+
+
+class JobKind:
+    """
+    A type of job. `handler(payload, on_event)` runs in a worker thread and
+    returns a JSON-serializable result. Failures are retried `retries` times
+    with exponential backoff, except ValueError (bad input). `on_failure
+    (payload, job)` is called once a job has failed for good. Jobs of a non
+    `resumable` kind that a restart interrupted are failed instead of rerun
+    (nobody is waiting for them anymore). `progress(state, event)` folds the
+    handler events into the job's progress (returns None when an event
+    changes nothing), stored with the job while it runs.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Dict[str, Any], Callable[[Dict[str, Any]], None]], Any],
+        retries: int = JOB_RETRIES,
+        resumable: bool = True,
+        on_failure: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+        progress: Optional[Callable[[Optional[Dict[str, Any]], Dict[str, Any]], Optional[Dict[str, Any]]]] = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.retries = retries
+        self.resumable = resumable
+        self.on_failure = on_failure
+        self.progress = progress
+
+    def covers(self, other: "JobKind") -> bool:
+        """True if a job of this kind gives `other`'s submitters all they rely on (same work, retries, restarts)."""
+        return (
+            self.handler == other.handler
+            and self.retries >= other.retries
+            and (self.resumable or not other.resumable)
+        )
+
+
+class JobQueue:
+    """
+    In-process job scheduler with a fixed number of worker threads, backed by
+    SQLite so queued work survives a restart. Jobs are picked by priority,
+    then submission order; the number of queued jobs is bounded (QueueFull).
+
+    Subscribers of a job receive its events from the worker thread: the
+    handler's own events (e.g. audit stages) and a final {"event": "job",
+    "job": ...} once it is done or failed. Consumers are persistent: a
+    registered consumer attached to a job is called (in its own thread) with
+    the job when it starts running and when it is done or failed, also
+    across restarts.
+    """
+
+    def __init__(
+        self,
+        path: str = JOB_DB_PATH,
+        workers: int = JOB_WORKERS,
+        max_queued: int = JOB_QUEUE_MAX,
+        backoff: float = JOB_BACKOFF,
+        retention: float = JOB_RETENTION,
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.backoff = backoff
+        self.retention = retention
+        self.kinds: Dict[str, JobKind] = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT,
+                payload TEXT,
+                priority INTEGER,
+                status TEXT,
+                stage TEXT,
+                progress TEXT,
+                coalesce_key TEXT,
+                trace_id TEXT,
+                attempts INTEGER DEFAULT 0,
+                not_before REAL DEFAULT 0,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL,
+                result TEXT,
+                error_type TEXT,
+                error TEXT,
+                traceback TEXT
+            )"""
+        )
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column in ("progress", "coalesce_key", "trace_id"):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_pick ON jobs (status, priority, created_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_coalesce ON jobs (coalesce_key, created_at)")
+        # delivered: last job status the consumer was called with
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS job_consumers (
+                consumer TEXT,
+                data TEXT,
+                job_id TEXT,
+                delivered TEXT,
+                PRIMARY KEY (consumer, data)
+            )"""
+        )
+        self._db.commit()
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._subscribers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        self._progress: Dict[str, Dict[str, Any]] = {}
+        self._running = 0
+        self._job_seconds: Optional[float] = None     # moving average, for Retry-After
+        self.consumers: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], None]] = {}
+        self._consumer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-consumers")
+        self.counters = {
+            "submitted": 0, "rejected": 0, "retried": 0, "done": 0, "failed": 0, "recovered": 0,
+            "coalesced": 0, "reused": 0, "redelivered": 0,
+        }
+
+    # ── Registration / lifecycle ─────────────────────────────────────────────
+
+    def register(self, kind: JobKind):
+        self.kinds[kind.name] = kind
+
+    def register_consumer(self, name: str, fn: Callable[[Dict[str, Any], Dict[str, Any]], None]):
+        """
+        `fn(data, job)` is called when a job `name` is attached to starts, on
+        every progress change while it runs, and when it is done or failed.
+        """
+        self.consumers[name] = fn
+
+    @property
+    def started(self) -> bool:
+        return bool(self._threads)
+
+    def start(self):
+        """Resumes (or fails) the jobs a previous process left unfinished, then starts the workers."""
+        if self._threads:
+            return
+        with self._lock:
+            now = time.time()
+            rows = self._db.execute("SELECT id, kind, status FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+            for row in rows:
+                kind = self.kinds.get(row["kind"])
+                if kind is not None and kind.resumable:
+                    if row["status"] == "running":
+                        self._db.execute("UPDATE jobs SET status = 'queued', stage = NULL, progress = NULL WHERE id = ?", (row["id"],))
+                    self.counters["recovered"] += 1
+                else:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'failed', finished_at = ?, error_type = 'Interrupted', "
+                        "error = 'The server restarted before the job finished.' WHERE id = ?",
+                        (now, row["id"]),
+                    )
+            self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (now - self.retention,)
+            )
+            self._db.execute("DELETE FROM job_consumers WHERE job_id NOT IN (SELECT id FROM jobs)")
+            self._db.commit()
+            # Consumers the last process did not get to call with the final state
+            pending = self._db.execute(
+                "SELECT DISTINCT c.job_id FROM job_consumers c JOIN jobs j ON j.id = c.job_id "
+                "WHERE j.status IN ('done', 'failed') AND (c.delivered IS NULL OR c.delivered != j.status)"
+            ).fetchall()
+        if rows:
+            print(f"Job queue: {len(rows)} job(s) left by the last shutdown, {self.counters['recovered']} resumed")
+        for row in pending:
+            self._notify_consumers(row["job_id"])
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        """Stops taking jobs; running ones are requeued on the next start if they do not finish in time."""
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        # The consumer thread runs in order: this waits for the calls already queued
+        try:
+            self._consumer_pool.submit(lambda: None).result(timeout)
+        except Exception:
+            pass
+
+    # ── Submission / inspection ──────────────────────────────────────────────
+
+    def submit(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        priority: int = PRIORITY_BACKGROUND,
+        job_id: Optional[str] = None,
+    ) -> str:
+        """
+        Queues a job and returns its id. Submitting an id that already exists
+        is a no-op (idempotent redelivery). Raises QueueFull on backpressure.
+        """
+        if kind not in self.kinds:
+            raise ValueError(f"Unknown job kind: {kind!r}")
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone():
+                return job_id
+            self._insert(job_id, kind, payload, priority)
+            self._db.commit()
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def _insert(self, job_id: str, kind: str, payload: Dict[str, Any], priority: int, coalesce_key: str = None):
+        """Adds a queued job (caller holds the lock and commits)."""
+        # Only the jobs that would run first count: a burst of background
+        # jobs does not lock interactive ones out
+        queued = self._db.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND priority <= ?", (priority,)
+        ).fetchone()[0]
+        if queued >= self.max_queued:
+            self.counters["rejected"] += 1
+            raise QueueFull(queued, self._retry_after(queued))
+        self._db.execute(
+            "INSERT INTO jobs (id, kind, payload, priority, status, coalesce_key, created_at) "
+            "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+            (job_id, kind, json.dumps(payload), priority, coalesce_key, time.time()),
+        )
+        self.counters["submitted"] += 1
+
+    def submit_coalesced(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        key: str,
+        priority: int = PRIORITY_BACKGROUND,
+        subscriber: Optional[Callable[[Dict[str, Any]], None]] = None,
+        consumer: Optional[Tuple[str, Dict[str, Any]]] = None,
+        window: float = COALESCE_WINDOW,
+        reuse: float = COALESCE_REUSE,
+    ) -> Tuple[str, str]:
+        """
+        Single-flight submit: instead of queuing a new job, attaches to the
+        unfinished job with the same `key` submitted less than `window`
+        seconds ago, or to one done less than `reuse` seconds ago. An
+        interactive submission moves a queued job up to its priority. An
+        unfinished job of a weaker kind (fewer retries, not resumable) is
+        upgraded to the caller's kind, so attaching never loses the retries
+        or the restart recovery the caller asked for; if neither kind covers
+        the other, a new job is queued.
+        `subscriber` and `consumer` (name, data) are attached in the same
+        step, so they cannot miss the end of the job; a consumer already
+        attached to a job (redelivery) gets that job back.
+
+        Returns (job id, "new" | "coalesced" | "reused" | "redelivered").
+        """
+        if kind not in self.kinds:
+            raise ValueError(f"Unknown job kind: {kind!r}")
+        consumer_data = json.dumps(consumer[1], sort_keys=True) if consumer else None
+        with self._lock:
+            now = time.time()
+            row = None
+            if consumer:
+                row = self._db.execute(
+                    "SELECT j.id, j.kind, j.status, j.priority FROM job_consumers c JOIN jobs j ON j.id = c.job_id "
+                    "WHERE c.consumer = ? AND c.data = ?",
+                    (consumer[0], consumer_data),
+                ).fetchone()
+                how = "redelivered"
+            if row is None:
+                row = self._db.execute(
+                    "SELECT id, kind, status, priority FROM jobs WHERE coalesce_key = ? AND "
+                    "((status IN ('queued', 'running') AND created_at >= ?) OR (status = 'done' AND finished_at >= ?)) "
+                    "ORDER BY created_at DESC LIMIT 1",
+                    (key, now - window, now - reuse if reuse > 0 else now + 1),
+                ).fetchone()
+                how = "reused" if row is not None and row["status"] == "done" else "coalesced"
+                if row is not None and how == "coalesced":
+                    current = self.kinds.get(row["kind"])
+                    if current is None or not (current.covers(self.kinds[kind]) or self.kinds[kind].covers(current)):
+                        row = None
+            if row is None:
+                job_id, status, how = uuid.uuid4().hex, "queued", "new"
+                self._insert(job_id, kind, payload, priority, key)
+            else:
+                job_id, status = row["id"], row["status"]
+                self.counters[how] += 1
+                if status == "queued" and priority < row["priority"]:
+                    self._db.execute("UPDATE jobs SET priority = ? WHERE id = ?", (priority, job_id))
+                current = self.kinds.get(row["kind"])
+                if status in ("queued", "running") and current is not None and current is not self.kinds[kind] \
+                        and self.kinds[kind].covers(current):
+                    # A running job picks the new kind up when it fails (see _execute)
+                    self._db.execute("UPDATE jobs SET kind = ? WHERE id = ?", (kind, job_id))
+            if subscriber is not None:
+                self._subscribers.setdefault(job_id, []).append(subscriber)
+            if consumer and how != "redelivered":
+                self._db.execute(
+                    "INSERT OR REPLACE INTO job_consumers (consumer, data, job_id, delivered) VALUES (?, ?, ?, NULL)",
+                    (consumer[0], consumer_data, job_id),
+                )
+            self._db.commit()
+        if how == "new":
+            with self._wakeup:
+                self._wakeup.notify()
+        elif consumer and status != "queued":
+            self._notify_consumers(job_id)
+        return job_id, how
+
+    def _retry_after(self, queued: int) -> int:
+        seconds = (self._job_seconds or 60.0) * (queued + 1) / max(self.workers, 1)
+        return max(1, int(seconds))
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        for field in ("result", "progress"):
+            job[field] = json.loads(job[field]) if job.get(field) is not None else None
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Number of queued jobs that will run before this one (None if it is not queued)."""
+        with self._lock:
+            row = self._db.execute("SELECT status, priority, created_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] != "queued":
+                return None
+            return self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND "
+                "(priority < ? OR (priority = ? AND created_at < ?))",
+                (row["priority"], row["priority"], row["created_at"]),
+            ).fetchone()[0]
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs first, without their results."""
+        query = ("SELECT id, kind, payload, priority, status, stage, attempts, created_at, started_at, "
+                 "finished_at, error_type, error, trace_id FROM jobs")
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY created_at DESC LIMIT ?", params + (limit,)).fetchall()
+        return [{**dict(row), "payload": json.loads(row["payload"])} for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_status = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = self._db.execute("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            running = self._running
+            counters = dict(self.counters)
+        runs_saved = counters["coalesced"] + counters["reused"] + counters["redelivered"]
+        return {
+            "workers": self.workers,
+            "running": running,
+            "queued": by_status.get("queued", 0),
+            "capacity": self.max_queued,
+            "oldest_queued_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+            "avg_job_seconds": round(self._job_seconds, 2) if self._job_seconds else None,
+            "jobs": by_status,
+            **counters,
+            # Pipeline runs avoided by attaching to an in-flight / recent job
+            "runs_saved": runs_saved,
+            "seconds_saved": round(runs_saved * self._job_seconds, 1) if self._job_seconds else None,
+        }
+
+    # ── Events ───────────────────────────────────────────────────────────────
+
+    def subscribe(self, job_id: str, callback: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            self._subscribers.setdefault(job_id, []).append(callback)
+
+    def unsubscribe(self, job_id: str, callback: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            callbacks = self._subscribers.get(job_id, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if not callbacks:
+                self._subscribers.pop(job_id, None)
+
+    def _publish(self, job_id: str, event: Dict[str, Any]):
+        with self._lock:
+            callbacks = list(self._subscribers.get(job_id, []))
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Job queue: subscriber of {job_id} failed: {e}")
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Waits (without blocking the event loop) until the job is done or
+        failed and returns it; on timeout, returns its current state.
+        """
+        loop = asyncio.get_running_loop()
+        finished = loop.create_future()
+
+        def on_event(event: Dict[str, Any]):
+            if event.get("event") == "job":
+                loop.call_soon_threadsafe(lambda: finished.done() or finished.set_result(event["job"]))
+
+        self.subscribe(job_id, on_event)
+        try:
+            job = self.get(job_id)
+            if job is None or job["status"] in FINISHED:
+                return job
+            try:
+                return await asyncio.wait_for(finished, timeout)
+            except asyncio.TimeoutError:
+                return self.get(job_id)
+        finally:
+            self.unsubscribe(job_id, on_event)
+
+    def _notify_consumers(self, job_id: str):
+        """Calls the consumers of the job that have not seen its current status yet."""
+        job = self.get(job_id)
+        if job is None or job["status"] == "queued":
+            return
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT consumer, data FROM job_consumers WHERE job_id = ? AND (delivered IS NULL OR delivered != ?)",
+                (job_id, job["status"]),
+            ).fetchall()
+        for row in rows:
+            self._consumer_pool.submit(self._deliver, row["consumer"], row["data"], job)
+
+    def _notify_progress(self, job: Dict[str, Any], progress: Dict[str, Any]):
+        """Progress updates are best effort: not recorded, nor delivered again."""
+        with self._lock:
+            rows = self._db.execute("SELECT consumer, data FROM job_consumers WHERE job_id = ?", (job["id"],)).fetchall()
+        for row in rows:
+            self._consumer_pool.submit(self._deliver, row["consumer"], row["data"], {**job, "progress": progress}, False)
+
+    def _deliver(self, consumer: str, data: str, job: Dict[str, Any], record: bool = True):
+        fn = self.consumers.get(consumer)
+        if fn is None:
+            return
+        try:
+            fn(json.loads(data), job)
+        except Exception as e:
+            # Left undelivered: a final state is delivered again on the next start
+            print(f"Job queue: consumer {consumer} failed on job {job['id']}: {type(e).__name__}: {e}")
+            return
+        if not record:
+            return
+        with self._lock:
+            self._db.execute(
+                "UPDATE job_consumers SET delivered = ? WHERE consumer = ? AND data = ?", (job["status"], consumer, data)
+            )
+            self._db.commit()
+
+    # ── Workers ──────────────────────────────────────────────────────────────
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Marks the next runnable job as running; returns it, or None."""
+        with self._lock:
+            now = time.time()
+            kinds = list(self.kinds)
+            if not kinds:
+                return None
+            row = self._db.execute(
+                f"SELECT * FROM jobs WHERE status = 'queued' AND not_before <= ? "
+                f"AND kind IN ({','.join('?' * len(kinds))}) ORDER BY priority, created_at LIMIT 1",
+                (now, *kinds),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ? WHERE id = ?",
+                (now, row["id"]),
+            )
+            self._db.commit()
+            self._running += 1
+        job = self._row_to_job(row)
+        job["attempts"] += 1
+        job["status"] = "running"
+        return job
+
+    def _next_due(self) -> float:
+        with self._lock:
+            due = self._db.execute("SELECT MIN(not_before) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        return 5.0 if due is None else min(max(due - time.time(), 0.05), 5.0)
+
+    def _worker(self):
+        while not self._stopping.is_set():
+            job = self._claim()
+            if job is None:
+                wait = self._next_due()
+                with self._wakeup:
+                    if not self._stopping.is_set():
+                        self._wakeup.wait(wait)
+                continue
+            try:
+                self._notify_consumers(job["id"])
+                self._execute(job)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._progress.pop(job["id"], None)
+
+    def _on_event(self, job: Dict[str, Any], event: Dict[str, Any]):
+        kind = self.kinds[job["kind"]]
+        updates = {}
+        if event.get("event") == "stage" and event.get("status") == "running":
+            updates["stage"] = event["stage"]
+        elif event.get("event") == "trace":
+            # Tracing id of the current attempt (see GET /traces/{trace_id})
+            updates["trace_id"] = event["trace_id"]
+        if kind.progress is not None:
+            progress = kind.progress(self._progress.get(job["id"]), event)
+            if progress is not None:
+                self._progress[job["id"]] = progress
+                updates["progress"] = json.dumps(progress, ensure_ascii=False, default=str)
+        if updates:
+            with self._lock:
+                self._db.execute(
+                    f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in updates)} WHERE id = ?",
+                    (*updates.values(), job["id"]),
+                )
+                self._db.commit()
+            if "progress" in updates:
+                self._notify_progress(job, json.loads(updates["progress"]))
+        self._publish(job["id"], event)
+
+    def _execute(self, job: Dict[str, Any]):
+        kind = self.kinds[job["kind"]]
+        start = time.perf_counter()
+        try:
+            result = kind.handler(job["payload"], lambda event: self._on_event(job, event))
+        except Exception as e:
+            JOB_SECONDS.labels(job["kind"], "error").observe(time.perf_counter() - start)
+            # The job may have been upgraded to a stronger kind while it ran
+            with self._lock:
+                row = self._db.execute("SELECT kind FROM jobs WHERE id = ?", (job["id"],)).fetchone()
+            if row is not None and row["kind"] in self.kinds:
+                job["kind"] = row["kind"]
+                kind = self.kinds[row["kind"]]
+            self._failed(job, kind, e, traceback.format_exc())
+            return
+        seconds = time.perf_counter() - start
+        JOB_SECONDS.labels(job["kind"], "done").observe(seconds)
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, result = ?, error_type = NULL, error = NULL, "
+                "traceback = NULL WHERE id = ?",
+                (time.time(), json.dumps(result, ensure_ascii=False, default=str), job["id"]),
+            )
+            self._db.commit()
+            self.counters["done"] += 1
+            self._job_seconds = seconds if self._job_seconds is None else 0.8 * self._job_seconds + 0.2 * seconds
+        self._notify_consumers(job["id"])
+        self._publish(job["id"], {"event": "job", "job": self.get(job["id"])})
+
+    def _failed(self, job: Dict[str, Any], kind: JobKind, error: Exception, trace: str):
+        retry = not isinstance(error, ValueError) and job["attempts"] <= kind.retries and not self._stopping.is_set()
+        with self._lock:
+            if retry:
+                delay = self.backoff * 2 ** (job["attempts"] - 1)
+                self._db.execute(
+                    "UPDATE jobs SET status = 'queued', stage = NULL, progress = NULL, not_before = ?, error_type = ?, error = ?, "
+                    "traceback = ? WHERE id = ?",
+                    (time.time() + delay, type(error).__name__, str(error), trace, job["id"]),
+                )
+                self.counters["retried"] += 1
+                RETRIES.labels("job", job["kind"]).inc()
+            else:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, error_type = ?, error = ?, traceback = ? "
+                    "WHERE id = ?",
+                    (time.time(), type(error).__name__, str(error), trace, job["id"]),
+                )
+                self.counters["failed"] += 1
+            self._db.commit()
+        if retry:
+            print(f"Job {job['id']} ({job['kind']}): attempt {job['attempts']} failed "
+                  f"({type(error).__name__}: {error}), retrying in {delay:.0f}s")
+            return
+        print(f"Job {job['id']} ({job['kind']}) failed: {type(error).__name__}: {error}")
+        failed = self.get(job["id"])
+        if kind.on_failure is not None:
+            try:
+                kind.on_failure(job["payload"], failed)
+            except Exception as e:
+                print(f"Job queue: on_failure of {job['id']} failed: {e}")
+        self._notify_consumers(job["id"])
+        self._publish(job["id"], {"event": "job", "job": failed})
+
+
+# ── Process-wide queue ───────────────────────────────────────────────────────
+
+@process_singleton
+def get_job_queue() -> JobQueue:
+    return JobQueue()
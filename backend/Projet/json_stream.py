@@ -0,0 +1,106 @@
+import json
+from typing import Dict, Any, List, Optional
+
+
+class JsonFieldStream:
+    """
+    Incremental parser for a streamed JSON object (e.g. LLM tokens).
+
+    feed() returns, for each chunk, the top-level fields that just became
+    complete ({"field", "value"}) and, for array fields, each element as
+    soon as it is complete ({"field", "index", "value"}). Text before the
+    opening brace (a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.done = False
+        self.expect = "key"          # key → colon → value
+        self.key: Optional[str] = None
+        self.key_start: Optional[int] = None
+        self.value_start: Optional[int] = None
+        self.in_array = False
+        self.item_start: Optional[int] = None
+        self.item_index = 0
+
+    def _value(self, start: int, end: int):
+        try:
+            return True, json.loads(self.buf[start:end])
+        except ValueError:
+            return False, None
+
+    def _field_done(self, events: List[Dict[str, Any]], end: int):
+        if self.key is not None and self.value_start is not None:
+            ok, value = self._value(self.value_start, end)
+            if ok:
+                events.append({"field": self.key, "value": value})
+        self.key = self.value_start = None
+        self.expect = "key"
+
+    def _item_done(self, events: List[Dict[str, Any]], end: int):
+        if self.item_start is not None:
+            ok, value = self._value(self.item_start, end)
+            if ok:
+                events.append({"field": self.key, "index": self.item_index, "value": value})
+            self.item_index += 1
+        self.item_start = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        events: List[Dict[str, Any]] = []
+        self.buf += chunk
+        while self.pos < len(self.buf) and not self.done:
+            i, c = self.pos, self.buf[self.pos]
+            self.pos += 1
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.expect == "key" and self.key_start is not None:
+                        self.key = json.loads(self.buf[self.key_start:i + 1])
+                        self.key_start = None
+                        self.expect = "colon"
+                continue
+
+            if self.depth == 0:
+                if c == "{":
+                    self.depth = 1
+                continue
+
+            if not c.isspace():
+                if self.depth == 1 and self.expect == "value" and self.value_start is None:
+                    self.value_start = i
+                if self.in_array and self.depth == 2 and self.item_start is None and c not in ",]":
+                    self.item_start = i
+
+            if c == '"':
+                self.in_string = True
+                if self.depth == 1 and self.expect == "key":
+                    self.key_start = i
+            elif c == ":" and self.depth == 1 and self.expect == "colon":
+                self.expect = "value"
+            elif c in "{[":
+                if self.depth == 1 and c == "[" and self.value_start == i:
+                    self.in_array, self.item_start, self.item_index = True, None, 0
+                self.depth += 1
+            elif c in "}]":
+                if self.in_array and self.depth == 2:
+                    self._item_done(events, i)
+                    self.in_array = False
+                self.depth -= 1
+                if self.depth == 0:
+                    self._field_done(events, i)
+                    self.done = True
+            elif c == ",":
+                if self.depth == 1:
+                    self._field_done(events, i)
+                elif self.in_array and self.depth == 2:
+                    self._item_done(events, i)
+        return events
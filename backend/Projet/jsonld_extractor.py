@@ -0,0 +1,242 @@
+import re
+import json
+import asyncio
+from html import unescape
+from html.parser import HTMLParser
+from typing import Dict, Any, List
+
+from static_fetch import extract_metadata
+
+# Regex scan instead of a DOM: we only need the <script type="application/ld+json">
+# bodies, so building a BeautifulSoup tree for the whole page is wasted work.
+_JSON_LD_RE = re.compile(
+    r"""<script\b[^>]*?\btype\s*=\s*["']?application/ld\+json["']?[^>]*>(.*?)</script\s*>""",
+    re.I | re.S,
+)
+_WRAPPERS_RE = re.compile(r"^\s*(?://\s*)?(?:<!--|<!\[CDATA\[)|(?://\s*)?(?:-->|\]\]>)\s*$")
+_ENTITY_RE = re.compile(r"&(?:#\d+|#x[0-9a-f]+|[a-z]+);", re.I)
+_decoder = json.JSONDecoder(strict=False)
+
+
+# ── Lenient JSON ─────────────────────────────────────────────────────────────
+
+def _strip_trailing_commas(text: str) -> str:
+    """Removes commas directly before } or ] outside of JSON strings."""
+    out: List[str] = []
+    in_string = escaped = False
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "}]":
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+        out.append(ch)
+    return "".join(out)
+
+
+def _decode_all(text: str) -> List[Any]:
+    """Decodes one or several concatenated JSON values; raises ValueError if none."""
+    values, pos, end = [], 0, len(text)
+    while pos < end:
+        while pos < end and (text[pos].isspace() or text[pos] == ";"):
+            pos += 1
+        if pos >= end:
+            break
+        value, pos = _decoder.raw_decode(text, pos)
+        values.append(value)
+    if not values:
+        raise ValueError("empty JSON-LD block")
+    return values
+
+
+def _unescape_strings(value: Any) -> Any:
+    """Decodes HTML entities left inside string values (&amp;, &#039;...)."""
+    if isinstance(value, str):
+        return unescape(value) if _ENTITY_RE.search(value) else value
+    if isinstance(value, list):
+        return [_unescape_strings(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _unescape_strings(v) for k, v in value.items()}
+    return value
+
+
+def parse_json_lenient(text: str) -> List[Any]:
+    """
+    Parses a JSON-LD script body, tolerating what CMSs commonly emit:
+    HTML comment / CDATA wrappers, raw control characters, entity-encoded
+    markup, trailing commas and several concatenated objects.
+    Returns the decoded values (usually one); raises ValueError if hopeless.
+    """
+    text = _WRAPPERS_RE.sub("", text.strip()).strip()
+    attempts = (
+        lambda t: t,
+        _strip_trailing_commas,
+        lambda t: unescape(t),
+        lambda t: _strip_trailing_commas(unescape(t)),
+    )
+    for fix in attempts:
+        try:
+            return [_unescape_strings(v) for v in _decode_all(fix(text))]
+        except ValueError:
+            continue
+    raise ValueError("invalid JSON-LD block")
+
+
+# ── Microdata ────────────────────────────────────────────────────────────────
+
+# Open elements a start tag implicitly closes when they are the innermost one:
+# block elements close a <p>, list items and table cells their siblings
+_IMPLIED_END = {
+    **{tag: {"p"} for tag in (
+        "address", "article", "aside", "blockquote", "div", "dl", "fieldset", "footer", "form", "h1", "h2",
+        "h3", "h4", "h5", "h6", "header", "main", "nav", "ol", "pre", "section", "table", "ul",
+    )},
+    "p": {"p"},
+    "li": {"li", "p"},
+    "dt": {"dt", "dd", "p"},
+    "dd": {"dt", "dd", "p"},
+    "tr": {"tr", "td", "th"},
+    "td": {"td", "th"},
+    "th": {"td", "th"},
+    "option": {"option"},
+    "optgroup": {"optgroup", "option"},
+}
+
+
+class _MicrodataParser(HTMLParser):
+    """
+    Streaming itemscope/itemprop collector: keeps a stack of open items only,
+    never a tree of the page.
+
+    Items and text properties are tied to the element that opened them, on a
+    stack of open tag names. An end tag closes its nearest open element and
+    everything opened inside it, so elements whose end tag HTML lets authors
+    omit (<p>, <li>, <td>, <option>...) cannot shift the items that follow.
+    """
+
+    _VALUE_ATTRS = {"meta": "content", "link": "href", "a": "href", "img": "src",
+                    "time": "datetime", "data": "value", "meter": "value"}
+    _VOID = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+             "param", "source", "track", "wbr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.items: List[Dict[str, Any]] = []
+        self.open: List[str] = []             # tag names of the open elements
+        self.stack: List[List[Any]] = []      # [item, level of the element that opened it]
+        self.text_prop = None                 # [item, prop, level, chunks]
+
+    def _add(self, item: Dict[str, Any], prop: str, value: Any):
+        if prop in item:
+            if not isinstance(item[prop], list):
+                item[prop] = [item[prop]]
+            item[prop].append(value)
+        else:
+            item[prop] = value
+
+    def _close_to(self, level: int):
+        """Closes the open elements above `level`, with their items and text properties."""
+        while len(self.open) > level:
+            closing = len(self.open)
+            if self.text_prop and self.text_prop[2] >= closing:
+                item, prop, _, chunks = self.text_prop
+                self._add(item, prop, " ".join("".join(chunks).split()))
+                self.text_prop = None
+            while self.stack and self.stack[-1][1] >= closing:
+                self.stack.pop()
+            self.open.pop()
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        implied = _IMPLIED_END.get(tag)
+        while implied and self.open and self.open[-1] in implied:
+            self._close_to(len(self.open) - 1)
+        if tag not in self._VOID:
+            self.open.append(tag)
+        level = len(self.open)
+        prop = attrs.get("itemprop")
+        parent = self.stack[-1][0] if self.stack else None
+
+        if "itemscope" in attrs:
+            item = {"@type": attrs.get("itemtype") or "Thing"}
+            if prop and parent is not None:
+                self._add(parent, prop, item)
+            elif not self.stack:
+                self.items.append(item)
+            if tag not in self._VOID:
+                self.stack.append([item, level])
+        elif prop and parent is not None:
+            attr = self._VALUE_ATTRS.get(tag)
+            if attr and attrs.get(attr) is not None:
+                self._add(parent, prop, attrs[attr].strip())
+            elif tag not in self._VOID:
+                self.text_prop = [parent, prop, level, []]
+
+    def handle_endtag(self, tag):
+        if tag in self._VOID:
+            return
+        # Nearest open element with that name; a stray end tag is ignored
+        for index in range(len(self.open) - 1, -1, -1):
+            if self.open[index] == tag:
+                self._close_to(index)
+                return
+
+    def handle_data(self, data):
+        if self.text_prop:
+            self.text_prop[3].append(data)
+
+    def close(self):
+        super().close()
+        self._close_to(0)
+
+
+def extract_microdata(html: str) -> List[Dict[str, Any]]:
+    """Top-level schema.org microdata items of the page (empty if none)."""
+    if "itemscope" not in html:
+        return []
+    parser = _MicrodataParser()
+    parser.feed(html)
+    parser.close()
+    return parser.items
+
+
+# ── Public API ───────────────────────────────────────────────────────────────
+
+def extract_json_ld(html: str) -> List[Any]:
+    """
+    Every <script type="application/ld+json"> block of the page, parsed
+    leniently. Blocks that cannot be repaired are skipped.
+    """
+    structured_data = []
+    for match in _JSON_LD_RE.finditer(html):
+        try:
+            structured_data.extend(parse_json_lenient(match.group(1)))
+        except ValueError:
+            continue
+    return structured_data
+
+
+def extract_structured_data(html: str) -> Dict[str, Any]:
+    """JSON-LD, microdata items and OpenGraph properties, without a DOM."""
+    return {
+        "json_ld": extract_json_ld(html),
+        "microdata": extract_microdata(html),
+        "opengraph": {k: v for k, v in extract_metadata(html).items() if k.startswith("og:")},
+    }
+
+
+async def aextract_structured_data(html: str) -> Dict[str, Any]:
+    """Same as extract_structured_data, in a worker thread to keep the loop free."""
+    return await asyncio.to_thread(extract_structured_data, html)
@@ -0,0 +1,122 @@
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Optional
+
+from prometheus_client import Counter, Histogram, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily
+
+from tracing import span
+
+try:
+    import psutil
+except ImportError:  # the Linux process collector of prometheus_client still reports the RSS
+    psutil = None
+
+
+# Prometheus metrics of the process, served by GET /metrics. Recording is a
+# lock and a few additions, so it stays on in production; it is thread-safe
+# and works the same from the worker threads and the pipeline event loops.
+
+# Seconds: from the static fetch of a page to a whole-site crawl or a Gemini answer
+_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "geo_stage_seconds", "Duration of an audit pipeline stage", ["stage", "status"], buckets=_BUCKETS,
+)
+DEPENDENCY_SECONDS = Histogram(
+    "geo_dependency_seconds", "Duration of a call to an upstream service or model "
+    "(tavily, gemini, compresr, embeddings, miro)", ["dependency"], buckets=_BUCKETS,
+)
+DEPENDENCY_ERRORS = Counter(
+    "geo_dependency_errors_total", "Failed calls to an upstream service or model", ["dependency", "error"],
+)
+RETRIES = Counter(
+    "geo_retries_total", "Retried pipeline stages and audit jobs", ["scope", "name"],
+)
+JOB_SECONDS = Histogram(
+    "geo_job_seconds", "Duration of an audit job, from its start to its end", ["kind", "status"], buckets=_BUCKETS,
+)
+
+
+@contextmanager
+def track(dependency: str):
+    """
+    Times the block as a call to `dependency` (histogram, and a tracing span
+    inside an audit); an exception counts as an error of that dependency.
+    """
+    start = time.perf_counter()
+    try:
+        with span(dependency):
+            yield
+    except (GeneratorExit, asyncio.CancelledError):
+        raise
+    except BaseException as e:
+        DEPENDENCY_ERRORS.labels(dependency, type(e).__name__).inc()
+        raise
+    finally:
+        DEPENDENCY_SECONDS.labels(dependency).observe(time.perf_counter() - start)
+
+
+def metered(dependency: str, fn: Callable) -> Callable:
+    """`fn` with every call tracked as a call to `dependency`."""
+    def call(*args, **kwargs):
+        with track(dependency):
+            return fn(*args, **kwargs)
+    return call
+
+
+# ── Gauges read at scrape time ───────────────────────────────────────────────
+
+class _CallbackGauge:
+    """A gauge whose value(s) `fn` returns when /metrics is scraped: a number, or {label value: number}."""
+
+    def __init__(self, name: str, documentation: str, fn: Callable[[], Any], label: Optional[str] = None):
+        self.name = name
+        self.documentation = documentation
+        self.fn = fn
+        self.label = label
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        try:
+            values = self.fn()
+        except Exception as e:
+            print(f"Metrics: reading {self.name} failed: {type(e).__name__}: {e}")
+            return
+        family = GaugeMetricFamily(self.name, self.documentation, labels=[self.label] if self.label else None)
+        if self.label:
+            for key, value in values.items():
+                if value is not None:
+                    family.add_metric([str(key)], float(value))
+        elif values is not None:
+            family.add_metric([], float(values))
+        yield family
+
+
+_gauges: Dict[str, _CallbackGauge] = {}
+_gauges_lock = threading.Lock()
+
+
+def gauge_callback(name: str, documentation: str, fn: Callable[[], Any], label: Optional[str] = None):
+    """Registers (or re-binds) a gauge computed by `fn` at scrape time."""
+    with _gauges_lock:
+        gauge = _gauges.get(name)
+        if gauge is None:
+            gauge = _gauges[name] = _CallbackGauge(name, documentation, fn, label)
+            REGISTRY.register(gauge)
+        else:
+            gauge.fn, gauge.label = fn, label
+
+
+if psutil is not None:
+    # Portable counterpart of process_resident_memory_bytes (Linux only)
+    gauge_callback("geo_process_rss_bytes", "Resident memory of the API process", lambda: psutil.Process().memory_info().rss)
+
+
+def render() -> tuple:
+    """The exposition text of every metric, and its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,171 @@
+import os
+import time
+import asyncio
+import threading
+import weakref
+from typing import Dict, Any, Callable, Optional
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+from tavily import TavilyClient
+from sentence_transformers import SentenceTransformer
+from compresr import CompressionClient
+
+from search_cache import SEARCH_CACHE_ENABLED, CachedTavilyClient
+from metrics import metered
+
+
+# ─── Model settings (overridable from the .env) ──────────────────────────────
+EMBEDDING_MODEL_NAME = os.getenv("GEO_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# "torch" (float32 SentenceTransformer) or "onnx-int8" (quantized, CPU-optimised)
+EMBEDDING_BACKEND = os.getenv("GEO_EMBEDDING_BACKEND", "torch")
+LLM_MODEL_NAME = os.getenv("GEO_LLM_MODEL", "gemini-2.5-flash-lite")
+LLM_TEMPERATURE = float(os.getenv("GEO_LLM_TEMPERATURE", "0"))
+# ─────────────────────────────────────────────────────────────────────────────
+
+_lock = threading.RLock()
+_instances: Dict[str, Any] = {}
+_load_seconds: Dict[str, float] = {}
+_ready = threading.Event()
+# Backend the embedding model was actually loaded with (onnx-int8 falls back to torch)
+_embedding_backend: Optional[str] = None
+# Async transports of the LLM client are bound to the loop that first used them
+_llms = weakref.WeakKeyDictionary()
+
+
+def _singleton(name: str, factory: Callable[[], Any]) -> Any:
+    """Builds `name` once per process, thread-safely, on first use."""
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    with _lock:
+        instance = _instances.get(name)
+        if instance is None:
+            start = time.perf_counter()
+            instance = factory()
+            _load_seconds[name] = round(time.perf_counter() - start, 3)
+            _instances[name] = instance
+        return instance
+
+
+def _load_embedding_model():
+    global _embedding_backend
+    if EMBEDDING_BACKEND == "onnx-int8":
+        try:
+            from quantized_backend import OnnxInt8Embedder
+            model = OnnxInt8Embedder(EMBEDDING_MODEL_NAME)
+            _embedding_backend = "onnx-int8"
+            return model
+        except ImportError as e:
+            print(f"Embeddings: {e}; using the torch backend")
+    elif EMBEDDING_BACKEND != "torch":
+        raise ValueError(f"Unknown GEO_EMBEDDING_BACKEND: {EMBEDDING_BACKEND!r}")
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    _embedding_backend = "torch"
+    return model
+
+
+def get_embedding_model():
+    """
+    The process-wide sentence embedding model, loaded lazily. Both backends
+    expose the same encode(texts, batch_size=..., convert_to_numpy=...) API.
+    """
+    return _singleton("embedding_model", _load_embedding_model)
+
+
+def embedding_model_id() -> str:
+    """
+    Identifies the vectors the model produces, from the backend it was
+    actually loaded with (loads it): cache keys must not mix backends.
+    """
+    get_embedding_model()
+    if _embedding_backend == "torch":
+        return EMBEDDING_MODEL_NAME
+    return f"{EMBEDDING_MODEL_NAME}@{_embedding_backend}"
+
+
+def _load_tavily_client():
+    client = TavilyClient(api_key=os.environ["TAVILY_API_KEY"])
+    # Upstream calls only: cache hits never reach the client
+    client.search = metered("tavily", client.search)
+    return CachedTavilyClient(client) if SEARCH_CACHE_ENABLED else client
+
+
+def get_tavily_client() -> TavilyClient:
+    """Tavily client, behind the on-disk search cache unless GEO_SEARCH_CACHE=0."""
+    return _singleton("tavily", _load_tavily_client)
+
+
+def get_compresr_client() -> CompressionClient:
+    return _singleton("compresr", lambda: CompressionClient(api_key=os.environ["COMPRESR_API_KEY"]))
+
+
+def get_llm() -> ChatGoogleGenerativeAI:
+    """The Gemini chat model, one long-lived instance per running event loop."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _singleton("llm", lambda: ChatGoogleGenerativeAI(model=LLM_MODEL_NAME, temperature=LLM_TEMPERATURE))
+    with _lock:
+        llm = _llms.get(loop)
+        if llm is None:
+            llm = ChatGoogleGenerativeAI(model=LLM_MODEL_NAME, temperature=LLM_TEMPERATURE)
+            _llms[loop] = llm
+        return llm
+
+
+async def close_llm():
+    """Closes the Gemini client of the running loop (call before closing the loop)."""
+    with _lock:
+        llm = _llms.pop(asyncio.get_running_loop(), None)
+    client = getattr(llm, "client", None)
+    if client is None:
+        return
+    aio = getattr(client, "aio", None)
+    if aio is not None and hasattr(aio, "aclose"):
+        await aio.aclose()
+    if hasattr(client, "close"):
+        client.close()
+
+
+def warmup():
+    """
+    Loads the embedding model and runs one encode so the first audit does not
+    pay for lazy initialisation, then builds the API clients. Blocking: call
+    it from a worker thread.
+    """
+    model = get_embedding_model()
+    start = time.perf_counter()
+    model.encode(["GEO Auditor warmup"], convert_to_numpy=True)
+    _load_seconds["embedding_warmup"] = round(time.perf_counter() - start, 3)
+    for factory in (get_tavily_client, get_compresr_client):
+        try:
+            factory()
+        except KeyError as e:
+            print(f"Model registry: missing API key {e}, client will be built on first use")
+    _ready.set()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def readiness() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "ready": _ready.is_set(),
+            # The configured backend until the model is loaded
+            "embedding_backend": _embedding_backend or EMBEDDING_BACKEND,
+            "embedding_backend_requested": EMBEDDING_BACKEND,
+            "loaded": sorted(_instances),
+            "load_seconds": dict(_load_seconds),
+        }
+
+
+def close_clients():
+    """Releases the network resources of the shared clients (process shutdown)."""
+    tavily = _instances.get("tavily")
+    if tavily is not None:
+        try:
+            tavily.close()
+        except Exception:
+            pass
@@ -0,0 +1,128 @@
+import os
+import sys
+import asyncio
+import threading
+import concurrent.futures
+from typing import Dict, Any, List, Optional, Coroutine
+
+from static_fetch import close_http_client
+from model_registry import close_llm
+from settings import process_singleton
+
+
+# ─── Pipeline runtime settings (overridable from the .env) ───────────────────
+PIPELINE_LOOPS = int(os.getenv("GEO_PIPELINE_LOOPS", "1"))
+USE_UVLOOP = os.getenv("GEO_PIPELINE_UVLOOP", "1") != "0"
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop for the pipeline threads: ProactorEventLoop on Windows
+    (Playwright spawns Chromium through subprocess pipes), uvloop on Linux /
+    macOS when it is installed, the default selector loop otherwise.
+    """
+    if sys.platform == "win32":
+        return asyncio.ProactorEventLoop()
+    if USE_UVLOOP:
+        try:
+            import uvloop
+            return uvloop.new_event_loop()
+        except ImportError:
+            pass
+    return asyncio.new_event_loop()
+
+
+class _LoopThread:
+    def __init__(self, index: int):
+        self.loop = new_event_loop()
+        self.in_flight = 0
+        self.completed = 0
+        self.thread = threading.Thread(target=self.loop.run_forever, name=f"pipeline-loop-{index}", daemon=True)
+        self.thread.start()
+
+
+class PipelineRuntime:
+    """
+    Long-lived event loops (one thread each) on which the audits run. The
+    loop-bound resources (pooled httpx client, Gemini client, browser pool)
+    are created once per loop and reused by every audit, instead of a new
+    loop being built and torn down for each request.
+
+    Coroutines are submitted from any thread and go to the least busy loop.
+    """
+
+    def __init__(self, loops: int = PIPELINE_LOOPS):
+        self.size = max(1, loops)
+        self._threads: List[_LoopThread] = []
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return bool(self._threads)
+
+    def start(self):
+        with self._lock:
+            if not self._threads:
+                self._threads = [_LoopThread(i) for i in range(self.size)]
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The first loop, home of the process-wide loop-bound resources (browser pool)."""
+        self.start()
+        return self._threads[0].loop
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Schedules `coro` on the least busy loop; returns a thread-safe future."""
+        self.start()
+        with self._lock:
+            worker = min(self._threads, key=lambda t: t.in_flight)
+            worker.in_flight += 1
+        future = asyncio.run_coroutine_threadsafe(coro, worker.loop)
+
+        def done(_):
+            with self._lock:
+                worker.in_flight -= 1
+                worker.completed += 1
+
+        future.add_done_callback(done)
+        return future
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Runs `coro` on the runtime and blocks the calling thread for its result."""
+        return self.submit(coro).result(timeout)
+
+    async def arun(self, coro: Coroutine) -> Any:
+        """Runs `coro` on the runtime and awaits it from another event loop."""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def stop(self, timeout: float = 10.0):
+        """Closes the per-loop HTTP and Gemini clients, then stops every loop."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for worker in threads:
+            for name, close in (("HTTP client", close_http_client), ("Gemini client", close_llm)):
+                try:
+                    asyncio.run_coroutine_threadsafe(close(), worker.loop).result(timeout)
+                except Exception as e:
+                    print(f"Pipeline runtime: closing the {name} failed: {e}")
+            worker.loop.call_soon_threadsafe(worker.loop.stop)
+            worker.thread.join(timeout)
+            worker.loop.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            threads = list(self._threads)
+            return {
+                "loops": len(threads),
+                "loop_type": type(threads[0].loop).__module__ + "." + type(threads[0].loop).__name__ if threads else None,
+                "in_flight": [t.in_flight for t in threads],
+                "completed": sum(t.completed for t in threads),
+            }
+
+
+# ── Process-wide runtime ─────────────────────────────────────────────────────
+
+@process_singleton
+def get_pipeline_runtime() -> PipelineRuntime:
+    return PipelineRuntime()
@@ -0,0 +1,145 @@
+import os
+import threading
+from typing import List, Union
+
+import numpy as np
+
+from transformers import AutoTokenizer
+
+# Optional extra (pip install onnxruntime onnx): only needed when
+# GEO_EMBEDDING_BACKEND=onnx-int8
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+from settings import cache_path
+
+
+# ─── Quantized backend settings (overridable from the .env) ──────────────────
+ONNX_THREADS = int(os.getenv("GEO_ONNX_THREADS", "0"))   # 0 = onnxruntime default (all cores)
+MAX_SEQ_LENGTH = 256                                      # same truncation as all-MiniLM-L6-v2
+# ─────────────────────────────────────────────────────────────────────────────
+
+_export_lock = threading.Lock()
+
+
+def hub_id(model_name: str) -> str:
+    """SentenceTransformer short names live under the sentence-transformers org."""
+    if "/" in model_name or os.path.isdir(model_name):
+        return model_name
+    return f"sentence-transformers/{model_name}"
+
+
+def export_int8(model_name: str, out_dir: str) -> str:
+    """
+    Exports the transformer of `model_name` to ONNX and quantizes its weights
+    to int8 (dynamic quantization). Done once; returns the int8 model path.
+    """
+    int8_path = os.path.join(out_dir, "model_int8.onnx")
+    with _export_lock:
+        if os.path.exists(int8_path):
+            return int8_path
+
+        import torch
+        from transformers import AutoModel
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        os.makedirs(out_dir, exist_ok=True)
+        model = AutoModel.from_pretrained(hub_id(model_name)).eval()
+        tokenizer = AutoTokenizer.from_pretrained(hub_id(model_name))
+        tokenizer.save_pretrained(out_dir)
+
+        class _LastHiddenState(torch.nn.Module):
+            # Fixes the positional signature traced by the exporter
+            def __init__(self, transformer):
+                super().__init__()
+                self.transformer = transformer
+
+            def forward(self, input_ids, attention_mask, token_type_ids=None):
+                kwargs = {"token_type_ids": token_type_ids} if token_type_ids is not None else {}
+                return self.transformer(
+                    input_ids=input_ids, attention_mask=attention_mask, **kwargs
+                ).last_hidden_state
+
+        dummy = tokenizer(["GEO Auditor export"], return_tensors="pt")
+        # token_type_ids only if the model has them (BERT/MiniLM do, MPNet does not)
+        input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in dummy]
+        fp32_path = os.path.join(out_dir, "model_fp32.onnx")
+        dynamic = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                _LastHiddenState(model),
+                tuple(dummy[n] for n in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes={name: dynamic for name in input_names + ["last_hidden_state"]},
+                opset_version=17,
+                dynamo=False,
+            )
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+    return int8_path
+
+
+class OnnxInt8Embedder:
+    """
+    int8-quantized ONNX Runtime version of a SentenceTransformer (mean pooling
+    + L2 normalisation, as in all-MiniLM-L6-v2). Exposes the subset of the
+    SentenceTransformer API the auditor uses: encode() and .tokenizer.
+    """
+
+    def __init__(self, model_name: str, export_dir: str = None):
+        if ort is None:
+            raise ImportError("GEO_EMBEDDING_BACKEND=onnx-int8 needs the onnx extra: pip install onnxruntime onnx")
+        safe_name = model_name.replace("/", "_")
+        export_dir = export_dir or cache_path("onnx", safe_name)
+        model_path = export_int8(model_name, export_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        self.max_seq_length = MAX_SEQ_LENGTH
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        feed = {name: tokens[name].astype(np.int64) for name in self._inputs if name in tokens}
+        hidden = self.session.run(["last_hidden_state"], feed)[0]           # b × seq × d
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        convert_to_tensor: bool = False,
+        **kwargs,
+    ):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        else:
+            # Sort by length so each batch pads as little as possible
+            order = np.argsort([-len(t) for t in texts])
+            vectors = np.empty((len(texts),), dtype=object)
+            for start in range(0, len(texts), batch_size):
+                idx = order[start:start + batch_size]
+                for i, vector in zip(idx, self._encode_batch([texts[i] for i in idx])):
+                    vectors[i] = vector
+            vectors = np.stack(vectors).astype(np.float32)
+        if single:
+            vectors = vectors[0]
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(vectors)
+        return vectors
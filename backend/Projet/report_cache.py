@@ -0,0 +1,191 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from url_utils import normalize_url
+from settings import cache_path, process_singleton
+
+
+# ─── Report cache settings (overridable from the .env) ───────────────────────
+REPORT_CACHE_ENABLED = os.getenv("GEO_REPORT_CACHE", "1") != "0"
+REPORT_CACHE_TTL = float(os.getenv("GEO_REPORT_CACHE_TTL", str(7 * 24 * 3600)))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("GEO_REPORT_CACHE_MAX_ENTRIES", "2000"))
+# "lru" (least recently used), "lfu" (least hit) or "fifo" (oldest stored)
+REPORT_CACHE_EVICTION = os.getenv("GEO_REPORT_CACHE_EVICTION", "lru")
+# Semantic near-hit: reuse the last report of the same URL when the site
+# embedding moved less than this (cosine >= threshold). 0 disables it.
+REPORT_NEAR_HIT_THRESHOLD = float(os.getenv("GEO_REPORT_NEAR_HIT", "0"))
+# ─────────────────────────────────────────────────────────────────────────────
+
+_EVICTION_ORDER = {"lru": "accessed_at", "lfu": "hits, accessed_at", "fifo": "stored_at"}
+
+
+def prompt_key(messages: List[Any], model: str, temperature: float) -> str:
+    """Content address of a report: the fully rendered prompt + model settings."""
+    digest = hashlib.sha256(f"{model}\0{temperature}".encode("utf-8"))
+    for message in messages:
+        digest.update(f"\0{message.type}\0{message.content}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ReportCache:
+    """
+    On-disk (SQLite) cache of final reports (Gemini output after Compresr),
+    content-addressed by the rendered prompt. Entries also keep the site
+    embedding, so a URL whose content barely moved can reuse its last report.
+    """
+
+    def __init__(
+        self,
+        path: str = cache_path("report_cache.sqlite"),
+        ttl: float = REPORT_CACHE_TTL,
+        max_entries: int = REPORT_CACHE_MAX_ENTRIES,
+        eviction: str = REPORT_CACHE_EVICTION,
+        near_hit_threshold: float = REPORT_NEAR_HIT_THRESHOLD,
+    ):
+        if eviction not in _EVICTION_ORDER:
+            raise ValueError(f"Unknown report cache eviction policy: {eviction!r}")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.eviction = eviction
+        self.near_hit_threshold = near_hit_threshold
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS report_cache (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                model TEXT,
+                site_vector BLOB,
+                llm_report TEXT,
+                llms_txt_compressed TEXT,
+                hits INTEGER DEFAULT 0,
+                stored_at REAL,
+                accessed_at REAL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS report_cache_url ON report_cache (url, model)")
+        self._db.commit()
+        self.counters = {"hits": 0, "near_hits": 0, "misses": 0, "evictions": 0, "not_stored": 0}
+
+    @property
+    def near_hits_enabled(self) -> bool:
+        return self.near_hit_threshold > 0
+
+    def _touch(self, key: str, now: float):
+        self._db.execute("UPDATE report_cache SET hits = hits + 1, accessed_at = ? WHERE key = ?", (now, key))
+        self._db.commit()
+
+    @staticmethod
+    def _entry(row: sqlite3.Row, state: str, similarity: float = 1.0) -> Dict[str, Any]:
+        return {
+            "llm_report": row["llm_report"],
+            "llms_txt_compressed": row["llms_txt_compressed"],
+            "state": state,
+            "similarity": round(similarity, 4),
+            "stored_at": row["stored_at"],
+        }
+
+    def lookup(self, key: str, url: str, model: str, site_vector: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """
+        The cached report for this exact prompt, else (with a site vector and
+        near-hits enabled) the closest report of the same URL and model.
+        """
+        now = time.time()
+        oldest = now - self.ttl
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM report_cache WHERE key = ? AND stored_at >= ?", (key, oldest)
+            ).fetchone()
+            if row is not None:
+                self.counters["hits"] += 1
+                self._touch(key, now)
+                return self._entry(row, "hit")
+
+            if site_vector is not None and self.near_hits_enabled:
+                best, best_similarity = None, -1.0
+                query = np.asarray(site_vector, dtype=np.float32)
+                for candidate in self._db.execute(
+                    "SELECT * FROM report_cache WHERE url = ? AND model = ? AND stored_at >= ? AND site_vector IS NOT NULL",
+                    (normalize_url(url), model, oldest),
+                ):
+                    vector = np.frombuffer(candidate["site_vector"], dtype=np.float32)
+                    if vector.shape != query.shape:
+                        continue
+                    denominator = float(np.linalg.norm(vector) * np.linalg.norm(query))
+                    similarity = float(vector @ query) / denominator if denominator else 0.0
+                    if similarity > best_similarity:
+                        best, best_similarity = candidate, similarity
+                if best is not None and best_similarity >= self.near_hit_threshold:
+                    self.counters["near_hits"] += 1
+                    self._touch(best["key"], now)
+                    return self._entry(best, "near_hit", best_similarity)
+
+            self.counters["misses"] += 1
+            return None
+
+    def store(
+        self,
+        key: str,
+        url: str,
+        model: str,
+        llm_report: str,
+        llms_txt_compressed: Optional[str],
+        site_vector: Optional[np.ndarray] = None,
+    ):
+        now = time.time()
+        blob = np.asarray(site_vector, dtype=np.float32).tobytes() if site_vector is not None else None
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO report_cache VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)",
+                (key, normalize_url(url), model, blob, llm_report, llms_txt_compressed, now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float):
+        expired = self._db.execute("DELETE FROM report_cache WHERE stored_at < ?", (now - self.ttl,)).rowcount
+        excess = self._db.execute("SELECT COUNT(*) FROM report_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM report_cache WHERE key IN "
+                f"(SELECT key FROM report_cache ORDER BY {_EVICTION_ORDER[self.eviction]} LIMIT ?)", (excess,)
+            )
+        self.counters["evictions"] += max(expired, 0) + max(excess, 0)
+
+    def count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM report_cache")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM report_cache").fetchone()[0]
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["near_hits"] + counters["misses"]
+        return {
+            "entries": entries,
+            "eviction": self.eviction,
+            "near_hit_threshold": self.near_hit_threshold,
+            **counters,
+            "hit_ratio": round((counters["hits"] + counters["near_hits"]) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# ── Process-wide cache ───────────────────────────────────────────────────────
+
+@process_singleton
+def get_report_cache() -> ReportCache:
+    return ReportCache()
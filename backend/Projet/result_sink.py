@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import concurrent.futures
+from typing import Dict, Any, List, Optional
+
+from settings import cache_path
+
+
+# ─── Result sink settings (overridable from the .env) ────────────────────────
+# "supabase", "sqlite" (local stand-in under GEO_CACHE_DIR), "memory", or
+# "auto": Supabase when it is configured, SQLite otherwise
+SINK_BACKEND = os.getenv("GEO_SINK_BACKEND", "auto")
+SINK_FLUSH_INTERVAL = float(os.getenv("GEO_SINK_FLUSH_INTERVAL", "2"))   # seconds an update may wait for company
+SINK_BATCH_SIZE = int(os.getenv("GEO_SINK_BATCH_SIZE", "50"))            # rows that trigger a flush at once
+SINK_RETRIES = int(os.getenv("GEO_SINK_RETRIES", "4"))
+SINK_BACKOFF = float(os.getenv("GEO_SINK_BACKOFF", "0.5"))               # seconds, doubled on every retry
+SINK_FINAL_TIMEOUT = float(os.getenv("GEO_SINK_FINAL_TIMEOUT", "60"))    # wait for the end state of an audit
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+# ── Backends ─────────────────────────────────────────────────────────────────
+# write(rows) applies {row id: fields} as partial updates; it either succeeds
+# or raises (the sink retries the whole batch, updates are idempotent).
+
+class SupabaseBackend:
+    """Updates rows of a Supabase table; rows getting the same fields share one request."""
+
+    name = "supabase"
+
+    def __init__(self, client, table: str = "audits"):
+        self.client = client
+        self.table = table
+
+    def write(self, rows: Dict[str, Dict[str, Any]]):
+        groups: Dict[str, tuple] = {}
+        for row_id, fields in rows.items():
+            signature = json.dumps(fields, sort_keys=True, default=str)
+            groups.setdefault(signature, (fields, []))[1].append(row_id)
+        for fields, ids in groups.values():
+            query = self.client.table(self.table).update(fields)
+            query = query.eq("id", ids[0]) if len(ids) == 1 else query.in_("id", ids)
+            query.execute()
+
+
+class SQLiteBackend:
+    """Local stand-in for the Supabase table: one JSON document per row id."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = cache_path("results.sqlite")):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS results (id TEXT PRIMARY KEY, data TEXT, updated_at REAL)")
+        self._db.commit()
+
+    def write(self, rows: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            for row_id, fields in rows.items():
+                row = self._db.execute("SELECT data FROM results WHERE id = ?", (row_id,)).fetchone()
+                data = {**(json.loads(row[0]) if row else {}), **fields}
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (id, data, updated_at) VALUES (?, ?, ?)",
+                    (row_id, json.dumps(data, ensure_ascii=False, default=str), time.time()),
+                )
+            self._db.commit()
+
+    def get(self, row_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM results WHERE id = ?", (row_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class MemoryBackend:
+    """In-process rows, for tests and throwaway runs."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.writes = 0
+
+    def write(self, rows: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            self.writes += 1
+            for row_id, fields in rows.items():
+                self.rows.setdefault(row_id, {}).update(fields)
+
+    def get(self, row_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.rows.get(row_id)
+            return dict(row) if row is not None else None
+
+
+def build_backend(name: str = SINK_BACKEND, supabase_client=None):
+    if name == "auto":
+        name = "supabase" if supabase_client is not None else "sqlite"
+    if name == "supabase":
+        if supabase_client is None:
+            raise ValueError("GEO_SINK_BACKEND=supabase needs SUPABASE_URL and SUPABASE_SERVICE_KEY")
+        return SupabaseBackend(supabase_client)
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown result sink backend: {name!r}")
+
+
+# ── Sink ─────────────────────────────────────────────────────────────────────
+
+class _Pending:
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.futures: List[concurrent.futures.Future] = []
+        self.final = False
+
+
+class ResultSink:
+    """
+    Write-behind buffer in front of a backend. update() returns at once:
+    updates of the same row are merged (the latest value of a field wins)
+    and written in batches by a background thread, every `flush_interval`
+    seconds or as soon as `batch_size` rows are waiting. A `final` update
+    (the end state of an audit) is flushed right away.
+
+    Failed batches are retried with exponential backoff; after `retries`
+    attempts the futures of the batch fail, and its final updates stay
+    queued for the next flush, so an end state is never dropped.
+    """
+
+    def __init__(
+        self,
+        backend,
+        flush_interval: float = SINK_FLUSH_INTERVAL,
+        batch_size: int = SINK_BATCH_SIZE,
+        retries: int = SINK_RETRIES,
+        backoff: float = SINK_BACKOFF,
+    ):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.retries = retries
+        self.backoff = backoff
+        self._pending: Dict[str, _Pending] = {}
+        self._cond = threading.Condition()
+        self._closing = False
+        self._writing = 0
+        self._thread: Optional[threading.Thread] = None
+        self.counters = {"updates": 0, "rows_written": 0, "batches": 0, "retries": 0, "failed_batches": 0}
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._closing = False
+            self._thread = threading.Thread(target=self._run, name="result-sink", daemon=True)
+            self._thread.start()
+
+    def update(self, row_id: str, fields: Dict[str, Any], final: bool = False) -> concurrent.futures.Future:
+        """Queues a partial update of `row_id`; the future resolves once it is written."""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._cond:
+            self._ensure_started()
+            pending = self._pending.setdefault(row_id, _Pending())
+            pending.fields.update(fields)
+            pending.futures.append(future)
+            pending.final = pending.final or final
+            self.counters["updates"] += 1
+            if final or len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return future
+
+    def _take_batch(self) -> Dict[str, _Pending]:
+        ids = list(self._pending)[:self.batch_size]
+        return {row_id: self._pending.pop(row_id) for row_id in ids}
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending and self._closing:
+                    return
+                urgent = self._closing or any(p.final for p in self._pending.values())
+                if not urgent and len(self._pending) < self.batch_size:
+                    # Let updates of the same rows pile up for a while
+                    self._cond.wait(self.flush_interval)
+                batch = self._take_batch()
+                self._writing += 1
+            try:
+                self._write(batch)
+            finally:
+                with self._cond:
+                    self._writing -= 1
+                    self._cond.notify_all()
+
+    def _write(self, batch: Dict[str, _Pending]):
+        rows = {row_id: pending.fields for row_id, pending in batch.items()}
+        for attempt in range(self.retries + 1):
+            try:
+                self.backend.write(rows)
+                break
+            except Exception as e:
+                error = e
+                if attempt < self.retries:
+                    self.counters["retries"] += 1
+                    time.sleep(self.backoff * 2 ** attempt)
+        else:
+            print(f"Result sink: writing {len(rows)} row(s) to {self.backend.name} failed: {type(error).__name__}: {error}")
+            self.counters["failed_batches"] += 1
+            with self._cond:
+                for row_id, pending in batch.items():
+                    if pending.final:
+                        # Newer updates queued meanwhile keep precedence
+                        requeued = self._pending.setdefault(row_id, _Pending())
+                        requeued.fields = {**pending.fields, **requeued.fields}
+                        requeued.final = True
+            for pending in batch.values():
+                for future in pending.futures:
+                    future.set_exception(error)
+            return
+        self.counters["batches"] += 1
+        self.counters["rows_written"] += len(rows)
+        for pending in batch.values():
+            for future in pending.futures:
+                future.set_result(None)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Writes everything queued now; returns False if it did not finish within `timeout`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            for pending in self._pending.values():
+                pending.final = True
+            self._cond.notify_all()
+            while self._pending or self._writing:
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._cond.wait(left if left is not None else 1.0)
+        return True
+
+    def close(self, timeout: float = 30.0):
+        """Flushes what is queued and stops the writer thread (process shutdown)."""
+        self.flush(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            counters = dict(self.counters)
+            queued = len(self._pending)
+        return {
+            "backend": self.backend.name,
+            "queued_rows": queued,
+            **counters,
+            # Updates absorbed by coalescing (several updates of a row, one write)
+            "coalescing_ratio": round(1 - counters["rows_written"] / counters["updates"], 4) if counters["updates"] else 0.0,
+        }
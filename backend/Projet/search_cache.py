@@ -0,0 +1,249 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from settings import cache_path
+
+
+# ─── Search cache settings (overridable from the .env) ───────────────────────
+SEARCH_CACHE_ENABLED = os.getenv("GEO_SEARCH_CACHE", "1") != "0"
+# Results younger than the TTL are served as-is; up to TTL + STALE they are
+# served immediately and refreshed in the background (stale-while-revalidate).
+SEARCH_CACHE_TTL = float(os.getenv("GEO_SEARCH_CACHE_TTL", str(24 * 3600)))
+SEARCH_CACHE_STALE = float(os.getenv("GEO_SEARCH_CACHE_STALE", str(7 * 24 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("GEO_SEARCH_CACHE_MAX_ENTRIES", "5000"))
+# Competitor searches use the sector from the JSON-LD instead of the company
+# name when there is one, so companies of the same sector share the result.
+SECTOR_SHARING = os.getenv("GEO_SEARCH_SECTOR_SHARING", "1") != "0"
+# ─────────────────────────────────────────────────────────────────────────────
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    return _WS.sub(" ", unicodedata.normalize("NFKC", query)).strip().lower()
+
+
+def search_key(query: str, params: Dict[str, Any]) -> str:
+    """Cache key of a search: normalised query + the parameters that shape the results."""
+    payload = json.dumps(
+        {"query": normalize_query(query), **{k: v for k, v in params.items() if v is not None}},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ── Sector hint ──────────────────────────────────────────────────────────────
+
+# schema.org types too generic to say anything about the sector
+_GENERIC_TYPES = {
+    "thing", "organization", "corporation", "localbusiness", "professionalservice", "onlinebusiness",
+    "website", "webpage", "aboutpage", "contactpage", "collectionpage", "itempage", "faqpage",
+    "searchresultspage", "sitenavigationelement", "wpheader", "wpfooter", "breadcrumblist", "listitem",
+    "itemlist", "person", "place", "postaladdress", "contactpoint", "geocoordinates", "imageobject",
+    "videoobject", "searchaction", "readaction", "entrypoint", "brand", "offer", "aggregateoffer",
+    "aggregaterating", "rating", "review", "article", "newsarticle", "blogposting", "creativework",
+    "question", "answer", "howto", "event", "product", "openinghoursspecification", "propertyvalue",
+}
+
+
+def _nodes(block: Any):
+    if isinstance(block, list):
+        for item in block:
+            yield from _nodes(item)
+    elif isinstance(block, dict):
+        yield block
+        yield from _nodes(block.get("@graph", []))
+
+
+def _types(node: Dict[str, Any]) -> List[str]:
+    types = node.get("@type", [])
+    return [t for t in (types if isinstance(types, list) else [types]) if isinstance(t, str)]
+
+
+def sector_hint(structured_data: List[Any]) -> Optional[str]:
+    """
+    The business sector declared in the JSON-LD: an explicit `industry`, or
+    the most specific schema.org business type ("LegalService" → "legal service").
+    """
+    typed = None
+    for node in _nodes(structured_data):
+        industry = node.get("industry")
+        if isinstance(industry, list):
+            industry = industry[0] if industry else None
+        if isinstance(industry, dict):
+            industry = industry.get("name")
+        if isinstance(industry, str) and industry.strip():
+            return normalize_query(industry)
+        for t in _types(node):
+            name = t.rsplit("/", 1)[-1].rsplit(":", 1)[-1]
+            if typed is None and name.lower() not in _GENERIC_TYPES:
+                typed = re.sub(r"(?<=[a-z])(?=[A-Z])", " ", name).lower()
+    return typed
+
+
+# ── Cache ────────────────────────────────────────────────────────────────────
+
+class SearchCache:
+    """
+    On-disk (SQLite) TTL cache of search responses keyed by normalised query
+    and parameters, bounded by an entry count enforced by LRU eviction. Each
+    entry keeps the upstream latency it cost, to report the latency saved.
+    """
+
+    def __init__(
+        self,
+        path: str = cache_path("search_cache.sqlite"),
+        ttl: float = SEARCH_CACHE_TTL,
+        stale: float = SEARCH_CACHE_STALE,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                query TEXT,
+                response_json TEXT,
+                latency REAL,
+                stored_at REAL,
+                accessed_at REAL
+            )"""
+        )
+        self._db.commit()
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0, "evictions": 0}
+        self.saved_seconds = 0.0
+        self.upstream_seconds = 0.0
+
+    def lookup(self, key: str):
+        """Returns (response, state) with state "fresh", "stale" or "miss"."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response_json, latency, stored_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[2] > self.ttl + self.stale:
+                self.counters["misses"] += 1
+                return None, "miss"
+            self._db.execute("UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            state = "fresh" if now - row[2] <= self.ttl else "stale"
+            self.counters["hits" if state == "fresh" else "stale_hits"] += 1
+            self.saved_seconds += row[1] or 0.0
+        return json.loads(row[0]), state
+
+    def store(self, key: str, query: str, response: Dict[str, Any], latency: float):
+        now = time.time()
+        with self._lock:
+            self.upstream_seconds += latency
+            self._db.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, query, json.dumps(response, ensure_ascii=False, default=str), latency, now, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        excess = self._db.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM search_cache WHERE key IN "
+                "(SELECT key FROM search_cache ORDER BY accessed_at LIMIT ?)", (excess,)
+            )
+            self.counters["evictions"] += excess
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM search_cache")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+            counters = dict(self.counters)
+            saved, upstream = self.saved_seconds, self.upstream_seconds
+        lookups = counters["hits"] + counters["stale_hits"] + counters["misses"]
+        upstream_calls = counters["misses"] + counters["refreshes"]
+        return {
+            "entries": entries,
+            **counters,
+            "hit_ratio": round((counters["hits"] + counters["stale_hits"]) / lookups, 4) if lookups else 0.0,
+            "upstream_calls": upstream_calls,
+            "upstream_seconds": round(upstream, 3),
+            "saved_seconds": round(saved, 3),
+        }
+
+
+class CachedTavilyClient:
+    """
+    Drop-in replacement for TavilyClient.search() backed by a SearchCache.
+    Stale entries are returned at once and refreshed on a background thread
+    (one refresh per key at a time). Other attributes go to the real client.
+    """
+
+    def __init__(self, client, cache: Optional["SearchCache"] = None):
+        self._client = client
+        self.cache = cache or SearchCache()
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-refresh")
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _fetch(self, key: str, query: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        response = self._client.search(query=query, **params)
+        self.cache.store(key, query, response, time.perf_counter() - start)
+        return response
+
+    def _refresh(self, key: str, query: str, params: Dict[str, Any]):
+        try:
+            self._fetch(key, query, params)
+            self.cache.count("refreshes")
+        except Exception as e:
+            self.cache.count("refresh_errors")
+            print(f"Search cache: background refresh failed for {query!r}: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+
+    def search(self, query: str, **params) -> Dict[str, Any]:
+        key = search_key(query, params)
+        response, state = self.cache.lookup(key)
+        if state == "miss":
+            return self._fetch(key, query, params)
+        if state == "stale":
+            with self._refresh_lock:
+                if key in self._refreshing:
+                    return response
+                self._refreshing.add(key)
+            self._executor.submit(self._refresh, key, query, params)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._refresh_lock:
+            refreshing = len(self._refreshing)
+        return {**self.cache.stats(), "refreshing": refreshing}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        close = getattr(self._client, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,41 @@
+import os
+import threading
+import functools
+from typing import Callable, Optional, TypeVar
+
+
+# ─── Shared settings (overridable from the .env) ─────────────────────────────
+# Every on-disk cache and store (crawl, search, embeddings, reports, jobs,
+# audit history, results, traces, ONNX exports) lives under this directory
+CACHE_DIR = os.getenv("GEO_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache"))
+# ─────────────────────────────────────────────────────────────────────────────
+
+T = TypeVar("T")
+
+
+def cache_path(*parts: str) -> str:
+    """A path under CACHE_DIR."""
+    return os.path.join(CACHE_DIR, *parts)
+
+
+def process_singleton(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    Turns `factory` into the getter of a process-wide instance, built on the
+    first call (thread-safe) and returned by every later one:
+
+        @process_singleton
+        def get_report_cache() -> ReportCache:
+            return ReportCache()
+    """
+    instance: Optional[T] = None
+    lock = threading.Lock()
+
+    @functools.wraps(factory)
+    def get() -> T:
+        nonlocal instance
+        with lock:
+            if instance is None:
+                instance = factory()
+            return instance
+
+    return get
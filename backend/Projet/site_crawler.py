@@ -0,0 +1,256 @@
+import os
+import json
+import asyncio
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+from typing import Dict, Any, List, AsyncIterator
+
+import httpx
+
+from Crawler import fetch_page
+from static_fetch import get_http_client
+from url_utils import normalize_url, site_host
+
+
+# ─── Site crawl settings (overridable from the .env) ─────────────────────────
+SITE_MAX_PAGES = int(os.getenv("GEO_SITE_MAX_PAGES", "10"))
+SITE_MAX_DEPTH = int(os.getenv("GEO_SITE_MAX_DEPTH", "2"))
+SITE_CONCURRENCY = int(os.getenv("GEO_SITE_CONCURRENCY", "6"))
+SITE_PER_HOST_CONCURRENCY = int(os.getenv("GEO_SITE_PER_HOST_CONCURRENCY", "3"))
+ROBOTS_USER_AGENT = "GEOAuditor"
+MAX_SITEMAPS = 5
+# ─────────────────────────────────────────────────────────────────────────────
+
+_SKIPPED_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".zip", ".gz",
+    ".css", ".js", ".xml", ".json", ".mp3", ".mp4", ".avi", ".mov", ".doc", ".docx",
+    ".xls", ".xlsx", ".ppt", ".pptx",
+)
+
+
+# ── robots.txt & sitemap.xml ─────────────────────────────────────────────────
+
+async def read_robots(root_url: str) -> RobotFileParser:
+    """Fetches and parses robots.txt; a missing or broken file allows everything."""
+    robots = RobotFileParser(urljoin(root_url, "/robots.txt"))
+    try:
+        response = await get_http_client().get(robots.url)
+        lines = response.text.splitlines() if response.status_code == 200 else []
+    except httpx.HTTPError:
+        lines = []
+    robots.parse(lines)
+    return robots
+
+
+async def read_sitemap(root_url: str, robots: RobotFileParser, limit: int) -> List[str]:
+    """
+    URLs listed in the sitemaps declared in robots.txt (or /sitemap.xml),
+    following sitemap indexes up to MAX_SITEMAPS files.
+    """
+    pending = list(robots.site_maps() or []) or [urljoin(root_url, "/sitemap.xml")]
+    visited, urls = set(), []
+    client = get_http_client()
+
+    while pending and len(visited) < MAX_SITEMAPS and len(urls) < limit:
+        sitemap_url = pending.pop(0)
+        if sitemap_url in visited:
+            continue
+        visited.add(sitemap_url)
+        try:
+            response = await client.get(sitemap_url)
+            if response.status_code != 200:
+                continue
+            root = ET.fromstring(response.content)
+        except (httpx.HTTPError, ET.ParseError):
+            continue
+
+        locs = [el.text.strip() for el in root.iter() if el.tag.endswith("loc") and el.text]
+        if root.tag.endswith("sitemapindex"):
+            pending.extend(locs)
+        else:
+            urls.extend(locs)
+    return urls[:limit]
+
+
+# ── Breadth-first crawl ──────────────────────────────────────────────────────
+
+def _crawlable(url: str, host: str, robots: RobotFileParser) -> bool:
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or site_host(url) != host:
+        return False
+    if parts.path.lower().endswith(_SKIPPED_EXTENSIONS):
+        return False
+    return robots.can_fetch(ROBOTS_USER_AGENT, url)
+
+
+async def crawl_site(
+    start_url: str,
+    max_pages: int = SITE_MAX_PAGES,
+    max_depth: int = SITE_MAX_DEPTH,
+    concurrency: int = SITE_CONCURRENCY,
+    per_host_concurrency: int = SITE_PER_HOST_CONCURRENCY,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Crawls a site breadth-first from `start_url` and yields each page's
+    result_data (plus "depth", and "error" if it failed) as soon as it is
+    crawled, so consumers can start working before the crawl finishes.
+
+    Links found on pages are explored before sitemap entries of the same
+    depth; at most `max_pages` pages are fetched.
+    """
+    host = site_host(start_url)
+    robots = await read_robots(start_url)
+    sitemap_urls = await read_sitemap(start_url, robots, limit=max_pages * 10)
+
+    # (depth, tier, order): tier 0 = discovered link, tier 1 = sitemap entry
+    frontier: asyncio.PriorityQueue = asyncio.PriorityQueue()
+    results: asyncio.Queue = asyncio.Queue()
+    seen = set()
+    order = 0
+    fetched = 0
+    global_slots = asyncio.Semaphore(concurrency)
+    host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def enqueue(url: str, depth: int, tier: int):
+        nonlocal order
+        key = normalize_url(url)
+        if key in seen or depth > max_depth or not _crawlable(url, host, robots):
+            return
+        seen.add(key)
+        order += 1
+        frontier.put_nowait((depth, tier, order, url))
+
+    # The start page is always crawled, even if robots.txt disallows it
+    seen.add(normalize_url(start_url))
+    frontier.put_nowait((0, 0, 0, start_url))
+    for url in sitemap_urls:
+        enqueue(url, 1, 1)
+
+    async def worker():
+        nonlocal fetched
+        while True:
+            depth, _, _, url = await frontier.get()
+            try:
+                if fetched >= max_pages:
+                    continue
+                fetched += 1
+                page_host = urlsplit(url).netloc
+                slots = host_slots.setdefault(page_host, asyncio.Semaphore(per_host_concurrency))
+                async with global_slots, slots:
+                    try:
+                        page, links = await fetch_page(url)
+                    except Exception as e:
+                        page, links = {"url": url, "markdown_content": "", "structured_data": [],
+                                       "metadata": {}, "error": f"{type(e).__name__}: {e}"}, []
+                page["depth"] = depth
+                for link in links:
+                    enqueue(link, depth + 1, 0)
+                await results.put(page)
+            finally:
+                frontier.task_done()
+
+    async def finish():
+        await frontier.join()
+        await results.put(None)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(1, concurrency))]
+    joiner = asyncio.ensure_future(finish())
+    try:
+        while True:
+            page = await results.get()
+            if page is None:
+                break
+            yield page
+    finally:
+        for task in workers + [joiner]:
+            task.cancel()
+        await asyncio.gather(*workers, joiner, return_exceptions=True)
+
+
+# ── Aggregation ──────────────────────────────────────────────────────────────
+
+def _page_order(page: Dict[str, Any]):
+    return page.get("depth", 0), page["url"]
+
+
+def crawl_content(site_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    What an audit reads from a crawl (single page or whole site), without
+    crawl details such as errors or page order: the canonical form hashed to
+    tell whether a site changed between two audits.
+    """
+    pages = sorted(site_data.get("pages") or [site_data], key=_page_order)
+    return {
+        "url": site_data["url"],
+        "title": site_data.get("metadata", {}).get("title"),
+        "pages": [
+            {"url": p["url"], "markdown_content": p.get("markdown_content", ""), "structured_data": p.get("structured_data", [])}
+            for p in pages
+        ],
+    }
+
+
+def merge_json_ld(blocks: List[Any]) -> List[Any]:
+    """
+    Deduplicates JSON-LD blocks collected across pages: identical blocks are
+    kept once, and @graph nodes sharing an @id are kept once.
+    """
+    merged, seen_blocks, seen_ids = [], set(), set()
+    for block in blocks:
+        if isinstance(block, dict) and isinstance(block.get("@graph"), list):
+            nodes = []
+            for node in block["@graph"]:
+                node_id = node.get("@id") if isinstance(node, dict) else None
+                if node_id:
+                    if node_id in seen_ids:
+                        continue
+                    seen_ids.add(node_id)
+                nodes.append(node)
+            if not nodes:
+                continue
+            block = {**block, "@graph": nodes}
+        elif isinstance(block, dict) and block.get("@id"):
+            if block["@id"] in seen_ids:
+                continue
+            seen_ids.add(block["@id"])
+        key = json.dumps(block, sort_keys=True, ensure_ascii=False)
+        if key not in seen_blocks:
+            seen_blocks.add(key)
+            merged.append(block)
+    return merged
+
+
+def aggregate_pages(start_url: str, pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Builds a single result_data (same shape as extract_pme_data) for the whole
+    site; the individual pages stay available under "pages".
+    """
+    # Pages arrive in crawl-completion order: sort them so that the same site
+    # always aggregates (and hashes) the same way
+    pages = sorted(pages, key=_page_order)
+    ok = [p for p in pages if p.get("markdown_content")]
+    home = ok[0] if ok else {"metadata": {}}
+
+    sections = []
+    for page in ok:
+        header = page["metadata"].get("title") or page["url"]
+        sections.append(f"<!-- page: {page['url']} -->\n# {header}\n\n{page['markdown_content']}")
+
+    return {
+        "url": start_url,
+        "markdown_content": "\n\n---\n\n".join(sections),
+        "structured_data": merge_json_ld([b for p in ok for b in p["structured_data"]]),
+        "metadata": home["metadata"],
+        "pages": pages,
+    }
+
+
+async def extract_site_data(
+    url: str,
+    max_pages: int = SITE_MAX_PAGES,
+    max_depth: int = SITE_MAX_DEPTH,
+) -> Dict[str, Any]:
+    """Site-crawl counterpart of extract_pme_data: crawls up to `max_pages` pages."""
+    pages = [page async for page in crawl_site(url, max_pages=max_pages, max_depth=max_depth)]
+    return aggregate_pages(url, pages)
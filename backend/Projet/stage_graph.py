@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Iterable
+
+from metrics import STAGE_SECONDS, RETRIES
+from tracing import span
+from settings import process_singleton
+
+
+# ─── Stage graph settings (overridable from the .env) ────────────────────────
+STAGE_MEMO_SIZE = int(os.getenv("GEO_STAGE_MEMO_SIZE", "256"))
+STAGE_MEMO_TTL = float(os.getenv("GEO_STAGE_MEMO_TTL", "3600"))
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class Stage:
+    """
+    One step of a pipeline. `fn` is a coroutine function called with the
+    stage inputs as keyword arguments; it returns the value of the single
+    output, or a dict {output name: value} when there are several.
+
+    Each attempt is bounded by `timeout` seconds; failed attempts are retried
+    `retries` times with exponential backoff, except ValueError which marks
+    bad input (e.g. an empty crawl) and fails at once. With `memoize`, the
+    outputs are reused for identical inputs (content hash). With
+    `incremental`, the outputs are kept in the run (see GraphRun.incremental)
+    and a graph given the previous run's ones reuses them when the inputs
+    hash the same.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[..., Awaitable[Any]],
+        inputs: Iterable[str] = (),
+        outputs: Iterable[str] = (),
+        timeout: Optional[float] = None,
+        retries: int = 0,
+        backoff: float = 0.5,
+        memoize: bool = False,
+        incremental: bool = False,
+    ):
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+        self.outputs = list(outputs) or [name]
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.memoize = memoize
+        self.incremental = incremental
+
+
+def content_key(stage: str, values: Dict[str, Any]) -> str:
+    payload = json.dumps(values, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{stage}\0{payload}".encode("utf-8")).hexdigest()
+
+
+class StageMemo:
+    """Bounded in-memory LRU of stage outputs, keyed by stage + input hash."""
+
+    def __init__(self, max_entries: int = STAGE_MEMO_SIZE, ttl: float = STAGE_MEMO_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[1]
+
+    def put(self, key: str, outputs: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = (time.time(), outputs)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "entries": len(self._entries),
+                **self.counters,
+                "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+
+class GraphRun:
+    """Result of one run: every value produced, plus per-stage timings."""
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        # {stage: {"key": input hash, "outputs": ...}} of the incremental stages
+        self.incremental: Dict[str, Dict[str, Any]] = {}
+        self.total_seconds = 0.0
+
+    def breakdown(self) -> Dict[str, Any]:
+        return {"total_seconds": round(self.total_seconds, 3), "stages": self.timings}
+
+
+class StageGraph:
+    """
+    Runs a set of stages as a dependency graph: a stage starts as soon as all
+    of its inputs are available, so independent stages run concurrently.
+    Stages whose outputs are given up front, or that no target depends on,
+    are skipped. `previous` holds the incremental stages of an earlier run
+    (GraphRun.incremental): those whose inputs are unchanged are not run.
+
+    Every stage runs in a tracing span; `describe(name, outputs)` returns
+    the span attributes of a finished stage (sizes, counts).
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        memo: Optional[StageMemo] = None,
+        on_stage: Optional[Callable[[str, Dict[str, Any], Optional[Dict[str, Any]]], None]] = None,
+        previous: Optional[Dict[str, Dict[str, Any]]] = None,
+        describe: Optional[Callable[[str, Dict[str, Any]], Dict[str, Any]]] = None,
+    ):
+        self.stages = {stage.name: stage for stage in stages}
+        self.memo = memo
+        self.previous = previous or {}
+        self.describe = describe
+        # Called as on_stage(name, timing, outputs) when a stage starts
+        # (outputs None) and when it ends (outputs None if it failed)
+        self.on_stage = on_stage
+        self.producers: Dict[str, Stage] = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise ValueError(f"Output {output!r} produced by both {self.producers[output].name!r} and {stage.name!r}")
+                self.producers[output] = stage
+
+    def _plan(self, provided: Iterable[str], targets: Iterable[str]) -> List[Stage]:
+        """Stages needed to compute `targets` from `provided`, in dependency order."""
+        provided = set(provided)
+        plan: List[Stage] = []
+        visiting, done = set(), set()
+
+        def visit(value: str):
+            if value in provided:
+                return
+            stage = self.producers.get(value)
+            if stage is None:
+                raise ValueError(f"No stage produces {value!r} and it was not provided")
+            if stage.name in done:
+                return
+            if stage.name in visiting:
+                raise ValueError(f"Cycle through stage {stage.name!r}")
+            visiting.add(stage.name)
+            for name in stage.inputs:
+                visit(name)
+            visiting.discard(stage.name)
+            done.add(stage.name)
+            plan.append(stage)
+
+        for target in targets:
+            visit(target)
+        return plan
+
+    async def _attempt(self, stage: Stage, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        result = stage.fn(**kwargs)
+        result = await (asyncio.wait_for(result, stage.timeout) if stage.timeout else result)
+        if len(stage.outputs) == 1:
+            return {stage.outputs[0]: result}
+        missing = [o for o in stage.outputs if o not in result]
+        if missing:
+            raise ValueError(f"Stage {stage.name!r} did not produce {missing}")
+        return {o: result[o] for o in stage.outputs}
+
+    async def _run_stage(self, stage: Stage, run: GraphRun, ready: Dict[str, asyncio.Future]):
+        kwargs = {}
+        for name in stage.inputs:
+            kwargs[name] = await ready[name] if name in ready else run.values[name]
+        with span(stage.name) as stage_span:
+            timing = {"status": "running", "attempts": 0}
+            run.timings[stage.name] = timing
+            self._notify(stage, timing, None)
+            start = time.perf_counter()
+
+            memoized = stage.memoize and self.memo is not None
+            key = content_key(stage.name, kwargs) if memoized or stage.incremental else None
+            outputs = None
+            earlier = self.previous.get(stage.name) if stage.incremental else None
+            if earlier is not None and earlier["key"] == key:
+                outputs = earlier["outputs"]
+                timing["status"] = "unchanged"
+            elif memoized:
+                outputs = self.memo.get(key)
+                if outputs is not None:
+                    timing["status"] = "memoized"
+            if outputs is None:
+                while True:
+                    timing["attempts"] += 1
+                    try:
+                        outputs = await self._attempt(stage, kwargs)
+                        break
+                    except asyncio.CancelledError:
+                        timing["status"] = "cancelled"
+                        timing["seconds"] = round(time.perf_counter() - start, 3)
+                        STAGE_SECONDS.labels(stage.name, "cancelled").observe(timing["seconds"])
+                        raise
+                    except Exception as e:
+                        if isinstance(e, ValueError) or timing["attempts"] > stage.retries:
+                            timing["status"] = "error"
+                            timing["error"] = f"{type(e).__name__}: {e}"
+                            timing["seconds"] = round(time.perf_counter() - start, 3)
+                            STAGE_SECONDS.labels(stage.name, "error").observe(timing["seconds"])
+                            self._notify(stage, timing, None)
+                            raise
+                        RETRIES.labels("stage", stage.name).inc()
+                        print(f"Stage {stage.name}: attempt {timing['attempts']} failed ({type(e).__name__}: {e}), retrying")
+                        await asyncio.sleep(stage.backoff * 2 ** (timing["attempts"] - 1))
+                timing["status"] = "ok"
+                if memoized:
+                    self.memo.put(key, outputs)
+            if stage.incremental:
+                run.incremental[stage.name] = {"key": key, "outputs": outputs}
+
+            timing["seconds"] = round(time.perf_counter() - start, 3)
+            STAGE_SECONDS.labels(stage.name, timing["status"]).observe(timing["seconds"])
+            stage_span.set(status=timing["status"], attempts=timing["attempts"])
+            if self.describe is not None:
+                stage_span.set(**self.describe(stage.name, outputs))
+            for name, value in outputs.items():
+                run.values[name] = value
+                ready[name].set_result(value)
+            self._notify(stage, timing, outputs)
+
+    def _notify(self, stage: Stage, timing: Dict[str, Any], outputs: Optional[Dict[str, Any]]):
+        if self.on_stage is None:
+            return
+        try:
+            self.on_stage(stage.name, dict(timing), outputs)
+        except Exception as e:
+            print(f"Stage graph: on_stage callback failed for {stage.name}: {e}")
+
+    async def run(self, inputs: Dict[str, Any], targets: Optional[Iterable[str]] = None) -> GraphRun:
+        """
+        Computes `targets` (default: every output of the graph) from `inputs`.
+        The first failing stage cancels the others and its exception is raised.
+        """
+        targets = list(targets) if targets is not None else list(self.producers)
+        plan = self._plan(inputs, targets)
+        run = GraphRun()
+        run.values.update(inputs)
+        loop = asyncio.get_running_loop()
+        ready = {output: loop.create_future() for stage in plan for output in stage.outputs}
+
+        start = time.perf_counter()
+        tasks = [asyncio.ensure_future(self._run_stage(stage, run, ready)) for stage in plan]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            for future in ready.values():
+                if not future.done():
+                    future.cancel()
+            run.total_seconds = time.perf_counter() - start
+        return run
+
+
+# ── Process-wide memo ────────────────────────────────────────────────────────
+
+@process_singleton
+def get_stage_memo() -> StageMemo:
+    return StageMemo()
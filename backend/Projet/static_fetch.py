@@ -0,0 +1,272 @@
+import os
+import re
+import asyncio
+import threading
+import weakref
+from html import unescape
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+
+# ─── Static fetch settings (overridable from the .env) ───────────────────────
+STATIC_FETCH_ENABLED = os.getenv("GEO_STATIC_FETCH", "1") != "0"
+STATIC_TIMEOUT = float(os.getenv("GEO_STATIC_TIMEOUT", "10"))
+STATIC_MAX_BYTES = int(os.getenv("GEO_STATIC_MAX_BYTES", str(5 * 1024 * 1024)))
+# Below this many Markdown characters the page is assumed to be rendered by JS
+MIN_STATIC_MARKDOWN = int(os.getenv("GEO_STATIC_MIN_MARKDOWN", "500"))
+USER_AGENT = os.getenv(
+    "GEO_USER_AGENT",
+    "Mozilla/5.0 (compatible; GEOAuditor/1.0; +https://github.com/chbnt66/HackEurope)",
+)
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+# ── Pooled HTTP client ───────────────────────────────────────────────────────
+# httpx connection pools are bound to the event loop that created them, so we
+# keep one pooled client per running loop.
+
+_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Returns the pooled AsyncClient of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=STATIC_TIMEOUT,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"},
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            )
+            _clients[loop] = client
+        return client
+
+
+async def close_http_client():
+    """Closes the pooled client of the running loop (call before closing the loop)."""
+    with _clients_lock:
+        client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+# ── Fetch counters ───────────────────────────────────────────────────────────
+
+_stats_lock = threading.Lock()
+FETCH_STATS: Dict[str, Any] = {"static": 0, "escalated": 0, "reasons": {}}
+
+
+def record_fetch(escalation_reason: Optional[str] = None):
+    """Counts one crawl served statically, or escalated to the browser with a reason."""
+    with _stats_lock:
+        if escalation_reason is None:
+            FETCH_STATS["static"] += 1
+        else:
+            FETCH_STATS["escalated"] += 1
+            reasons = FETCH_STATS["reasons"]
+            reasons[escalation_reason] = reasons.get(escalation_reason, 0) + 1
+
+
+def fetch_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        total = FETCH_STATS["static"] + FETCH_STATS["escalated"]
+        return {
+            "static": FETCH_STATS["static"],
+            "escalated": FETCH_STATS["escalated"],
+            "escalation_rate": round(FETCH_STATS["escalated"] / total, 4) if total else 0.0,
+            "reasons": dict(FETCH_STATS["reasons"]),
+        }
+
+
+# ── HTML → Markdown ──────────────────────────────────────────────────────────
+
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "head", "canvas"}
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "header", "footer", "main", "aside", "nav",
+    "form", "table", "tr", "ul", "ol", "blockquote", "pre", "figure", "address",
+}
+_HEADINGS = {"h1": "#", "h2": "##", "h3": "###", "h4": "####", "h5": "#####", "h6": "######"}
+_WS = re.compile(r"\s+")
+
+
+class _MarkdownParser(HTMLParser):
+    """Small streaming HTML → Markdown converter (headings, links, lists, emphasis)."""
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.out: List[str] = []
+        self.skip_depth = 0
+        self.links: List[Dict[str, Any]] = []   # open <a> tags: href + start index in self.out
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self.skip_depth += 1
+            return
+        if self.skip_depth:
+            return
+        attrs = dict(attrs)
+        if tag in _HEADINGS:
+            self.out.append(f"\n\n{_HEADINGS[tag]} ")
+        elif tag in _BLOCK_TAGS:
+            self.out.append("\n\n")
+        elif tag == "br":
+            self.out.append("\n")
+        elif tag == "li":
+            self.out.append("\n- ")
+        elif tag in ("strong", "b"):
+            self.out.append("**")
+        elif tag in ("em", "i"):
+            self.out.append("*")
+        elif tag == "a":
+            self.links.append({"href": attrs.get("href"), "start": len(self.out)})
+        elif tag == "img" and attrs.get("alt"):
+            src = urljoin(self.base_url, attrs.get("src") or "")
+            self.out.append(f"![{attrs['alt'].strip()}]({src})")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+            return
+        if self.skip_depth:
+            return
+        if tag in _HEADINGS or tag in _BLOCK_TAGS:
+            self.out.append("\n\n")
+        elif tag in ("strong", "b"):
+            self.out.append("**")
+        elif tag in ("em", "i"):
+            self.out.append("*")
+        elif tag == "a" and self.links:
+            link = self.links.pop()
+            text = "".join(self.out[link["start"]:]).strip()
+            href = link["href"]
+            if text and href and not href.startswith(("javascript:", "#")):
+                del self.out[link["start"]:]
+                self.out.append(f"[{text}]({urljoin(self.base_url, href)})")
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        text = _WS.sub(" ", data)
+        if text.strip():
+            self.out.append(text)
+
+    def markdown(self) -> str:
+        text = "".join(self.out)
+        lines = [line.strip() for line in text.split("\n")]
+        text = "\n".join(lines)
+        return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def html_to_markdown(html: str, base_url: str = "") -> str:
+    """Converts raw HTML into compact Markdown without a browser."""
+    parser = _MarkdownParser(base_url)
+    parser.feed(html)
+    parser.close()
+    return parser.markdown()
+
+
+# ── Metadata ─────────────────────────────────────────────────────────────────
+
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+_META_RE = re.compile(r"<meta\s[^>]*>", re.I)
+_ATTR_RE = re.compile(r"""([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+
+
+def extract_metadata(html: str) -> Dict[str, Any]:
+    """
+    Extracts the same keys crawl4ai puts in `result.metadata`:
+    title, description, keywords, author and og:/twitter: properties.
+    """
+    metadata: Dict[str, Any] = {}
+    match = _TITLE_RE.search(html)
+    if match:
+        metadata["title"] = _WS.sub(" ", unescape(match.group(1))).strip()
+
+    for tag in _META_RE.findall(html):
+        attrs = {m[0].lower(): m[1] or m[2] or m[3] for m in _ATTR_RE.findall(tag)}
+        key = (attrs.get("name") or attrs.get("property") or "").lower()
+        content = attrs.get("content")
+        if not key or content is None:
+            continue
+        if key in ("description", "keywords", "author") or key.startswith(("og:", "twitter:", "article:")):
+            metadata[key] = unescape(content).strip()
+    return metadata
+
+
+# ── Links ────────────────────────────────────────────────────────────────────
+
+_HREF_RE = re.compile(r"""<a\s[^>]*?href\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.I)
+
+
+def extract_links(html: str, base_url: str) -> List[str]:
+    """Absolute http(s) URLs of every <a href> of the page, in document order."""
+    links = []
+    for match in _HREF_RE.finditer(html):
+        href = unescape(match.group(1) or match.group(2) or match.group(3) or "").strip()
+        if not href or href.startswith(("#", "mailto:", "tel:", "javascript:")):
+            continue
+        absolute = urljoin(base_url, href)
+        if absolute.startswith(("http://", "https://")):
+            links.append(absolute.split("#", 1)[0])
+    return links
+
+
+# ── JS-rendering detection ───────────────────────────────────────────────────
+
+_BODY_RE = re.compile(r"<body[^>]*>(.*)</body>", re.I | re.S)
+_SPA_SHELL_RE = re.compile(
+    r"""<div[^>]+id=["'](?:root|app|__nuxt|__next|svelte)["'][^>]*>\s*</div>""", re.I
+)
+_NOSCRIPT_JS_RE = re.compile(r"<noscript[^>]*>[^<]*enable javascript", re.I)
+
+
+def js_rendering_reason(html: str, markdown: str) -> Optional[str]:
+    """
+    Returns why the page probably needs a real browser, or None if the static
+    HTML is good enough: empty body, SPA shell, or too little Markdown.
+    """
+    body = _BODY_RE.search(html)
+    if body is None or not body.group(1).strip():
+        return "empty_body"
+    if _SPA_SHELL_RE.search(html) or _NOSCRIPT_JS_RE.search(html):
+        if len(markdown) < MIN_STATIC_MARKDOWN * 4:
+            return "spa_shell"
+    if len(markdown) < MIN_STATIC_MARKDOWN:
+        return "short_markdown"
+    return None
+
+
+# ── Fetch ────────────────────────────────────────────────────────────────────
+
+class StaticFetchError(Exception):
+    """The page could not be fetched as plain HTML; the reason is the message."""
+
+
+async def fetch_html(url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    """
+    Plain GET through the pooled client. Raises StaticFetchError for anything
+    that is not a successful, reasonably sized HTML response. A 304 answer to
+    a conditional request (If-None-Match / If-Modified-Since) is returned as is.
+    """
+    client = get_http_client()
+    try:
+        response = await client.get(url, headers=headers)
+    except httpx.HTTPError as e:
+        raise StaticFetchError(f"http_error:{type(e).__name__}")
+    if response.status_code == 304:
+        return response
+    if response.status_code >= 400:
+        raise StaticFetchError(f"status_{response.status_code}")
+    content_type = response.headers.get("content-type", "")
+    if "html" not in content_type:
+        raise StaticFetchError("not_html")
+    if len(response.content) > STATIC_MAX_BYTES:
+        raise StaticFetchError("too_large")
+    return response
@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# The modules of backend/Projet import each other by their flat names
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# Caches and stores created at import time stay out of the working tree
+os.environ.setdefault("GEO_CACHE_DIR", tempfile.mkdtemp(prefix="geo-tests-"))
@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+import browser_pool
+from browser_pool import BrowserPool
+
+
+class _FakeCrawler:
+    """Stands in for AsyncWebCrawler; launches fail while `failing` is set."""
+
+    failing = False
+    launches = 0
+
+    def __init__(self, verbose=False):
+        pass
+
+    async def start(self):
+        type(self).launches += 1
+        if type(self).failing:
+            raise RuntimeError("chromium did not start")
+
+    async def close(self):
+        pass
+
+    async def arun(self, url, **kwargs):
+        return url
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.01)
+
+
+def test_failed_relaunch_is_retried_by_the_health_loop(monkeypatch):
+    monkeypatch.setattr(browser_pool, "AsyncWebCrawler", _FakeCrawler)
+    monkeypatch.setattr(browser_pool, "psutil", None)
+    pool = BrowserPool(size=1, max_pages=1, health_check_interval=0.05)
+    pool.start()
+    try:
+        assert pool.healthy() == 1
+
+        async def crawl():
+            async with pool.lease() as crawler:
+                return await crawler.arun("https://example.com")
+
+        # The release recycles the browser (max_pages=1) and the relaunch fails
+        _FakeCrawler.failing = True
+        asyncio.run(crawl())
+        _wait_for(lambda: pool._browsers[0].broken)
+        assert pool.healthy() == 0
+        assert not pool._browsers[0].retiring
+
+        _FakeCrawler.failing = False
+        _wait_for(lambda: pool.healthy() == 1)
+        assert asyncio.run(crawl()) == "https://example.com"
+    finally:
+        pool.stop()
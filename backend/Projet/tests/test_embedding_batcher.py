@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from embedding_batcher import EmbeddingBatcher
+
+
+class _BlockingModel:
+    """Encodes each text as [len(text)], the first forward pass waits for `release`."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def encode(self, texts, batch_size=None, convert_to_numpy=True):
+        self.started.set()
+        self.release.wait(5)
+        return np.array([[float(len(t))] for t in texts])
+
+
+def test_cancelled_encode_does_not_stop_the_worker():
+    model = _BlockingModel()
+    batcher = EmbeddingBatcher(lambda: model, window_ms=0)
+
+    async def run():
+        # The first batch is running, the second request waits in the queue
+        running = asyncio.ensure_future(batcher.aencode(["running"]))
+        await asyncio.to_thread(model.started.wait, 5)
+        queued = asyncio.ensure_future(batcher.aencode(["queued"]))
+        await asyncio.sleep(0.05)
+        # A stage timeout cancels both while they are pending
+        with_timeout = asyncio.wait_for(running, 0.01)
+        try:
+            await with_timeout
+        except asyncio.TimeoutError:
+            pass
+        queued.cancel()
+        model.release.set()
+        return await asyncio.wait_for(batcher.aencode(["next", "call"]), 5)
+
+    vectors = asyncio.run(run())
+    assert vectors.tolist() == [[4.0], [4.0]]
+    assert batcher._thread.is_alive()
+
+
+def test_failed_batch_does_not_stop_the_worker():
+    calls = []
+
+    class _FlakyModel:
+        def encode(self, texts, batch_size=None, convert_to_numpy=True):
+            calls.append(texts)
+            if len(calls) == 1:
+                raise RuntimeError("model crashed")
+            return np.ones((len(texts), 2))
+
+    batcher = EmbeddingBatcher(lambda: _FlakyModel(), window_ms=0)
+    try:
+        batcher.encode(["a"])
+    except RuntimeError:
+        pass
+    assert batcher.encode(["b", "c"]).shape == (2, 2)
+
+
+def test_dead_worker_is_restarted():
+    class _ZeroModel:
+        def encode(self, texts, batch_size=None, convert_to_numpy=True):
+            return np.zeros((len(texts), 1))
+
+    batcher = EmbeddingBatcher(lambda: _ZeroModel(), window_ms=0)
+    batcher._thread = threading.Thread(target=lambda: None)
+    batcher._thread.start()
+    batcher._thread.join()
+    assert batcher.encode(["x"]).shape == (1, 1)
@@ -0,0 +1,34 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+
+def test_aencode_keeps_disk_io_off_the_event_loop(tmp_path, monkeypatch):
+    cache = EmbeddingCache(model_name="test-model", directory=str(tmp_path))
+    io_threads = []
+    for name in ("get_many", "put_many"):
+        method = getattr(cache._disk, name)
+
+        def spy(*args, _method=method, **kwargs):
+            io_threads.append(threading.current_thread())
+            return _method(*args, **kwargs)
+
+        monkeypatch.setattr(cache._disk, name, spy)
+
+    async def acompute(texts):
+        return np.array([[float(len(t)), 1.0] for t in texts])
+
+    async def run():
+        loop_thread = threading.current_thread()
+        first = await cache.aencode(["alpha", "beta"], acompute)
+        second = await cache.aencode(["alpha", "gamma"], acompute)
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(run())
+    assert first.tolist() == [[5.0, 1.0], [4.0, 1.0]]
+    assert second.tolist() == [[5.0, 1.0], [5.0, 1.0]]
+    assert io_threads and all(t is not loop_thread for t in io_threads)
+    assert cache.counters["memory_hits"] == 1
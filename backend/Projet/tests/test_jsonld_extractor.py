@@ -0,0 +1,55 @@
+from jsonld_extractor import extract_microdata
+
+
+def test_items_after_implicitly_closed_paragraphs_stay_top_level():
+    html = """
+    <body>
+      <div itemscope itemtype="https://schema.org/Organization">
+        <span itemprop="name">Acme</span>
+        <p>First paragraph
+        <p>Second paragraph, never closed
+      </div>
+      <div itemscope itemtype="https://schema.org/Product">
+        <span itemprop="name">Widget</span>
+      </div>
+    </body>
+    """
+    items = extract_microdata(html)
+    assert items == [
+        {"@type": "https://schema.org/Organization", "name": "Acme"},
+        {"@type": "https://schema.org/Product", "name": "Widget"},
+    ]
+
+
+def test_implicitly_closed_list_items_and_cells():
+    html = """
+    <ul itemscope itemtype="https://schema.org/ItemList">
+      <li itemprop="itemListElement">One
+      <li itemprop="itemListElement">Two
+    </ul>
+    <table><tr><td>a<td>b</table>
+    <select><option>x<option>y</select>
+    <div itemscope itemtype="https://schema.org/Person"><span itemprop="name">Ada</span></div>
+    """
+    items = extract_microdata(html)
+    assert items == [
+        {"@type": "https://schema.org/ItemList", "itemListElement": ["One", "Two"]},
+        {"@type": "https://schema.org/Person", "name": "Ada"},
+    ]
+
+
+def test_nested_items_keep_their_parent():
+    html = """
+    <div itemscope itemtype="https://schema.org/LocalBusiness">
+      <p>Welcome
+      <div itemprop="address" itemscope itemtype="https://schema.org/PostalAddress">
+        <span itemprop="addressLocality">Paris</span>
+      </div>
+      <span itemprop="telephone">+33 1 23 45 67 89</span>
+    </div>
+    """
+    assert extract_microdata(html) == [{
+        "@type": "https://schema.org/LocalBusiness",
+        "address": {"@type": "https://schema.org/PostalAddress", "addressLocality": "Paris"},
+        "telephone": "+33 1 23 45 67 89",
+    }]
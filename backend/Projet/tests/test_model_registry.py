@@ -0,0 +1,22 @@
+import model_registry
+import quantized_backend
+from embedding_cache import EmbeddingCache
+
+
+class _FakeSentenceTransformer:
+    def __init__(self, name):
+        self.name = name
+
+
+def test_onnx_fallback_caches_under_the_torch_model_id(monkeypatch, tmp_path):
+    monkeypatch.setattr(model_registry, "EMBEDDING_BACKEND", "onnx-int8")
+    monkeypatch.setattr(model_registry, "SentenceTransformer", _FakeSentenceTransformer)
+    monkeypatch.setattr(quantized_backend, "ort", None)   # onnxruntime not installed
+    monkeypatch.setattr(model_registry, "_instances", {})
+    monkeypatch.setattr(model_registry, "_embedding_backend", None)
+
+    assert isinstance(model_registry.get_embedding_model(), _FakeSentenceTransformer)
+    assert model_registry.embedding_model_id() == model_registry.EMBEDDING_MODEL_NAME
+    assert model_registry.readiness()["embedding_backend"] == "torch"
+    assert model_registry.readiness()["embedding_backend_requested"] == "onnx-int8"
+    assert EmbeddingCache(directory=str(tmp_path)).model_name == model_registry.EMBEDDING_MODEL_NAME
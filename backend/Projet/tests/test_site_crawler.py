@@ -0,0 +1,43 @@
+from site_crawler import aggregate_pages, crawl_content
+from stage_graph import content_key
+
+
+def _page(url, depth, text):
+    return {
+        "url": url,
+        "depth": depth,
+        "markdown_content": text,
+        "structured_data": [{"@type": "Organization", "url": url}],
+        "metadata": {"title": text.title()},
+    }
+
+
+PAGES = [
+    _page("https://example.com/", 0, "home"),
+    _page("https://example.com/about", 1, "about"),
+    _page("https://example.com/blog", 1, "blog"),
+    _page("https://example.com/blog/post", 2, "post"),
+]
+
+
+def test_pages_are_aggregated_in_a_stable_order():
+    forward = aggregate_pages("https://example.com/", PAGES)
+    backward = aggregate_pages("https://example.com/", PAGES[::-1])
+    assert [p["url"] for p in forward["pages"]] == [p["url"] for p in backward["pages"]]
+    assert forward == backward
+
+
+def test_crawl_hash_ignores_completion_order():
+    forward = aggregate_pages("https://example.com/", PAGES)
+    shuffled = aggregate_pages("https://example.com/", [PAGES[2], PAGES[0], PAGES[3], PAGES[1]])
+    # Even a site_data whose pages were left in completion order hashes the same
+    shuffled["pages"] = [PAGES[3], PAGES[1], PAGES[0], PAGES[2]]
+    assert content_key("crawl", crawl_content(forward)) == content_key("crawl", crawl_content(shuffled))
+
+
+def test_crawl_hash_sees_content_changes():
+    changed = [dict(p) for p in PAGES]
+    changed[1]["markdown_content"] = "about us, updated"
+    before = content_key("crawl", crawl_content(aggregate_pages("https://example.com/", PAGES)))
+    after = content_key("crawl", crawl_content(aggregate_pages("https://example.com/", changed)))
+    assert before != after
@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import uuid
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+
+from settings import cache_path, process_singleton
+
+
+# ─── Tracing settings (overridable from the .env) ────────────────────────────
+TRACING_ENABLED = os.getenv("GEO_TRACING", "1") != "0"
+TRACE_FILE = os.getenv("GEO_TRACE_FILE", cache_path("traces.jsonl"))
+# Tail sampling: failed audits and audits slower than SLOW_SECONDS are always
+# kept, the others with probability SAMPLE_RATE
+TRACE_SAMPLE_RATE = float(os.getenv("GEO_TRACE_SAMPLE_RATE", "0.1"))
+TRACE_SLOW_SECONDS = float(os.getenv("GEO_TRACE_SLOW_SECONDS", "30"))
+TRACE_MAX_MB = float(os.getenv("GEO_TRACE_MAX_MB", "50"))        # the file is rotated to .1 beyond that
+TRACE_RECENT = int(os.getenv("GEO_TRACE_RECENT", "200"))          # kept traces also held in memory
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class Span:
+    """One timed operation of a trace, with its attributes (sizes, counts, states)."""
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, error: BaseException):
+        self.status = "cancelled" if type(error).__name__ == "CancelledError" else "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        self.duration = time.perf_counter() - self._start
+        self.trace.add(self)
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "offset": round(self.started_at - origin, 4),
+            "duration": round(self.duration, 4),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span outside any trace (or with tracing off): records nothing."""
+
+    trace_id = None
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Trace:
+    """The spans of one audit; they may end on any thread or event loop."""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+
+# The innermost open span. Event loop tasks and asyncio.to_thread calls copy
+# the context, so the spans of concurrent stages nest under the right parent.
+_current_span: ContextVar[Optional[Span]] = ContextVar("geo_current_span", default=None)
+
+
+def current_span():
+    return _current_span.get() or _NOOP
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """A child span of the current one; a no-op outside a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield _NOOP
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.fail(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """
+    Opens the root span of a new trace. When it ends, the trace goes through
+    tail sampling and, if kept, to the exporter.
+    """
+    if not TRACING_ENABLED:
+        yield _NOOP
+        return
+    root = Span(Trace(), name, None, attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.fail(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        root.end()
+        get_trace_exporter().finish(root)
+
+
+class TraceExporter:
+    """
+    Tail-sampling JSON-lines exporter: one line per kept trace (root span
+    attributes + every span, offsets relative to the start of the trace).
+    """
+
+    def __init__(
+        self,
+        path: str = TRACE_FILE,
+        sample_rate: float = TRACE_SAMPLE_RATE,
+        slow_seconds: float = TRACE_SLOW_SECONDS,
+        max_mb: float = TRACE_MAX_MB,
+        recent: int = TRACE_RECENT,
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.max_bytes = max_mb * 1024 * 1024
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._recent: "deque[Dict[str, Any]]" = deque(maxlen=recent)
+        self.counters = {"traces": 0, "kept_slow": 0, "kept_error": 0, "kept_sampled": 0, "dropped": 0}
+
+    def _sampling(self, root: Span) -> Optional[str]:
+        if root.status != "ok":
+            return "error"
+        if root.duration >= self.slow_seconds:
+            return "slow"
+        if random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def finish(self, root: Span):
+        reason = self._sampling(root)
+        with self._lock:
+            self.counters["traces"] += 1
+            self.counters[f"kept_{reason}" if reason else "dropped"] += 1
+        if reason is None:
+            return
+        with root.trace._lock:
+            spans = sorted(root.trace.spans, key=lambda s: s.started_at)
+        record = {
+            "trace_id": root.trace_id,
+            "span_id": root.span_id,
+            "name": root.name,
+            "started_at": root.started_at,
+            "duration": round(root.duration, 4),
+            "status": root.status,
+            "error": root.error,
+            "kept": reason,
+            "attributes": root.attributes,
+            "spans": [s.to_dict(root.started_at) for s in spans if s is not root],
+        }
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._recent.append(record)
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                print(f"Tracing: writing trace {root.trace_id} failed: {e}")
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """A kept trace, from memory or else from the trace file(s)."""
+        with self._lock:
+            for record in self._recent:
+                if record["trace_id"] == trace_id:
+                    return record
+        for path in (self.path, self.path + ".1"):
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if trace_id in line:
+                        record = json.loads(line)
+                        if record["trace_id"] == trace_id:
+                            return record
+        return None
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """The latest kept traces, without their spans."""
+        with self._lock:
+            records = list(self._recent)[-limit:]
+        return [{k: v for k, v in r.items() if k != "spans"} for r in reversed(records)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "enabled": TRACING_ENABLED,
+            "file": self.path,
+            "sample_rate": self.sample_rate,
+            "slow_seconds": self.slow_seconds,
+            **counters,
+        }
+
+
+# ── Process-wide exporter ────────────────────────────────────────────────────
+
+@process_singleton
+def get_trace_exporter() -> TraceExporter:
+    return TraceExporter()
@@ -1,15 +1,16 @@
 import os
 import sys
+import json
 import asyncio
-import traceback
-import concurrent.futures
+import threading
 
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "Projet", ".env"))
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from pydantic import BaseModel, Field
 from supabase import create_client, Client
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -17,8 +18,24 @@ SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY) if SUPABASE_URL and SUPABASE_SERVICE_KEY else None
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "Projet"))
-from Crawler import extract_pme_data
-from audit_engine import GEOAuditor
+from audit_pipeline import run_audit_pipeline, audit_progress
+from browser_pool import get_browser_pool
+from model_registry import warmup, readiness, close_clients, get_tavily_client
+from embedding_batcher import get_embedding_batcher
+from embedding_cache import get_embedding_cache
+from static_fetch import fetch_stats
+from crawl_cache import get_crawl_cache
+from report_cache import get_report_cache
+from compression import get_remote_circuit
+from pipeline_runtime import get_pipeline_runtime
+from job_queue import get_job_queue, JobKind, QueueFull, FINISHED, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from site_crawler import SITE_MAX_PAGES, SITE_MAX_DEPTH
+from url_utils import normalize_url
+from result_sink import ResultSink, build_backend, SINK_FINAL_TIMEOUT
+from audit_history import get_audit_history, history_key, parse_report
+from stage_graph import get_stage_memo
+from metrics import gauge_callback, track, render as render_metrics
+from tracing import start_trace, get_trace_exporter
 
 app = FastAPI(title="GEO Auditor API")
 
@@ -32,6 +49,42 @@ app.add_middleware(
 
 class AuditRequest(BaseModel):
     url: str
+    # > 1 crawls the whole site (robots.txt + sitemap.xml); capped by the .env
+    max_pages: int = Field(1, ge=1, le=SITE_MAX_PAGES)
+    max_depth: int = Field(SITE_MAX_DEPTH, ge=0, le=SITE_MAX_DEPTH)
+
+
+runtime = get_pipeline_runtime()
+# Where the webhook audits are written: Supabase, or a local SQLite stand-in
+sink = ResultSink(build_backend(supabase_client=supabase))
+
+
+@app.on_event("startup")
+async def start_browser_pool():
+    """Starts the pipeline loops and launches the warm browser pool on them, so audits skip Chromium startup."""
+    runtime.start()
+    await asyncio.get_running_loop().run_in_executor(None, get_browser_pool().start, runtime.loop)
+
+
+@app.on_event("startup")
+def warm_models():
+    """Loads the embedding model and API clients in the background (see /ready)."""
+    threading.Thread(target=warmup, name="model-warmup", daemon=True).start()
+
+
+@app.on_event("startup")
+def start_job_queue():
+    """Starts the audit workers (and resumes the jobs a restart interrupted)."""
+    jobs.start()
+
+
+@app.on_event("shutdown")
+def release_resources():
+    jobs.stop()
+    sink.close()
+    get_browser_pool().stop()
+    runtime.stop()
+    close_clients()
 
 
 @app.get("/")
@@ -39,102 +92,420 @@ def root():
     return {"status": "GEO Auditor API is running"}
 
 
-def _run_pipeline_in_thread(url: str) -> dict:
+@app.get("/ready")
+def ready():
     """
-    Runs the pipeline in a dedicated thread with its own ProactorEventLoop.
-    This isolates Playwright (which needs ProactorEventLoop to spawn
-    the browser) from the main uvicorn loop.
+    Readiness probe: 503 until the embedding model is loaded and warmed up,
+    and while no pooled browser is healthy.
     """
-    async def _pipeline():
-        site_data = await extract_pme_data(url)
-        if not site_data["markdown_content"]:
-            raise ValueError("Unable to crawl this URL.")
-        auditor = GEOAuditor()
-        try:
-            result = await auditor.generate_geo_report(site_data)
-        finally:
-            auditor.close()
-        return site_data, result
+    pool = get_browser_pool()
+    status = {**readiness(), "browser_pool": pool.started, "healthy_browsers": pool.healthy() if pool.started else 0}
+    if not (status["ready"] and status["healthy_browsers"]):
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
+@app.get("/browsers")
+def browser_pool_stats():
+    """Usage and health of the warm browser pool."""
+    return get_browser_pool().stats()
+
+
+@app.get("/crawler/stats")
+def crawler_stats():
+    """Static fetch vs browser escalation counters and crawl cache efficiency."""
+    return {**fetch_stats(), "cache": get_crawl_cache().stats()}
 
-    # Nouveau loop ProactorEventLoop dans ce thread
-    loop = asyncio.ProactorEventLoop()
-    asyncio.set_event_loop(loop)
-    try:
-        site_data, result = loop.run_until_complete(_pipeline())
-        loop.run_until_complete(asyncio.sleep(0.25))  # drain SSL
-    finally:
-        loop.close()
 
+@app.get("/embeddings/stats")
+def embedding_stats():
+    """Micro-batching efficiency (batch fill, queue wait) and embedding cache hits."""
+    return {**get_embedding_batcher().stats(), "cache": get_embedding_cache().stats()}
+
+
+@app.get("/search/stats")
+def search_stats():
+    """Tavily search cache: hit ratio, upstream calls and latency saved."""
+    tavily = get_tavily_client()
+    if not hasattr(tavily, "stats"):
+        return {"enabled": False}
+    return {"enabled": True, **tavily.stats()}
+
+
+@app.get("/reports/stats")
+def report_stats():
+    """
+    LLM report cache (exact hits, semantic near-hits, misses, evictions),
+    llms.txt compression and audit history (unchanged re-audits, reused stages).
+    """
     return {
+        **get_report_cache().stats(),
+        "compression": get_remote_circuit().stats(),
+        "history": get_audit_history().stats(),
+    }
+
+
+@app.get("/history")
+def audit_history(url: str, max_pages: int = 1, max_depth: int = SITE_MAX_DEPTH, limit: int = 20):
+    """
+    Past audits of a URL (same crawl budget), latest first, each with its
+    diff against the one before: score deltas, recommendations added and
+    removed, and what changed (crawl, Tavily results, scores, report).
+    """
+    return {"url": url, "audits": get_audit_history().list(history_key(url, max_pages, max_depth), limit)}
+
+
+def _run_audit(url: str, max_pages: int = 1, max_depth: int = SITE_MAX_DEPTH, on_event=None) -> dict:
+    """
+    Runs the pipeline on the long-lived pipeline runtime (its own event
+    loops, kept apart from the uvicorn loop) and blocks the calling worker
+    until it is done. `on_event` (called from the runtime thread) receives
+    the progress events of the audit, starting with its trace id.
+    """
+    with start_trace("audit", url=url, max_pages=max_pages, max_depth=max_depth) as trace:
+        if on_event is not None and trace.trace_id:
+            on_event({"event": "trace", "trace_id": trace.trace_id})
+        # The pipeline task inherits the context, so its spans join this trace
+        site_data, result, timings = runtime.run(run_audit_pipeline(url, max_pages, max_depth, on_event))
+
+    response = {
+        "trace_id": trace.trace_id,
         "url": url,
         "title": site_data["metadata"].get("title", ""),
         "markdown_length": len(site_data["markdown_content"]),
         "json_ld_count": len(site_data["structured_data"]),
         **result,
+        "timings": timings,
+    }
+    if "pages" in site_data:
+        response["pages"] = [
+            {
+                "url": page["url"],
+                "depth": page.get("depth", 0),
+                "title": page["metadata"].get("title", ""),
+                "markdown_length": len(page["markdown_content"]),
+                "json_ld_count": len(page["structured_data"]),
+                "error": page.get("error"),
+            }
+            for page in site_data["pages"]
+        ]
+    return response
+
+
+# ── Job queue ─────────────────────────────────────────────────────────────────
+
+def _run_audit_job(payload: dict, on_event) -> dict:
+    return _run_audit(payload["url"], payload["max_pages"], payload["max_depth"], on_event)
+
+
+# Longest a GET /audits/{id}/wait call holds the connection (seconds)
+AUDIT_WAIT_MAX = float(os.getenv("GEO_AUDIT_WAIT_MAX", "60"))
+
+jobs = get_job_queue()
+# Someone waits on the response: the stages retry on their own, and the job
+# is not worth resuming after a restart
+jobs.register(JobKind("audit", _run_audit_job, retries=0, resumable=False, progress=audit_progress))
+# Submitted through POST /audits and polled: retried, resumed after a restart
+jobs.register(JobKind("async_audit", _run_audit_job, progress=audit_progress))
+
+
+def _submit_audit(
+    kind: str, request: AuditRequest, priority: int, busy_status: int = 429, subscriber=None, consumer=None,
+) -> tuple:
+    """
+    Queues an audit, or attaches to the in-flight (or recent, see
+    GEO_COALESCE_REUSE) audit of the same normalized URL and crawl budget.
+    Returns (job id, "new" | "coalesced" | "reused" | "redelivered"); a full
+    queue answers `busy_status` with a Retry-After header.
+    """
+    payload = {"url": request.url, "max_pages": request.max_pages, "max_depth": request.max_depth}
+    key = f"{normalize_url(request.url)}|{request.max_pages}|{request.max_depth}"
+    try:
+        return jobs.submit_coalesced(kind, payload, key, priority, subscriber=subscriber, consumer=consumer)
+    except QueueFull as e:
+        raise HTTPException(status_code=busy_status, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+def _job_error(job: dict) -> HTTPException:
+    if job["error_type"] == "ValueError":
+        return HTTPException(status_code=422, detail=job["error"])
+    return HTTPException(status_code=500, detail=f"{job['error_type']}: {job['error']}\n{job['traceback'] or ''}")
+
+
+@app.get("/jobs")
+def list_jobs(status: str = None, limit: int = 50):
+    """Job queue: workers, queue depth, counters and the latest jobs (?status=queued|running|done|failed)."""
+    return {**jobs.stats(), "runtime": runtime.stats(), "recent": jobs.list(status, limit)}
+
+
+@app.get("/sink")
+def sink_stats():
+    """Result sink: backend, rows waiting, batches written, retries and coalescing ratio."""
+    return sink.stats()
+
+
+@app.get("/sink/{audit_id}")
+def sink_row(audit_id: str):
+    """A row as written by the webhook flow (local sqlite / memory backends only)."""
+    if not hasattr(sink.backend, "get"):
+        raise HTTPException(status_code=404, detail="Rows are only readable from a local result sink.")
+    row = sink.backend.get(audit_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Unknown audit.")
+    return row
+
+
+# ── Prometheus metrics ────────────────────────────────────────────────────────
+
+def _cache_hit_ratios() -> dict:
+    ratios = {
+        "crawl": get_crawl_cache().stats()["hit_ratio"],
+        "embeddings": get_embedding_cache().stats()["hit_ratio"],
+        "report": get_report_cache().stats()["hit_ratio"],
+        "stage_memo": get_stage_memo().stats()["hit_ratio"],
+    }
+    if "tavily" in readiness()["loaded"]:
+        tavily = get_tavily_client()
+        if hasattr(tavily, "stats"):
+            ratios["search"] = tavily.stats()["hit_ratio"]
+    return ratios
+
+
+gauge_callback("geo_job_queue_depth", "Audit jobs waiting for a worker", lambda: jobs.stats()["queued"])
+gauge_callback("geo_audits_in_flight", "Audits being run by the workers", lambda: jobs.stats()["running"])
+gauge_callback("geo_cache_hit_ratio", "Hit ratio of each cache since the start", _cache_hit_ratios, label="cache")
+gauge_callback("geo_model_load_seconds", "Load time of the models and API clients", lambda: readiness()["load_seconds"], label="model")
+gauge_callback("geo_browser_rss_bytes", "Resident memory of the pooled browsers",
+               lambda: get_browser_pool().browser_rss_mb() * 1024 * 1024)
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics: stage / upstream latency histograms, errors, retries, queue, caches, memory."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/traces")
+def list_traces(limit: int = 50):
+    """Tracing: sampling settings, kept / dropped counts and the latest kept audit traces."""
+    exporter = get_trace_exporter()
+    return {**exporter.stats(), "recent": exporter.recent(limit)}
+
+
+@app.get("/traces/{trace_id}")
+def get_trace(trace_id: str):
+    """Spans of a kept audit trace: crawl, searches, embeddings, Gemini, compression, persistence."""
+    trace = get_trace_exporter().get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Unknown trace, or not kept by sampling.")
+    return trace
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    return job
+
+
+# ── Async audit API ───────────────────────────────────────────────────────────
+
+AUDIT_KINDS = ("audit", "async_audit")
+
+
+def _get_audit_job(job_id: str) -> dict:
+    job = jobs.get(job_id)
+    if job is None or job["kind"] not in AUDIT_KINDS:
+        raise HTTPException(status_code=404, detail="Unknown audit.")
+    return job
+
+
+def _audit_view(job: dict) -> dict:
+    """Status of an audit job: progress and partial results while it runs, result or error once finished."""
+    progress = job["progress"] or {}
+    view = {
+        "id": job["id"],
+        "url": job["payload"]["url"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "stage": job["stage"],
+        "trace_id": job["trace_id"],
+        "running_stages": progress.get("running", []),
+        "stages": progress.get("stages", {}),
+        # Scores as soon as their stage is done, report fields as Gemini writes them
+        "partial": {**progress.get("partial", {}), "report": progress.get("report", {})},
     }
+    if job["status"] == "queued":
+        view["queue_position"] = jobs.position(job["id"])
+    if job["status"] == "done":
+        view["result"] = job["result"]
+    elif job["status"] == "failed":
+        error = _job_error(job)
+        view["error"] = {"status": error.status_code, "type": job["error_type"], "detail": job["error"]}
+    return view
+
+
+@app.post("/audits", status_code=202)
+def submit_audit(request: AuditRequest):
+    """
+    Queues an audit and returns its id at once (202, Location: /audits/{id}).
+    Follow it with GET /audits/{id} or GET /audits/{id}/wait. The same URL
+    submitted while it is being audited gets the id of the running audit.
+    """
+    job_id, how = _submit_audit("async_audit", request, PRIORITY_INTERACTIVE)
+    job = jobs.get(job_id)
+    return JSONResponse(
+        status_code=202,
+        content={"id": job_id, "status": job["status"], "coalesced": how != "new",
+                 "queue_position": jobs.position(job_id)},
+        headers={"Location": f"/audits/{job_id}"},
+    )
+
+
+@app.get("/audits/{job_id}")
+def get_audit(job_id: str):
+    """Status, current stage and partial results of an audit (also webhook audits, see their status_url)."""
+    return _audit_view(_get_audit_job(job_id))
+
+
+@app.get("/audits/{job_id}/wait")
+async def wait_audit(job_id: str, timeout: float = 30):
+    """
+    Long poll: answers as soon as the audit is done or failed, or after
+    `timeout` seconds (at most GEO_AUDIT_WAIT_MAX) with its current status.
+    """
+    job = _get_audit_job(job_id)
+    if job["status"] not in FINISHED:
+        job = await jobs.wait(job_id, min(max(timeout, 0), AUDIT_WAIT_MAX))
+    return _audit_view(job)
 
 
 @app.post("/audit")
 async def run_audit(request: AuditRequest):
     """
-    Runs the full pipeline in a separate thread to avoid conflicts
-    between ProactorEventLoop (Playwright) and the uvicorn loop.
+    Runs the full pipeline as a high-priority job of the audit queue (fixed
+    number of workers, 429 + Retry-After when the queue is full) and
+    returns its result. Concurrent requests for the same URL share one run.
     """
-    try:
-        loop = asyncio.get_event_loop()
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-            result = await loop.run_in_executor(
-                executor, _run_pipeline_in_thread, request.url
-            )
-        return result
-    except ValueError as e:
-        raise HTTPException(status_code=422, detail=str(e))
-    except Exception as e:
-        detail = f"{type(e).__name__}: {e}\n{traceback.format_exc()}"
-        raise HTTPException(status_code=500, detail=detail)
+    job_id, _ = _submit_audit("audit", request, PRIORITY_INTERACTIVE)
+    job = await jobs.wait(job_id)
+    if job["status"] != "done":
+        raise _job_error(job)
+    return job["result"]
+
+
+def _encode_event(event: dict, fmt: str) -> str:
+    data = json.dumps(event, ensure_ascii=False, default=str)
+    if fmt == "sse":
+        return f"event: {event['event']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+@app.post("/audit/stream")
+async def stream_audit(request: AuditRequest, format: str = "ndjson"):
+    """
+    Streaming variant of /audit (NDJSON, or Server-Sent Events with
+    ?format=sse). Events, in order of arrival:
+      accepted → stage (started / done, with scores as soon as computed)
+      → report_started → token (raw Gemini text) / field (each report field
+      or recommendation once complete) → result (same body as /audit) | error
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'.")
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(event):
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def on_job_event(event):
+        if event.get("event") != "job":
+            emit(event)
+            return
+        job = event["job"]
+        if job["status"] == "done":
+            emit({"event": "result", "data": job["result"]})
+        else:
+            error = _job_error(job)
+            emit({"event": "error", "status": error.status_code,
+                  "detail": job["error"] if error.status_code == 422 else f"{job['error_type']}: {job['error']}"})
+        emit(None)
+
+    # Subscribed in the same step as the submission, so no event is missed
+    job_id, how = _submit_audit("audit", request, PRIORITY_INTERACTIVE, subscriber=on_job_event)
+    accepted = {"event": "accepted", "url": request.url, "job_id": job_id, "coalesced": how != "new"}
+    if how != "new":
+        # Attached to a run already under way: what it has done so far
+        job = jobs.get(job_id)
+        accepted["progress"] = job["progress"]
+        if how == "reused":
+            on_job_event({"event": "job", "job": job})
+
+    async def events():
+        try:
+            yield _encode_event(accepted, format)
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield _encode_event(event, format)
+        finally:
+            jobs.unsubscribe(job_id, on_job_event)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        events(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # ── Supabase Webhook endpoint ─────────────────────────────────────────────────
 
-def _process_supabase_audit(audit_id: str, url: str):
-    """Processes an audit triggered by a Supabase webhook and updates the row."""
-    if supabase:
-        supabase.table("audits").update({"status": "processing"}).eq("id", audit_id).execute()
-    try:
-        result = _run_pipeline_in_thread(url)
-        if supabase:
-            # Parse score from llm_report if possible
-            score = None
-            try:
-                import json
-                raw = result.get("llm_report", "")
-                clean = raw.strip().lstrip("```json").rstrip("```").strip()
-                report = json.loads(clean)
-                raw_score = report.get("score")
-                if raw_score is not None:
-                    raw_score = float(raw_score)
-                    # score between 0 and 1 → bring to 100
-                    score = int(raw_score * 100) if raw_score <= 1 else int(raw_score)
-            except Exception:
-                pass
-
-            supabase.table("audits").update({
-                "status": "done",
-                "title": result.get("title"),
-                "score": score,
-                "coherence_score": str(result.get("coherence_score", "")),
-                "comparison_score": str(result.get("comparison_score", "")),
-                "best_competitor": result.get("best_competitor"),
-                "llm_report": result.get("llm_report"),
-                "updated_at": "now()",
-            }).eq("id", audit_id).execute()
-    except Exception as e:
-        if supabase:
-            supabase.table("audits").update({
-                "status": "error",
-                "llm_report": traceback.format_exc(),
-                "updated_at": "now()",
-            }).eq("id", audit_id).execute()
+# Columns of the `audits` row filled in as soon as the audit has computed them
+_PROGRESS_COLUMNS = ("title", "coherence_score", "comparison_score", "best_competitor")
+
+
+def _process_supabase_audit(data: dict, job: dict):
+    """
+    Consumer of the audit job of a Supabase row: marks the row as processing
+    when the audit starts, fills in the scores while it runs, then writes its
+    result (or error) once finished. Writes go through the result sink
+    (batched and coalesced); the final one is waited for, and left to be
+    delivered again on the next start if it cannot be written.
+    """
+    audit_id = data["audit_id"]
+    if job["status"] == "running":
+        partial = (job.get("progress") or {}).get("partial", {})
+        fields = {"status": "processing"}
+        for column in _PROGRESS_COLUMNS:
+            if column in partial:
+                fields[column] = partial[column] if column in ("title", "best_competitor") else str(partial[column])
+        sink.update(audit_id, fields)
+    elif job["status"] == "done":
+        result = job["result"]
+        sink.update(audit_id, {
+            "status": "done",
+            "title": result.get("title"),
+            "score": parse_report(result.get("llm_report"))["score"],
+            "coherence_score": str(result.get("coherence_score", "")),
+            "comparison_score": str(result.get("comparison_score", "")),
+            "best_competitor": result.get("best_competitor"),
+            "llm_report": result.get("llm_report"),
+            "updated_at": "now()",
+        }, final=True).result(SINK_FINAL_TIMEOUT)
+    elif job["status"] == "failed":
+        sink.update(audit_id, {
+            "status": "error",
+            "llm_report": job["traceback"] or f"{job['error_type']}: {job['error']}",
+            "updated_at": "now()",
+        }, final=True).result(SINK_FINAL_TIMEOUT)
+
+
+jobs.register_consumer("supabase", _process_supabase_audit)
 
 
 @app.post("/audit/webhook")
@@ -142,6 +513,10 @@ async def supabase_webhook(request: Request):
     """
     Endpoint called by the Supabase Database Webhook on INSERT
     into the `audits` table with status='pending'.
+    Queues a background audit (behind interactive ones, retried with
+    backoff) or attaches to the audit of the same URL already under way;
+    the row is updated by the supabase consumer. A redelivered webhook does
+    not queue the audit twice.
     """
     payload = await request.json()
     record = payload.get("record", {})
@@ -150,13 +525,19 @@ async def supabase_webhook(request: Request):
 
     if not audit_id or not url:
         raise HTTPException(status_code=400, detail="Fields 'id' and 'url' required in the payload.")
+    try:
+        max_pages = int(record.get("max_pages") or 1)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Field 'max_pages' must be an integer.")
+    # The row was written by the app: clamp it rather than lose the audit
+    max_pages = min(max(max_pages, 1), SITE_MAX_PAGES)
 
-    # Start processing in the background (does not block the webhook response)
-    loop = asyncio.get_event_loop()
-    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
-    loop.run_in_executor(executor, _process_supabase_audit, audit_id, url)
-
-    return {"status": "processing", "id": audit_id}
+    job_id, how = _submit_audit(
+        "async_audit", AuditRequest(url=url, max_pages=max_pages),
+        PRIORITY_BACKGROUND, busy_status=503, consumer=("supabase", {"audit_id": audit_id}),
+    )
+    return {"status": "queued", "id": audit_id, "job_id": job_id, "coalesced": how != "new",
+            "status_url": f"/audits/{job_id}"}
 
 
 # ── Miro Export endpoint ──────────────────────────────────────────────────────
@@ -182,15 +563,16 @@ def miro_export(request: MiroExportRequest):
     The MIRO_ACCESS_TOKEN is read from the .env on the server side.
     """
     try:
-        msg = _export_to_miro(
-            board_id=request.board_id,
-            company_name=request.company_name,
-            geo_score=request.geo_score,
-            recommendations=request.recommendations,
-            coherence_score=request.coherence_score,
-            comparison_score=request.comparison_score,
-            best_competitor=request.best_competitor,
-        )
+        with track("miro"):
+            msg = _export_to_miro(
+                board_id=request.board_id,
+                company_name=request.company_name,
+                geo_score=request.geo_score,
+                recommendations=request.recommendations,
+                coherence_score=request.coherence_score,
+                comparison_score=request.comparison_score,
+                best_competitor=request.best_competitor,
+            )
         return {"status": "ok", "message": msg}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
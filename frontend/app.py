@@ -11,7 +11,7 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", "backend",
 sys.path.insert(0, os.path.dirname(__file__))
 from miro_export import export_to_miro
 
-API_URL = "http://localhost:8000/audit"
+API_STREAM_URL = "http://localhost:8000/audit/stream"
 
 st.set_page_config(page_title="GEO Auditor", page_icon="🔍", layout="wide")
 
@@ -29,12 +29,52 @@ if "miro_board_id" not in st.session_state:
 # ── Launch form ──────────────────────────────────────────────────────────────
 url_input = st.text_input("Site URL to audit", placeholder="https://example.com")
 
+STAGE_LABELS = {
+    "crawl": "Site crawled",
+    "search_reputation": "Web reputation collected",
+    "search_competitors": "Sector leaders found",
+    "score_coherence": "Coherence score computed",
+    "score_comparison": "Comparison score computed",
+    "write_report": "Report written",
+}
+
 if st.button("Launch audit", type="primary", disabled=not url_input):
-    with st.spinner("Crawling + analysis in progress... (30-60 seconds)"):
+    data = None
+    with st.status("Crawling + analysis in progress...", expanded=True) as status:
+        preview = st.empty()
+        partial = {}
         try:
-            response = requests.post(API_URL, json={"url": url_input}, timeout=120)
-            response.raise_for_status()
-            data = response.json()
+            with requests.post(API_STREAM_URL, json={"url": url_input}, stream=True, timeout=180) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    kind = event["event"]
+                    if kind == "stage" and event.get("status") in ("ok", "memoized", "unchanged") and event["stage"] in STAGE_LABELS:
+                        details = {k: event[k] for k in ("title", "coherence_score", "comparison_score", "best_competitor") if k in event}
+                        st.write(f"✅ {STAGE_LABELS[event['stage']]} ({event.get('seconds', 0)} s) {details or ''}")
+                    elif kind == "report_started":
+                        partial = {}
+                    elif kind == "field":
+                        if "index" in event:
+                            partial.setdefault(event["field"], []).append(event["value"])
+                        else:
+                            partial[event["field"]] = event["value"]
+                        with preview.container():
+                            if "score" in partial:
+                                st.metric("GEO Score", f"{partial['score']}/100")
+                            if "critical_analysis" in partial:
+                                st.markdown(partial["critical_analysis"])
+                            for rec in partial.get("top5_recommendations", []):
+                                st.markdown(f"- {rec}")
+                    elif kind == "result":
+                        data = event["data"]
+                    elif kind == "error":
+                        status.update(label="Audit failed", state="error")
+                        st.error("API Error:")
+                        st.code(event["detail"], language="text")
+                        st.stop()
         except requests.exceptions.ConnectionError:
             st.error("Unable to reach the API. Make sure the FastAPI server is running on localhost:8000.")
             st.stop()
@@ -46,6 +86,12 @@ if st.button("Launch audit", type="primary", disabled=not url_input):
             st.error("API Error:")
             st.code(detail, language="text")
             st.stop()
+        preview.empty()
+        status.update(label="Audit complete", state="complete", expanded=False)
+
+    if data is None:
+        st.error("The audit stream ended without a result.")
+        st.stop()
 
     # Parse the report
     report = {}